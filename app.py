@@ -6,22 +6,37 @@ import os
 
 from flask import Flask
 from flask_smorest import Api
-from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 
+import assignment
+import engine_options
+import hashing
+import jobs
+import metrics
+import notifications
+import profiler
+import response_cache
+import roles
+import routing
+import sqlite_mode
+import stats
+import tasks  # noqa: F401  registers the tasks of the jobs
+from capacity import rebalance_command
 from db import db
+from explain import check_indexes_command
+from seeding import seed_command
 from resources.user import blp as UserBlp
 from resources.admin import blp as AdminBlp
 from resources.household import blp as HouseholdBlp
 from resources.collector import blp as CollectorBlp
 from resources.collection_dates import blp as CollectionDatesBlp
 from resources.collection_requests import blp as CollectionRequestsBlp
-from models import HouseholdModel
-from models import CollectorModel
-from models import AdminModel
+from resources.stats import blp as StatsBlp
+from resources.health import blp as HealthBlp
+from resources.jobs import blp as JobsBlp
 
 
-def create_app(db_url=None):
+def create_app(db_url=None, config=None):
     app = Flask(__name__)
 
     # Configuration
@@ -36,25 +51,39 @@ def create_app(db_url=None):
     database_uri = os.getenv("DATABASE_URL", "sqlite:///ecotrack.db")
     app.config["SQLALCHEMY_DATABASE_URI"] = db_url or database_uri
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+    engine_options.init_app(app)
     db.init_app(app)
+    sqlite_mode.init_app(app)
     migrate = Migrate(app, db)  # noqa
 
-    jwt = JWTManager(app)
+    roles.init_app(app)
+    hashing.init_app(app)
+    stats.init_app(app)
+    assignment.init_app(app)
+    routing.init_app(app)
+    jobs.init_app(app)
+    notifications.init_app(app)
+    response_cache.init_app(app)
+    metrics.init_app(app)
+    profiler.init_app(app)
+
+    jwt = metrics.InstrumentedJWTManager(app)
 
     @jwt.additional_claims_loader
     def add_user_role_to_jwt(identity):
-        # check if the user is household
-        if HouseholdModel.query.filter_by(user_id=identity).first():
-            return {"role": "household"}
-        # check if the user is collector
-        elif CollectorModel.query.filter_by(user_id=identity).first():
-            return {"role": "collector"}
-        # check if the user is admin
-        elif AdminModel.query.filter_by(user_id=identity).first():
-            return {"role": "admin"}
-        # if the user is not in any of the tables, return None
-        else:
-            return {"role": None}
+        # the role and the household, collector and admin ids of the
+        # user, read in one cached query
+        return roles.resolve_identity(identity)
+
+    app.cli.add_command(check_indexes_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(rebalance_command)
+    app.cli.add_command(jobs.worker_command)
+    app.cli.add_command(notifications.remind_command)
 
     api = Api(app)
 
@@ -67,5 +96,8 @@ def create_app(db_url=None):
     api.register_blueprint(CollectorBlp)
     api.register_blueprint(CollectionDatesBlp)
     api.register_blueprint(CollectionRequestsBlp)
+    api.register_blueprint(StatsBlp)
+    api.register_blueprint(HealthBlp)
+    api.register_blueprint(JobsBlp)
 
     return app
@@ -0,0 +1,459 @@
+"""
+This module serves the API as an ASGI application.
+
+    gunicorn --workers 2 --worker-class uvicorn.workers.UvicornWorker \\
+        "asgi:create_asgi_app()"
+
+The read endpoints of the collection dates and the collection requests
+run as coroutines on an async SQLAlchemy engine (aiosqlite for SQLite,
+asyncpg for Postgres), so a worker keeps serving while their queries
+wait on the database. Every other request is handed to the Flask app,
+which runs in a pool of threads; streamed responses stay streamed.
+
+The async routes share their queries, their access rules, their schemas
+and their response cache entries with the Flask views, but they skip the
+Flask request hooks: the metrics and the SQL profiler do not see them.
+
+Settings, read from the app config or the environment:
+
+- ``ASGI_WSGI_THREADS``: threads running the Flask app (default 32)
+
+The async drivers are optional dependencies, listed in
+requirements-async.txt.
+"""
+
+import asyncio
+import hashlib
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from flask_jwt_extended import decode_token
+from jwt import ExpiredSignatureError, InvalidTokenError
+from marshmallow import ValidationError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException, NotFound, MethodNotAllowed
+from werkzeug.http import parse_etags, quote_etag
+from werkzeug.routing import Map, Rule
+
+from app import create_app
+from engine_options import config_from_env, engine_options
+from pagination import cursor_link, parse_cursor_parameters
+from response_cache import current_cache
+from resources.collection_dates import get_collection_date
+from resources.collection_dates import get_collection_dates
+from resources.collection_requests import get_collection_request
+from resources.collection_requests import get_collection_requests
+
+
+DEFAULTS = {
+    "ASGI_WSGI_THREADS": 32,
+}
+
+# Async driver of each database backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+# Routes served by coroutines, for GET only
+ASYNC_ROUTES = Map([
+    Rule("/collection_dates", endpoint=get_collection_dates),
+    Rule("/collection_dates/<int:collection_date_id>",
+         endpoint=get_collection_date),
+    Rule("/collection_requests", endpoint=get_collection_requests),
+    Rule("/collection_requests/<int:collection_request_id>",
+         endpoint=get_collection_request),
+], strict_slashes=False)
+
+
+def async_database_url(url):
+    """
+    Return a database URL using the async driver of its backend.
+
+    Args:
+        url (str): The URL used by the Flask app.
+
+    Raises:
+        ValueError: If the backend has no async driver.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for the {backend} database")
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        raise ValueError("The async engine needs a file SQLite database")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncRequest:
+    """
+    The request passed to an async route.
+
+    Attributes:
+        claims (dict): The claims of the access token.
+        session (AsyncSession): The session of the request.
+        args (MultiDict): The query arguments.
+        base_url (str): The URL of the request, without query string.
+    """
+
+    def __init__(self, claims, session, args, base_url):
+        self.claims = claims
+        self.session = session
+        self.args = args
+        self.base_url = base_url
+
+    def page_params(self):
+        """
+        Load the cursor pagination arguments of the request.
+
+        Raises:
+            ValidationError: If ``limit`` or ``after`` is invalid.
+        """
+        return parse_cursor_parameters(self.args.to_dict())
+
+    def link(self, page_params):
+        """
+        Build the headers pointing to the next page, if any.
+        """
+        if page_params.next_cursor is None:
+            return {}
+        return {
+            "Link": cursor_link(
+                self.base_url, self.args.to_dict(), page_params),
+        }
+
+
+class AuthorizationError(Exception):
+    """
+    A missing or rejected access token, answered like Flask-JWT-Extended.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _claims(scope):
+    authorization = _header(scope, b"authorization")
+    if authorization is None:
+        raise AuthorizationError(401, "Missing Authorization Header")
+    scheme, _, token = authorization.partition(" ")
+    if scheme != "Bearer" or not token:
+        raise AuthorizationError(
+            422,
+            "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'")
+    try:
+        claims = decode_token(token)
+    except ExpiredSignatureError:
+        raise AuthorizationError(401, "Token has expired")
+    except InvalidTokenError as error:
+        raise AuthorizationError(422, str(error))
+    if claims.get("type") != "access":
+        raise AuthorizationError(422, "Only non-refresh tokens are allowed")
+    return claims
+
+
+def _error_payload(error):
+    # the payload of flask-smorest's error handler
+    payload = {"code": error.code, "status": error.name}
+    data = getattr(error, "data", None) or {}
+    if "message" in data:
+        payload["message"] = data["message"]
+    if "errors" in data:
+        payload["errors"] = data["errors"]
+    elif "messages" in data:
+        payload["errors"] = data["messages"]
+    return payload
+
+
+def wsgi_environ(scope, body):
+    """
+    Build the WSGI environ of an ASGI HTTP request.
+
+    Args:
+        scope (dict): The ASGI connection scope.
+        body (bytes): The request body.
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1")
+        value = value.decode("latin-1")
+        if name == "content-length":
+            continue
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+            continue
+        key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsgiApp:
+    """
+    ASGI application serving the async routes and passing the other
+    requests to the Flask app.
+
+    Attributes:
+        app (Flask): The Flask application.
+        engine (AsyncEngine): The engine of the async routes.
+        sessions (async_sessionmaker): The session factory of the async
+        routes.
+        executor (ThreadPoolExecutor): The threads running the Flask app.
+    """
+
+    def __init__(self, app, engine):
+        self.app = app
+        self.engine = engine
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        # asgiref's WsgiToAsgi runs every request on a single thread;
+        # a pool keeps the Flask requests concurrent
+        self.executor = ThreadPoolExecutor(
+            app.config["ASGI_WSGI_THREADS"], thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope {scope['type']}")
+
+        route = None
+        if scope["method"] == "GET":
+            adapter = ASYNC_ROUTES.bind("", path_info=scope["path"])
+            try:
+                route = adapter.match(method="GET")
+            except (NotFound, MethodNotAllowed):
+                route = None
+        if route is None:
+            await self.call_wsgi(scope, receive, send)
+        else:
+            await self.call_async(scope, send, *route)
+
+    async def lifespan(self, receive, send):
+        """
+        Answer the startup and shutdown events of the server, closing the
+        async engine and the threads on shutdown.
+        """
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def call_async(self, scope, send, endpoint, arguments):
+        """
+        Run an async route and send its JSON response.
+        """
+        etag = None
+        # the app context gives decode_token() the JWT settings, and the
+        # routes the response cache of the app
+        with self.app.app_context():
+            try:
+                claims = _claims(scope)
+                body, headers, etag = await self.run_route(
+                    scope, claims, endpoint, arguments)
+                status = 200
+            except AuthorizationError as error:
+                payload, status = {"msg": error.message}, error.status
+            except ValidationError as error:
+                payload = {
+                    "code": 422, "status": "Unprocessable Entity",
+                    "errors": {"query": error.messages},
+                }
+                status = 422
+            except HTTPException as error:
+                payload, status = _error_payload(error), error.code
+            if status != 200:
+                body, headers = self.dump(payload), {}
+
+        headers = {"Content-Type": "application/json", **headers}
+        if etag is not None:
+            headers.update({
+                "ETag": quote_etag(etag),
+                "Vary": "Authorization",
+                "Cache-Control": "private",
+            })
+            if parse_etags(
+                    _header(scope, b"if-none-match")).contains_weak(etag):
+                status, body = 304, b""
+                del headers["Content-Type"]
+        headers["Content-Length"] = str(len(body))
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers.items()
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def run_route(self, scope, claims, endpoint, arguments):
+        """
+        Run an async route, through the response cache when it is marked
+        with cached_route().
+
+        Returns:
+            tuple: The body, the headers and the ETag of the response; the
+            ETag is None for an uncached route.
+        """
+        namespaces = getattr(endpoint, "cache_namespaces", None)
+        if namespaces:
+            cache = current_cache()
+            query = scope["query_string"].decode("latin-1")
+            key = cache.key(namespaces, claims, f"{scope['path']}?{query}")
+            entry = cache.backend.get(key)
+            if entry is not None:
+                body, _, headers, etag = entry
+                return body, headers, etag
+
+        async with self.sessions() as session:
+            request = AsyncRequest(
+                claims, session, MultiDict(_query_args(scope)),
+                _base_url(scope))
+            payload, headers = await endpoint(request, **arguments)
+        body = self.dump(payload)
+        if not namespaces:
+            return body, headers, None
+
+        etag = hashlib.sha1(body).hexdigest()
+        cache.backend.set(
+            key, (body, "application/json", headers, etag), cache.ttl)
+        return body, headers, etag
+
+    def dump(self, payload):
+        """
+        Serialize a payload like the JSON responses of Flask.
+        """
+        return (self.app.json.dumps(payload) + "\n").encode()
+
+    async def call_wsgi(self, scope, receive, send):
+        """
+        Run the Flask app in the thread pool, sending the chunks of its
+        response as they are produced.
+        """
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        environ = wsgi_environ(scope, b"".join(chunks))
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor, self._run_wsgi, environ, send, loop)
+
+    def _run_wsgi(self, environ, send, loop):
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+
+        def start():
+            emit({
+                "type": "http.response.start",
+                "status": response["status"],
+                "headers": response["headers"],
+            })
+
+        result = self.app(environ, start_response)
+        try:
+            started = False
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not started:
+                    start()
+                    started = True
+                emit({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": True,
+                })
+            if not started:
+                start()
+            emit({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+
+def _query_args(scope):
+    return parse_qsl(scope["query_string"].decode("latin-1"))
+
+
+def _base_url(scope):
+    host = _header(scope, b"host")
+    if host is None:
+        server = scope.get("server") or ("localhost", 80)
+        host = f"{server[0]}:{server[1]}"
+    return (
+        f"{scope.get('scheme', 'http')}://{host}"
+        f"{scope.get('root_path', '')}{scope['path']}"
+    )
+
+
+def create_asgi_app(db_url=None, config=None):
+    """
+    Create the Flask app and wrap it in the ASGI application.
+
+    Args:
+        db_url (str): The database URL, as for create_app().
+        config (dict): Extra configuration, as for create_app().
+
+    Returns:
+        AsgiApp: The ASGI application.
+    """
+    app = create_app(db_url, config)
+    config_from_env(app, DEFAULTS)
+    url = async_database_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    options = engine_options(url, app.config)
+    if url.get_backend_name() == "sqlite":
+        # a file connection cannot be dropped, and each ping is a round
+        # trip through the thread of the aiosqlite connection
+        options["pool_pre_ping"] = False
+    engine = create_async_engine(url, **options)
+    return AsgiApp(app, engine)
@@ -0,0 +1,322 @@
+"""
+This module assigns collection requests to collection dates.
+
+A household may post a collection request without a collection date: it
+is given the earliest upcoming date of a collector allocated to its area
+that still has room (see capacity.py) and that the household has not
+requested yet.
+
+The upcoming dates are indexed in memory, per app: for each area, a heap
+of its dates ordered by day, and the capacity and places used of each
+date.
+The index is loaded from the database on first use and then kept up to
+date as dates, requests and collectors are created or deleted; the
+changes of a session are applied when it commits. Dates that passed,
+were deleted or are full leave the heap lazily, when they reach its top,
+so an assignment costs O(log n) instead of a scan of the dates.
+
+A place is reserved on the chosen date in the database before it is
+returned; when the reservation fails, the date is marked full in the
+index, which catches up with the requests of other processes that way.
+Writes of other processes are otherwise only seen when the index is
+reloaded, every ``ASSIGNMENT_INDEX_TTL`` seconds.
+"""
+
+import heapq
+import threading
+import time
+from datetime import date
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from capacity import reserve
+from db import db
+from engine_options import config_from_env
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import CollectorModel
+from models import HouseholdModel
+
+
+DEFAULTS = {
+    "ASSIGNMENT_INDEX_TTL": 300,
+}
+
+
+def init_app(app):
+    """
+    Read the assignment settings of the application.
+
+    The index itself is loaded on the first assignment.
+    """
+    config_from_env(app, DEFAULTS)
+    app.extensions["assignment_index"] = None
+
+
+class DateIndex:
+    """
+    The upcoming collection dates of each area, by day.
+
+    Attributes:
+        loaded_at (float): The monotonic time the index was loaded.
+    """
+
+    def __init__(self):
+        self.loaded_at = time.monotonic()
+        # area -> heap of (day, date id)
+        self._heaps = {}
+        # date id -> [day, area, used, capacity, in heap]
+        self._dates = {}
+        # collector id -> allocated area
+        self._areas = {}
+        self._lock = threading.Lock()
+
+    def load(self, session, today=None):
+        """
+        Fill the index with the collectors and upcoming dates of the
+        database, in two queries.
+        """
+        today = today or date.today()
+        self._areas = dict(session.execute(
+            select(CollectorModel.id, CollectorModel.allocated_area)).all())
+        rows = session.execute(
+            select(
+                CollectionDateModel.id,
+                CollectionDateModel.collection_date,
+                CollectionDateModel.collector_id,
+                CollectionDateModel.used,
+                CollectionDateModel.capacity,
+            ).where(CollectionDateModel.collection_date >= today)).all()
+        for date_id, day, collector_id, used, capacity in rows:
+            area = self._areas.get(collector_id)
+            if area is None:
+                continue
+            self._dates[date_id] = [day, area, used, capacity, used < capacity]
+            if used < capacity:
+                self._heaps.setdefault(area, []).append((day, date_id))
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+        return self
+
+    def _push(self, date_id, entry):
+        entry[4] = True
+        heapq.heappush(self._heaps.setdefault(entry[1], []), (
+            entry[0], date_id))
+
+    def add_collector(self, collector_id, area):
+        with self._lock:
+            self._areas[collector_id] = area
+
+    def remove_collector(self, collector_id):
+        with self._lock:
+            self._areas.pop(collector_id, None)
+
+    def add_date(self, date_id, day, collector_id, capacity):
+        """
+        Index a new collection date; past dates and dates of unknown
+        collectors are ignored.
+        """
+        with self._lock:
+            area = self._areas.get(collector_id)
+            if area is None or day < date.today() or date_id in self._dates:
+                return
+            entry = [day, area, 0, capacity, False]
+            self._dates[date_id] = entry
+            self._push(date_id, entry)
+
+    def remove_date(self, date_id):
+        with self._lock:
+            self._dates.pop(date_id, None)
+
+    def add_requests(self, date_id, count=1):
+        """
+        Count new requests on a date, or deleted ones when count is
+        negative. A date with room again goes back to the heap.
+        """
+        with self._lock:
+            entry = self._dates.get(date_id)
+            if entry is None:
+                return
+            entry[2] = max(0, entry[2] + count)
+            if not self._full(entry) and not entry[4]:
+                self._push(date_id, entry)
+
+    def mark_full(self, date_id):
+        """
+        Record that a date has no room left, as its reservation failed.
+        """
+        with self._lock:
+            entry = self._dates.get(date_id)
+            if entry is not None:
+                entry[2] = max(entry[2], entry[3])
+
+    @staticmethod
+    def _full(entry):
+        return entry[2] >= entry[3]
+
+    def first(self, area, skip=(), today=None):
+        """
+        Return the id of the earliest date of an area with room, leaving
+        out the ids in skip, or None.
+
+        The stale entries on top of the heap are dropped first; the heap
+        is then walked in order without popping, so only the skipped
+        dates are visited before the answer.
+        """
+        today = today or date.today()
+        with self._lock:
+            heap = self._heaps.get(area, [])
+            while heap:
+                day, date_id = heap[0]
+                entry = self._dates.get(date_id)
+                if entry is not None and day >= today:
+                    if not self._full(entry):
+                        break
+                    entry[4] = False
+                elif entry is not None:
+                    del self._dates[date_id]
+                heapq.heappop(heap)
+            # the smallest unvisited entry is always a child of a visited
+            # one
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier:
+                (day, date_id), position = heapq.heappop(frontier)
+                entry = self._dates.get(date_id)
+                if (entry is not None and not self._full(entry)
+                        and date_id not in skip):
+                    return date_id
+                for child in (2 * position + 1, 2 * position + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+            return None
+
+
+def current_index():
+    """
+    Return the date index of the current app, loading it when it is
+    missing or older than ``ASSIGNMENT_INDEX_TTL``.
+    """
+    config = current_app.config
+    index = current_app.extensions.get("assignment_index")
+    if (index is None
+            or time.monotonic() - index.loaded_at
+            > config["ASSIGNMENT_INDEX_TTL"]):
+        index = DateIndex().load(db.session)
+        current_app.extensions["assignment_index"] = index
+    return index
+
+
+def assign_collection_date(household_id):
+    """
+    Find the collection date of a new request of a household and reserve
+    a place on it.
+
+    The reservation is part of the transaction of the session, which
+    must insert the request and commit.
+
+    Args:
+        household_id (int): The ID of the household.
+
+    Returns:
+        int: The ID of the earliest upcoming collection date of a
+        collector of the area of the household with room for the
+        request, or None when there is none.
+    """
+    area = db.session.scalar(
+        select(HouseholdModel.area).where(HouseholdModel.id == household_id))
+    if area is None:
+        return None
+    today = date.today()
+    requested = set(db.session.scalars(
+        select(CollectionRequestModel.collection_date_id)
+        .join(CollectionRequestModel.collection_date)
+        .where(
+            CollectionRequestModel.household_id == household_id,
+            CollectionDateModel.collection_date >= today)))
+
+    index = current_index()
+    while True:
+        date_id = index.first(area, requested, today)
+        if date_id is None or reserve(db.session, [date_id]):
+            return date_id
+        index.mark_full(date_id)
+
+
+def record_requests(session, date_ids):
+    """
+    Count requests inserted without the ORM unit of work, such as bulk
+    inserts, once the session commits.
+
+    Args:
+        session (Session): The session inserting the requests.
+        date_ids (iterable): The collection date ID of each request.
+    """
+    changes = _changes(session)
+    for date_id in date_ids:
+        changes.append(("add_requests", date_id, 1))
+
+
+def record_dates(session, rows, collector_id, capacity):
+    """
+    Index dates inserted without the ORM unit of work once the session
+    commits.
+
+    Args:
+        session (Session): The session inserting the dates.
+        rows (iterable): The ``id`` and ``collection_date`` of each date.
+        collector_id (int): The ID of the collector of the dates.
+        capacity (int): The capacity of the dates.
+    """
+    changes = _changes(session)
+    for row in rows:
+        changes.append((
+            "add_date", row["id"], row["collection_date"], collector_id,
+            capacity))
+
+
+def _changes(session):
+    return session.info.setdefault("assignment_changes", [])
+
+
+def _recorder(change):
+    def listener(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            _changes(session).append(change(target))
+    return listener
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    changes = session.info.pop("assignment_changes", None)
+    if not changes or not has_app_context():
+        return
+    index = current_app.extensions.get("assignment_index")
+    if index is None:
+        return
+    for method, *arguments in changes:
+        getattr(index, method)(*arguments)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("assignment_changes", None)
+
+
+for _model, _event, _change in (
+        (CollectionDateModel, "after_insert", lambda target: (
+            "add_date", target.id, target.collection_date,
+            target.collector_id, target.capacity)),
+        (CollectionDateModel, "after_delete", lambda target: (
+            "remove_date", target.id)),
+        (CollectionRequestModel, "after_insert", lambda target: (
+            "add_requests", target.collection_date_id, 1)),
+        (CollectionRequestModel, "after_delete", lambda target: (
+            "add_requests", target.collection_date_id, -1)),
+        (CollectorModel, "after_insert", lambda target: (
+            "add_collector", target.id, target.allocated_area)),
+        (CollectorModel, "after_delete", lambda target: (
+            "remove_collector", target.id))):
+    event.listen(_model, _event, _recorder(_change))
@@ -0,0 +1,5 @@
+"""
+Performance benchmarks of the API.
+
+Run them with ``python -m benchmarks.run``; see the README.
+"""
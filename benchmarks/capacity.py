@@ -0,0 +1,255 @@
+"""
+Checks that collection dates keep their capacity under concurrent
+posters, and measures the posts.
+
+    python -m benchmarks.capacity --posters 200 --capacity 50
+
+Households of one area are created on a fresh SQLite file, with the
+dates of two collectors of the area. A gunicorn server with threaded
+workers runs the app, and every household posts one collection request
+at the same time, in two rounds:
+
+- ``hot``: every request names the first date, whose capacity is far
+  below the number of posters;
+- ``assign``: the requests name no date and are assigned one.
+
+After each round, the number of requests of every date is compared with
+its places used and its capacity. The summary of each round and the
+result of the checks are printed as JSON; the exit status is 1 when a
+check failed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func, select
+
+from app import create_app
+from benchmarks.concurrency import ROOT, free_port, send_request
+from benchmarks.concurrency import server_command, wait_until_listening
+from benchmarks.runner import summarize
+from db import db
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import CollectorModel
+from models import HouseholdModel
+from models import UserModel
+
+
+def prepare(app, posters, capacity, dates):
+    """
+    Create the households, two collectors and their dates.
+
+    Returns:
+        list: The household ID and access token of each poster.
+    """
+    today = date.today()
+    with app.app_context():
+        db.create_all()
+        users = [
+            UserModel(username=f"poster-{index}", password="-")
+            for index in range(posters + 2)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+        households = [
+            HouseholdModel(house_number=str(index), area="Central",
+                           user_id=user.id)
+            for index, user in enumerate(users[:posters])
+        ]
+        collectors = [
+            CollectorModel(allocated_area="Central", capacity=capacity,
+                           user_id=user.id)
+            for user in users[posters:]
+        ]
+        db.session.add_all(households + collectors)
+        db.session.flush()
+        db.session.add_all([
+            CollectionDateModel(
+                collector_id=collector.id, capacity=capacity,
+                collection_date=today + timedelta(1 + 7 * week + offset))
+            for offset, collector in enumerate(collectors)
+            for week in range(dates)
+        ])
+        db.session.commit()
+        return [
+            (household.id, create_access_token(identity=household.user_id))
+            for household in households
+        ]
+
+
+def raw_post(body, token):
+    payload = json.dumps(body).encode()
+    return (
+        f"POST /collection_requests HTTP/1.1\r\n"
+        f"Host: 127.0.0.1\r\n"
+        f"Authorization: Bearer {token}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n"
+    ).encode() + payload
+
+
+async def _post(port, request, start, latencies):
+    await start.wait()
+    began = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        status, _ = await send_request((reader, writer), request)
+    finally:
+        writer.close()
+    latencies.append(time.perf_counter() - began)
+    return status
+
+
+async def post_all(port, requests):
+    """
+    Send every request on its own connection, all at once.
+
+    Returns:
+        tuple: The status of each response and the summary of the round.
+    """
+    start = asyncio.Event()
+    latencies = []
+    tasks = [
+        asyncio.ensure_future(_post(port, request, start, latencies))
+        for request in requests
+    ]
+    await asyncio.sleep(0.1)
+    began = time.perf_counter()
+    start.set()
+    statuses = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - began
+    statuses = [
+        status if isinstance(status, int) else type(status).__name__
+        for status in statuses
+    ]
+    errors = sum(
+        1 for status in statuses
+        if not isinstance(status, int) or status not in (201, 409))
+    return statuses, summarize(latencies, elapsed, errors)
+
+
+def check(app):
+    """
+    Compare the requests of every date with its places used and capacity.
+
+    Returns:
+        dict: The number of requests, and of dates whose places used
+        differ from their requests or exceed their capacity.
+    """
+    with app.app_context():
+        requests = (
+            select(func.count(CollectionRequestModel.id))
+            .where(CollectionRequestModel.collection_date_id
+                   == CollectionDateModel.id)
+            .scalar_subquery())
+        rows = db.session.execute(select(
+            CollectionDateModel.used, CollectionDateModel.capacity,
+            requests)).all()
+        db.session.remove()
+    return {
+        "requests": sum(count for _, _, count in rows),
+        "miscounted_dates": sum(used != count for used, _, count in rows),
+        "over_capacity_dates": sum(
+            count > capacity for _, capacity, count in rows),
+    }
+
+
+def run(posters=200, capacity=50, dates=4, workers=2, threads=32):
+    """
+    Create the data, start the server and run both rounds.
+
+    Returns:
+        dict: The settings, and the summary and checks of each round.
+    """
+    directory = tempfile.mkdtemp(prefix="ecotrack-capacity-")
+    database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    app = create_app(database_url)
+    posters_tokens = prepare(app, posters, capacity, dates)
+    rounds = {
+        "hot": [
+            raw_post({"household_id": household_id, "collection_date_id": 1},
+                     token)
+            for household_id, token in posters_tokens
+        ],
+        "assign": [
+            raw_post({"household_id": household_id}, token)
+            for household_id, token in posters_tokens
+        ],
+    }
+    expected = {
+        "hot": min(posters, capacity),
+        # the requests of both rounds, within the room of all the dates
+        "assign": min(posters + min(posters, capacity),
+                      2 * dates * capacity),
+    }
+
+    port = free_port()
+    process = subprocess.Popen(
+        server_command("sync", port, workers, threads), cwd=ROOT,
+        env=dict(os.environ, DATABASE_URL=database_url,
+                 RESPONSE_CACHE_BACKEND="none"))
+    results = {}
+    try:
+        wait_until_listening(port)
+        for name, requests in rounds.items():
+            statuses, summary = asyncio.run(post_all(port, requests))
+            checks = check(app)
+            checks["expected_requests"] = expected[name]
+            checks["correct"] = (
+                checks["requests"] == expected[name]
+                and not checks["miscounted_dates"]
+                and not checks["over_capacity_dates"]
+                and not summary["errors"]
+            )
+            results[name] = {
+                "statuses": dict(Counter(map(str, statuses))),
+                "summary": summary,
+                "checks": checks,
+            }
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "posters": posters,
+        "capacity": capacity,
+        "dates": 2 * dates,
+        "workers": workers,
+        "threads": threads,
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.capacity",
+        description="Check the capacity of dates under concurrent posters.")
+    parser.add_argument("--posters", type=int, default=200)
+    parser.add_argument(
+        "--capacity", type=int, default=50, help="requests per date")
+    parser.add_argument(
+        "--dates", type=int, default=4, help="dates of each collector")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args(argv)
+    report = run(
+        args.posters, args.capacity, args.dates, args.workers, args.threads)
+    print(json.dumps(report, indent=2, sort_keys=True))
+    correct = all(
+        result["checks"]["correct"] for result in report["results"].values())
+    return 0 if correct else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
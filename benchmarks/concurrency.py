@@ -0,0 +1,252 @@
+"""
+Compares the sync server with the ASGI server under many concurrent
+clients.
+
+    python -m benchmarks.concurrency --scale 10k --clients 500
+
+Both servers are started in turn on the same seeded database: gunicorn
+with threaded workers running create_app(), then gunicorn with the same
+number of uvicorn workers running asgi:create_asgi_app(). Each client keeps
+a connection open and sends the read requests of the async routes one
+after the other for a fixed time. The response cache is disabled unless
+``--cache`` is given, so the requests reach the database. The summary of
+each server is printed as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run import SCALES, prepare_app
+from benchmarks.runner import summarize
+from benchmarks.scenarios import BenchmarkContext
+
+
+# Requests sent by the clients, with the role whose token they carry
+REQUESTS = [
+    ("/collection_dates?limit=50", "admin"),
+    ("/collection_dates/{collection_date_id}", "collector"),
+    ("/collection_requests?limit=50", "household"),
+    ("/collection_requests/{collection_request_id}", "admin"),
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def server_command(server, port, workers, threads):
+    """
+    Build the command line starting a server.
+
+    Both servers run under gunicorn, the ASGI one with uvicorn workers.
+
+    Args:
+        server (str): "sync" or "async".
+        port (int): The port to listen on.
+        workers (int): The number of worker processes.
+        threads (int): The number of threads of each sync worker.
+    """
+    command = [
+        sys.executable, "-m", "gunicorn", "--workers", str(workers),
+        "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+    ]
+    if server == "sync":
+        return command + ["--threads", str(threads), "app:create_app()"]
+    return command + [
+        "--worker-class", "uvicorn.workers.UvicornWorker",
+        "asgi:create_asgi_app()",
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"The server did not listen on port {port}")
+
+
+async def send_request(connection, request):
+    reader, writer = connection
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    close = False
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value)
+        elif name == b"connection" and value.strip().lower() == b"close":
+            close = True
+    await reader.readexactly(length)
+    return status, close
+
+
+async def _client(port, requests, deadline, offset, latencies):
+    errors = 0
+    connection = None
+    index = offset
+    while time.perf_counter() < deadline:
+        request = requests[index % len(requests)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection("127.0.0.1", port)
+            status, close = await send_request(connection, request)
+        except (OSError, asyncio.IncompleteReadError):
+            errors += 1
+            if connection is not None:
+                connection[1].close()
+            connection = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        errors += status >= 400
+        if close:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+    return errors
+
+
+async def drive(port, requests, clients, duration):
+    """
+    Keep clients busy sending requests to a server for a fixed time.
+
+    Args:
+        port (int): The port of the server.
+        requests (list): The raw HTTP requests, sent in turn.
+        clients (int): The number of concurrent clients.
+        duration (float): The number of seconds to run.
+
+    Returns:
+        dict: The summary of the run, as summarize() returns it.
+    """
+    latencies = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(*(
+        _client(port, requests, start + duration, offset, latencies)
+        for offset in range(clients)
+    ))
+    return summarize(latencies, time.perf_counter() - start, sum(errors))
+
+
+def raw_requests(context):
+    """
+    Build the raw HTTP requests of REQUESTS.
+    """
+    return [
+        (
+            f"GET {path.format(**context.ids)} HTTP/1.1\r\n"
+            f"Host: 127.0.0.1\r\n"
+            f"Authorization: Bearer {context.tokens[role]}\r\n\r\n"
+        ).encode()
+        for path, role in REQUESTS
+    ]
+
+
+def run(database_url, scale="10k", clients=500, duration=10.0, workers=2,
+        threads=32, servers=("sync", "async"), cache=False):
+    """
+    Seed the database, then start each server and drive it.
+
+    Returns:
+        dict: The run settings and the summary of each server.
+    """
+    context = BenchmarkContext(prepare_app(database_url, scale))
+    requests = raw_requests(context)
+    environment = dict(
+        os.environ, DATABASE_URL=database_url, ASGI_WSGI_THREADS=str(threads))
+    if not cache:
+        environment["RESPONSE_CACHE_BACKEND"] = "none"
+    results = {}
+    for server in servers:
+        port = free_port()
+        process = subprocess.Popen(
+            server_command(server, port, workers, threads),
+            cwd=ROOT, env=environment)
+        try:
+            wait_until_listening(port)
+            # warm up the workers and their connection pools
+            asyncio.run(drive(port, requests, workers * 4, 1.0))
+            results[server] = asyncio.run(
+                drive(port, requests, clients, duration))
+        finally:
+            process.terminate()
+            process.wait()
+    return {
+        "scale": scale,
+        "clients": clients,
+        "workers": workers,
+        "threads": threads,
+        "cache": cache,
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.concurrency",
+        description="Compare the sync and ASGI servers under concurrency.")
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument(
+        "--database-url",
+        help="database to seed and query, a temporary SQLite file by "
+             "default")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument(
+        "--duration", type=float, default=10.0,
+        help="seconds each server is driven")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument(
+        "--threads", type=int, default=32,
+        help="threads per gunicorn worker, and Flask threads of the ASGI "
+             "app")
+    parser.add_argument(
+        "--server", choices=("sync", "async"), action="append",
+        help="server to drive, both by default")
+    parser.add_argument(
+        "--cache", action="store_true",
+        help="keep the response cache, which otherwise answers every "
+             "request after the first one")
+    parser.add_argument("--output", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if database_url is None:
+        directory = tempfile.mkdtemp(prefix="ecotrack-bench-")
+        database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+    report = run(
+        database_url, args.scale, args.clients, args.duration, args.workers,
+        args.threads, args.server or ("sync", "async"), args.cache)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
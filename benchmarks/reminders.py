@@ -0,0 +1,91 @@
+"""
+Measures the throughput and memory of the reminder fan-out.
+
+    python -m benchmarks.reminders --households 50000 --requests 60000
+
+A fresh SQLite file is seeded with one collection date per collector,
+all moved to the same day, so every seeded request is on that day and
+some households have several. The reminders of the day are then sent
+to a file transport. The number of reminders, the time, the reminders
+per minute and the peak of the memory allocated by Python during the run
+are printed as JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import update
+
+from app import create_app
+from db import db
+from models import CollectionDateModel
+from notifications import FileTransport, send_reminders
+from seeding import seed
+
+
+def run(households=50_000, requests=60_000, collectors=50, chunk_size=1000):
+    """
+    Seed the day and send its reminders.
+
+    Returns:
+        dict: The settings and the measures of the run.
+    """
+    directory = tempfile.mkdtemp(prefix="ecotrack-reminders-")
+    app = create_app(
+        f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        config={"REMINDER_CHUNK_SIZE": chunk_size})
+    day = date.today() + timedelta(days=1)
+    path = os.path.join(directory, "notifications.ndjson")
+    with app.app_context():
+        db.create_all()
+        seed(households=households, collectors=collectors,
+             dates_per_collector=1, requests=requests, capacity=requests,
+             start=day)
+        db.session.execute(
+            update(CollectionDateModel).values(collection_date=day))
+        db.session.commit()
+        db.session.remove()
+
+        tracemalloc.start()
+        began = time.perf_counter()
+        result = send_reminders(day=day, transport=FileTransport(path))
+        elapsed = time.perf_counter() - began
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "households": households,
+        "requests": requests,
+        "chunk_size": chunk_size,
+        "python": platform.python_version(),
+        "reminders": result["sent"],
+        "seconds": round(elapsed, 3),
+        "reminders_per_minute": round(result["sent"] / elapsed * 60),
+        "peak_memory_kib": round(peak / 1024),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.reminders",
+        description="Measure the reminder fan-out.")
+    parser.add_argument("--households", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=60_000)
+    parser.add_argument("--collectors", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(
+        args.households, args.requests, args.collectors, args.chunk_size),
+        indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Command line entry point of the benchmarks.
+
+    python -m benchmarks.run --scale 10k
+    python -m benchmarks.run --scale 100k --mode load --workers 8
+    python -m benchmarks.run --mode load --url http://localhost:8000 \\
+        --database-url postgresql://.../ecotrack
+
+The database is seeded when it holds fewer collection requests than the
+scale asks for. The results are printed as JSON and compared with the
+baseline of the scale and mode; the exit status is 1 when a scenario
+regressed by more than the threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+
+from sqlalchemy import func, select
+
+from app import create_app
+from benchmarks.runner import compare, run_client, run_load
+from benchmarks.scenarios import SCENARIOS, BenchmarkContext
+from db import db
+from models import CollectionRequestModel
+from seeding import seed
+
+
+# Arguments of seed() for each data volume
+SCALES = {
+    "smoke": {"households": 20, "collectors": 7, "dates_per_collector": 4,
+              "requests": 100},
+    "10k": {"households": 1000, "collectors": 50, "dates_per_collector": 52,
+            "requests": 10_000},
+    "100k": {"households": 10_000, "collectors": 200,
+             "dates_per_collector": 104, "requests": 100_000},
+    "1m": {"households": 50_000, "collectors": 500,
+           "dates_per_collector": 208, "requests": 1_000_000},
+}
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def baseline_path(scale, mode):
+    """
+    Return the path of the baseline stored for a scale and a mode.
+    """
+    return os.path.join(BASELINES, f"{scale}-{mode}.json")
+
+
+def prepare_app(database_url, scale):
+    """
+    Create the app on the benchmark database and seed it if needed.
+
+    Returns:
+        Flask: The application.
+    """
+    app = create_app(database_url)
+    with app.app_context():
+        db.create_all()
+        existing = db.session.scalar(
+            select(func.count()).select_from(CollectionRequestModel))
+        if existing < SCALES[scale]["requests"]:
+            seed(**SCALES[scale])
+    return app
+
+
+def run(database_url, scale="10k", mode="client", only=None,
+        iterations=200, warmup=10, workers=4, duration=5.0, url=None):
+    """
+    Seed the database and run the scenarios.
+
+    Returns:
+        dict: The run settings and the summary of each scenario.
+    """
+    app = prepare_app(database_url, scale)
+    context = BenchmarkContext(app)
+    scenarios = [
+        scenario for scenario in SCENARIOS
+        if only is None or only in scenario.name
+    ]
+    if mode == "client":
+        results = run_client(context, scenarios, iterations, warmup)
+    else:
+        results = run_load(context, scenarios, workers, duration, url)
+    return {
+        "scale": scale,
+        "mode": mode,
+        "workers": workers if mode == "load" else 1,
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark every route of the API.")
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument(
+        "--database-url",
+        help="database to seed and query, a temporary SQLite file by "
+             "default")
+    parser.add_argument(
+        "--mode", choices=("client", "load"), default="client",
+        help="sequential test client requests, or concurrent workers")
+    parser.add_argument(
+        "--url", help="base URL of a running server, for the load mode")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--duration", type=float, default=5.0,
+        help="seconds per scenario in load mode")
+    parser.add_argument(
+        "--iterations", type=int, default=200,
+        help="requests per scenario in client mode")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--only", help="run the scenarios whose name contains this text")
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument(
+        "--baseline", help="baseline to compare with, by default the one "
+                           "stored for the scale and mode")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25,
+        help="tolerated relative regression (default 0.25)")
+    parser.add_argument(
+        "--update-baseline", action="store_true",
+        help="store the results as the baseline")
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if database_url is None:
+        directory = tempfile.mkdtemp(prefix="ecotrack-bench-")
+        database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+    report = run(
+        database_url, args.scale, args.mode, args.only, args.iterations,
+        args.warmup, args.workers, args.duration, args.url)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+    path = args.baseline or baseline_path(args.scale, args.mode)
+    if args.update_baseline:
+        if args.only and os.path.exists(path):
+            # only the scenarios run are replaced
+            with open(path) as file:
+                baseline = json.load(file)
+            baseline["results"].update(report["results"])
+            output = json.dumps(baseline, indent=2, sort_keys=True)
+        with open(path, "w") as file:
+            file.write(output + "\n")
+        return 0
+    if not os.path.exists(path):
+        print(f"No baseline at {path}", file=sys.stderr)
+        return 0
+    with open(path) as file:
+        baseline = json.load(file)
+    regressions = compare(
+        baseline["results"], report["results"], args.threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Runs the scenarios and measures their latency and throughput.
+
+Two drivers are available: ``run_client`` sends the requests one after
+the other through the Flask test client, measuring the cost of the app
+alone; ``run_load`` keeps several workers busy for a fixed time, either
+through the test client or against a running server.
+"""
+
+import http.client
+import json
+import math
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(latencies, rank):
+    """
+    Return a percentile of sorted latencies, by nearest rank.
+    """
+    if not latencies:
+        return 0.0
+    index = max(math.ceil(rank / 100 * len(latencies)) - 1, 0)
+    return latencies[index]
+
+
+def summarize(latencies, elapsed, errors):
+    """
+    Summarize the latencies of a scenario.
+
+    Args:
+        latencies (list): The latency of each request, in seconds.
+        elapsed (float): The wall time of the run, in seconds.
+        errors (int): The number of requests answered with an error.
+
+    Returns:
+        dict: The request count, the p50, p95 and p99 latencies in
+        milliseconds, the requests per second and the error count.
+    """
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "errors": errors,
+    }
+
+
+class ClientTransport:
+    """
+    Sends requests through the Flask test client.
+    """
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method, path, body, headers):
+        response = self.client.open(
+            path, method=method, json=body, headers=headers)
+        # streamed responses are only produced while they are read
+        response.get_data()
+        return response.status_code
+
+
+class HTTPTransport:
+    """
+    Sends requests to a running server over a kept-alive connection.
+    """
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.prefix = parts.path.rstrip("/")
+        self.connection = http.client.HTTPConnection(
+            parts.hostname, parts.port or 80)
+
+    def send(self, method, path, body, headers):
+        headers = dict(headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        self.connection.request(
+            method, self.prefix + path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+
+def _timed(transport, scenario, context, iteration):
+    path, body, headers = scenario.build(context, iteration)
+    start = time.perf_counter()
+    status = transport.send(scenario.method, path, body, headers)
+    return time.perf_counter() - start, status >= 400
+
+
+def run_client(context, scenarios, iterations=200, warmup=10):
+    """
+    Send each scenario sequentially through the test client.
+
+    Args:
+        context (BenchmarkContext): The seeded data.
+        scenarios (list): The scenarios to run.
+        iterations (int): The number of timed requests per scenario.
+        warmup (int): The number of untimed requests sent first.
+
+    Returns:
+        dict: The summary of each scenario, by name.
+    """
+    transport = ClientTransport(context.app)
+    results = {}
+    for scenario in scenarios:
+        for iteration in range(warmup):
+            _timed(transport, scenario, context, iteration)
+        latencies = []
+        errors = 0
+        elapsed = 0.0
+        for iteration in range(warmup, warmup + iterations):
+            latency, failed = _timed(transport, scenario, context, iteration)
+            latencies.append(latency)
+            elapsed += latency
+            errors += failed
+        results[scenario.name] = summarize(latencies, elapsed, errors)
+    return results
+
+
+def run_load(context, scenarios, workers=4, duration=5.0, url=None):
+    """
+    Keep several workers sending each scenario for a fixed time.
+
+    Args:
+        context (BenchmarkContext): The seeded data.
+        scenarios (list): The scenarios to run.
+        workers (int): The number of concurrent workers.
+        duration (float): The number of seconds each scenario runs.
+        url (str): The base URL of a running server; the test client is
+        used when None.
+
+    Returns:
+        dict: The summary of each scenario, by name.
+    """
+    results = {}
+    counter = iter(range(10 ** 12))
+    counter_lock = threading.Lock()
+
+    def next_iteration():
+        with counter_lock:
+            return next(counter)
+
+    for scenario in scenarios:
+        latencies = []
+        errors = []
+        deadline = time.perf_counter() + duration
+
+        def work():
+            if url is None:
+                transport = ClientTransport(context.app)
+            else:
+                transport = HTTPTransport(url)
+            own_latencies = []
+            own_errors = 0
+            while time.perf_counter() < deadline:
+                latency, failed = _timed(
+                    transport, scenario, context, next_iteration())
+                own_latencies.append(latency)
+                own_errors += failed
+            latencies.extend(own_latencies)
+            errors.append(own_errors)
+
+        threads = [threading.Thread(target=work) for _ in range(workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results[scenario.name] = summarize(
+            latencies, time.perf_counter() - start, sum(errors))
+    return results
+
+
+def compare(baseline, results, threshold=0.25, min_delta_ms=1.0):
+    """
+    Find the scenarios that regressed against a baseline.
+
+    A scenario regresses when its p95 latency grows by more than
+    ``threshold`` or when its throughput drops by more than ``threshold``.
+    Either change must also cost more than ``min_delta_ms`` per request,
+    so that timer noise on sub-millisecond routes is ignored. A scenario
+    missing from the baseline is reported too, as it could never regress.
+
+    Args:
+        baseline (dict): The summaries of the baseline, by name.
+        results (dict): The summaries of the run, by name.
+        threshold (float): The tolerated relative change.
+        min_delta_ms (float): The smallest latency change reported.
+
+    Returns:
+        list: A message per regression or missing baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            regressions.append(f"{name}: no baseline")
+            continue
+        p95, base_p95 = result["p95_ms"], base["p95_ms"]
+        if (p95 > base_p95 * (1 + threshold)
+                and p95 - base_p95 > min_delta_ms):
+            regressions.append(
+                f"{name}: p95 {p95}ms, baseline {base_p95}ms")
+        rps, base_rps = result["rps"], base["rps"]
+        if (rps < base_rps * (1 - threshold)
+                and 1000 / max(rps, 1e-9) - 1000 / base_rps > min_delta_ms):
+            regressions.append(
+                f"{name}: {rps} req/s, baseline {base_rps} req/s")
+    return regressions
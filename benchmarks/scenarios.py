@@ -0,0 +1,343 @@
+"""
+The requests sent by the benchmarks, one scenario per route.
+
+A scenario names the route it drives, the role of the caller and how to
+build the body. Routes that consume a row (deletes, profile creation)
+get a fresh row from ``prepare``, which runs outside of the timed part.
+"""
+
+import re
+import uuid
+from datetime import date, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, select
+
+from db import db
+from jobs import enqueue, run
+from models import AdminModel
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import CollectorModel
+from models import HouseholdModel
+from models import UserModel
+from seeding import DEFAULT_PASSWORD
+
+
+class BenchmarkContext:
+    """
+    The seeded rows and the tokens the scenarios use.
+
+    Attributes:
+        app (Flask): The application.
+        ids (dict): The IDs filling the route arguments.
+        username (str): The username of the household user.
+        collection_dates (list): IDs of dates of the collector.
+        collection_requests (list): IDs of requests on these dates.
+        tokens (dict): An access token per role.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        with app.app_context():
+            request = db.session.execute(
+                select(
+                    CollectionRequestModel.household_id,
+                    CollectionDateModel.collector_id)
+                .join(CollectionRequestModel.collection_date)
+                .order_by(CollectionRequestModel.id).limit(1)).one()
+            household = db.session.execute(
+                select(HouseholdModel.id, HouseholdModel.user_id)
+                .where(HouseholdModel.id == request.household_id)).one()
+            collector = db.session.execute(
+                select(CollectorModel.id, CollectorModel.user_id)
+                .where(CollectorModel.id == request.collector_id)).one()
+            admin = db.session.execute(
+                select(AdminModel.id, AdminModel.user_id)
+                .order_by(AdminModel.id).limit(1)).one()
+            self.username = db.session.get(
+                UserModel, household.user_id).username
+            self.collection_dates = list(db.session.scalars(
+                select(CollectionDateModel.id)
+                .where(CollectionDateModel.collector_id == collector.id)
+                .order_by(CollectionDateModel.id).limit(10)))
+            self.collection_requests = list(db.session.scalars(
+                select(CollectionRequestModel.id)
+                .where(CollectionRequestModel.collection_date_id.in_(
+                    self.collection_dates))
+                .order_by(CollectionRequestModel.id).limit(20)))
+            self.ids = {
+                "user_id": household.user_id,
+                "admin_id": admin.id,
+                "household_id": household.id,
+                "collector_id": collector.id,
+                "collection_date_id": self.collection_dates[0],
+                "collection_request_id": self.collection_requests[0],
+                "job_id": self.export_job(admin.user_id),
+            }
+            self.tokens = {
+                "admin": self.token(admin.user_id),
+                "household": self.token(household.user_id),
+                "collector": self.token(collector.user_id),
+            }
+            self.password_hash = db.session.get(
+                UserModel, household.user_id).password
+
+    def export_job(self, user_id):
+        """
+        Queue an export of a week and run it, for the job routes.
+
+        Returns:
+            int: The ID of the job.
+        """
+        job = enqueue("export", {"format": "ndjson", "from": _future(0),
+                                 "to": _future(6)}, user_id=user_id)
+        run(job)
+        return job.id
+
+    def token(self, user_id):
+        """
+        Create an access token; the claims are filled by the app.
+        """
+        with self.app.app_context():
+            return create_access_token(identity=user_id)
+
+    def insert(self, model, **values):
+        """
+        Insert a row outside of the ORM.
+
+        Returns:
+            int: The ID of the row.
+        """
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                return connection.execute(
+                    insert(model).values(**values).returning(model.id)
+                ).scalar_one()
+
+    def new_user(self):
+        """
+        Insert a user without a role.
+
+        Returns:
+            int: The ID of the user.
+        """
+        return self.insert(
+            UserModel, username=f"bench-{uuid.uuid4().hex}",
+            password=self.password_hash)
+
+
+class Scenario:
+    """
+    A request sent repeatedly to one route.
+
+    Attributes:
+        method (str): The HTTP method.
+        rule (str): The route, as registered in the app.
+        role (str): The role whose token is sent, None for no token.
+        body (callable): Build the JSON body from the context, the
+        iteration number and the prepared values.
+        prepare (callable): Build extra values from the context and the
+        iteration number, outside of the timing. A "token" value replaces
+        the token of the role.
+        query (str): The query string.
+    """
+
+    def __init__(self, method, rule, role=None, body=None, prepare=None,
+                 query=None):
+        self.method = method
+        self.rule = rule
+        self.role = role
+        self.body = body
+        self.prepare = prepare
+        self.query = query
+
+    @property
+    def name(self):
+        return f"{self.method} {self.rule}"
+
+    def build(self, context, iteration):
+        """
+        Build one request.
+
+        Returns:
+            tuple: The path, the JSON body and the headers.
+        """
+        values = dict(context.ids)
+        if self.prepare is not None:
+            values.update(self.prepare(context, iteration))
+        path = re.sub(
+            r"<(?:\w+:)?(\w+)>", lambda match: str(values[match[1]]),
+            self.rule)
+        if self.query:
+            path = f"{path}?{self.query}"
+        body = None
+        if self.body is not None:
+            body = self.body(context, iteration, values)
+        headers = {}
+        token = values.get("token")
+        if token is None and self.role is not None:
+            token = context.tokens[self.role]
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        return path, body, headers
+
+
+def _future(days):
+    return (date.today() + timedelta(days=days)).isoformat()
+
+
+def _fresh_user_token(context, iteration):
+    return {"token": context.token(context.new_user())}
+
+
+def _new_admin(context, iteration):
+    return {"admin_id": context.insert(
+        AdminModel, user_id=context.new_user())}
+
+
+def _new_household(context, iteration):
+    return {"household_id": context.insert(
+        HouseholdModel, house_number="1", area="Central",
+        user_id=context.new_user())}
+
+
+def _new_collector(context, iteration):
+    return {"collector_id": context.insert(
+        CollectorModel, allocated_area="Central",
+        user_id=context.new_user())}
+
+
+def _new_collection_date(context, iteration):
+    return {"collection_date_id": context.insert(
+        CollectionDateModel, collection_date=date.today(),
+        collector_id=context.ids["collector_id"])}
+
+
+def _new_collection_request(context, iteration):
+    return {"collection_request_id": context.insert(
+        CollectionRequestModel, status="pending",
+        household_id=context.ids["household_id"],
+        collection_date_id=context.ids["collection_date_id"])}
+
+
+def _export_query():
+    start = date.today()
+    return (
+        f"format=ndjson&from={start.isoformat()}"
+        f"&to={(start + timedelta(days=6)).isoformat()}"
+    )
+
+
+SCENARIOS = [
+    Scenario(
+        "POST", "/register",
+        body=lambda context, i, values: {
+            "username": f"bench-{uuid.uuid4().hex}",
+            "password": DEFAULT_PASSWORD,
+        }),
+    Scenario(
+        "POST", "/login",
+        body=lambda context, i, values: {
+            "username": context.username, "password": DEFAULT_PASSWORD,
+        }),
+    Scenario("GET", "/users/<user_id>"),
+    Scenario(
+        "DELETE", "/users/<user_id>", "admin",
+        prepare=lambda context, i: {"user_id": context.new_user()}),
+    Scenario("GET", "/admins", "admin"),
+    Scenario("POST", "/admins", prepare=_fresh_user_token),
+    Scenario("GET", "/admins/<int:admin_id>", "admin"),
+    Scenario(
+        "DELETE", "/admins/<int:admin_id>", "admin", prepare=_new_admin),
+    Scenario("GET", "/households", "admin"),
+    Scenario(
+        "POST", "/households", prepare=_fresh_user_token,
+        body=lambda context, i, values: {
+            "house_number": str(i), "area": "Central",
+        }),
+    Scenario("GET", "/households/<household_id>", "admin"),
+    Scenario(
+        "DELETE", "/households/<household_id>", "admin",
+        prepare=_new_household),
+    Scenario("GET", "/collectors", "admin"),
+    Scenario(
+        "POST", "/collectors", prepare=_fresh_user_token,
+        body=lambda context, i, values: {"allocated_area": "Central"}),
+    Scenario(
+        "GET", "/collectors/me/schedule", "collector",
+        query=f"from={_future(0)}&to={_future(27)}"),
+    Scenario("GET", "/collectors/<collector_id>", "admin"),
+    Scenario(
+        "DELETE", "/collectors/<collector_id>", "admin",
+        prepare=_new_collector),
+    Scenario("GET", "/collection_dates", "admin"),
+    Scenario(
+        "POST", "/collection_dates", "collector",
+        body=lambda context, i, values: {"date": _future(5000 + i)}),
+    Scenario(
+        "POST", "/collection_dates/bulk", "collector",
+        body=lambda context, i, values: {
+            "dates": [_future(10000 + i * 7 + day) for day in range(7)],
+        }),
+    Scenario(
+        "GET", "/collection_dates/<collection_date_id>", "collector"),
+    Scenario(
+        "DELETE", "/collection_dates/<collection_date_id>", "admin",
+        prepare=_new_collection_date),
+    Scenario(
+        "POST", "/collection_dates/rebalance", "admin",
+        body=lambda context, i, values: {"window": 7}),
+    Scenario(
+        "POST", "/collection_dates/reminders", "admin",
+        body=lambda context, i, values: {"day": _future(1)}),
+    Scenario("GET", "/collection_requests", "admin"),
+    Scenario(
+        "POST", "/collection_requests", "household",
+        # a new date each time, as the dates take a limited number of
+        # requests
+        prepare=_new_collection_date,
+        body=lambda context, i, values: {
+            "household_id": values["household_id"],
+            "collection_date_id": values["collection_date_id"],
+        }),
+    Scenario(
+        "POST", "/collection_requests/bulk", "household",
+        body=lambda context, i, values: {
+            "requests": [
+                {"collection_date_id": date_id}
+                for date_id in context.collection_dates
+            ],
+        }),
+    Scenario(
+        "PATCH", "/collection_requests/status", "collector",
+        body=lambda context, i, values: {
+            "updates": [
+                {"id": request_id,
+                 "status": "collected" if i % 2 else "pending"}
+                for request_id in context.collection_requests
+            ],
+        }),
+    Scenario(
+        "GET", "/collection_requests/export", "admin",
+        query=_export_query()),
+    Scenario(
+        "POST", "/collection_requests/export", "admin",
+        body=lambda context, i, values: {
+            "format": "ndjson", "from": _future(0), "to": _future(6),
+        }),
+    Scenario(
+        "GET", "/collection_requests/<collection_request_id>", "admin"),
+    Scenario(
+        "DELETE", "/collection_requests/<collection_request_id>",
+        "household", prepare=_new_collection_request),
+    Scenario("GET", "/stats/collections", "admin"),
+    Scenario(
+        "POST", "/stats/collections", "admin",
+        body=lambda context, i, values: {"bucket": "week"}),
+    Scenario("GET", "/jobs", "admin"),
+    Scenario("GET", "/jobs/<int:job_id>", "admin"),
+    Scenario("GET", "/jobs/<int:job_id>/file", "admin"),
+    Scenario("GET", "/health/db"),
+    Scenario("GET", "/metrics"),
+]
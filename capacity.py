@@ -0,0 +1,226 @@
+"""
+This module keeps collection dates within their capacity.
+
+Each collection date takes at most ``capacity`` collection requests,
+copied from the capacity of its collector when the date is created. The
+``used`` column counts the requests of the date. A request reserves its
+place before it is inserted, with a single conditional UPDATE:
+
+    UPDATE collection_dates SET used = used + 1
+    WHERE id = :id AND used < capacity
+
+so concurrent posters, in any number of workers, can never push a date
+over its capacity: the database serializes the updates of a row and the
+condition is checked by each of them. The reservation belongs to the
+transaction of the request and is undone with it.
+
+Dates can still hold more requests than their capacity when the
+capacity is lowered or for requests made before it existed.
+``flask rebalance`` moves the pending requests over the capacity to the
+nearest dates of the same area with room, whichever collector of the
+area they belong to.
+"""
+
+from datetime import date, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, update
+
+from db import db
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import CollectorModel
+from response_cache import current_cache
+
+
+def reserve(session, date_ids):
+    """
+    Reserve one request on each of several collection dates.
+
+    Args:
+        session (Session): The session of the transaction inserting the
+        requests.
+        date_ids (iterable): The IDs of the collection dates.
+
+    Returns:
+        set: The IDs of the dates reserved; the others are full or do not
+        exist.
+    """
+    date_ids = set(date_ids)
+    if not date_ids:
+        return set()
+    return set(session.scalars(
+        update(CollectionDateModel)
+        .where(
+            CollectionDateModel.id.in_(date_ids),
+            CollectionDateModel.used < CollectionDateModel.capacity)
+        .values(used=CollectionDateModel.used + 1)
+        .returning(CollectionDateModel.id),
+        execution_options={"synchronize_session": False}))
+
+
+def release(session, date_id, count=1):
+    """
+    Give back the places of deleted or moved requests of a date.
+
+    Args:
+        session (Session): The session of the transaction removing the
+        requests.
+        date_id (int): The ID of the collection date.
+        count (int): The number of places.
+    """
+    session.execute(
+        update(CollectionDateModel)
+        .where(
+            CollectionDateModel.id == date_id,
+            CollectionDateModel.used >= count)
+        .values(used=CollectionDateModel.used - count),
+        execution_options={"synchronize_session": False})
+
+
+def collector_capacity(session, collector_id):
+    """
+    Return the capacity new dates of a collector take.
+    """
+    return session.scalar(
+        select(CollectorModel.capacity).where(
+            CollectorModel.id == collector_id))
+
+
+def rebalance(area=None, window=14, today=None):
+    """
+    Move the pending requests over the capacity of upcoming dates to the
+    nearest dates of the same area with room.
+
+    Dates are handled earliest first; the requests made last leave a
+    date first. A request moves to the date of the area closest in time,
+    within ``window`` days, that has room and that its household has not
+    requested yet, ties going to the earlier date. Requests that find no
+    such date stay where they are. Each overflowing date is handled in
+    its own transaction, and places are reserved as posters do, so the
+    job can run while the API serves requests.
+
+    Must run inside an app context.
+
+    Args:
+        area (str): Only rebalance this area; every area when None.
+        window (int): The number of days a request may move.
+        today (date): The first date handled, today by default.
+
+    Returns:
+        dict: The number of requests moved and of requests left over
+        the capacity.
+    """
+    today = today or date.today()
+    session = db.session
+    upcoming = (
+        select(
+            CollectionDateModel.id,
+            CollectionDateModel.collection_date,
+            CollectorModel.allocated_area,
+        )
+        .join(CollectionDateModel.collector)
+        .where(CollectionDateModel.collection_date >= today)
+    )
+    if area is not None:
+        upcoming = upcoming.where(CollectorModel.allocated_area == area)
+    overflowing = session.execute(
+        upcoming.add_columns(
+            CollectionDateModel.used - CollectionDateModel.capacity)
+        .where(CollectionDateModel.used > CollectionDateModel.capacity)
+        .order_by(CollectionDateModel.collection_date, CollectionDateModel.id)
+    ).all()
+
+    moved = left = 0
+    for date_id, day, date_area, excess in overflowing:
+        requests = session.execute(
+            select(
+                CollectionRequestModel.id,
+                CollectionRequestModel.household_id)
+            .where(
+                CollectionRequestModel.collection_date_id == date_id,
+                CollectionRequestModel.status == "pending")
+            .order_by(CollectionRequestModel.id.desc())
+            .limit(excess)).all()
+        neighbours = session.execute(
+            select(
+                CollectionDateModel.id, CollectionDateModel.collection_date)
+            .join(CollectionDateModel.collector)
+            .where(
+                CollectorModel.allocated_area == date_area,
+                CollectionDateModel.id != date_id,
+                CollectionDateModel.collection_date.between(
+                    max(today, day - timedelta(window)),
+                    day + timedelta(window)),
+                CollectionDateModel.used < CollectionDateModel.capacity)
+        ).all()
+        neighbours.sort(key=lambda row: (abs(row[1] - day), row[1], row[0]))
+        moved_here = _move(
+            session, requests, date_id, [row[0] for row in neighbours])
+        moved += moved_here
+        left += excess - moved_here
+
+    if moved:
+        current_app.extensions["assignment_index"] = None
+        cache = current_cache()
+        cache.invalidate("collection_requests")
+        cache.invalidate("collection_dates")
+    return {"moved": moved, "left": left}
+
+
+def _move(session, requests, date_id, targets):
+    """
+    Move requests of a date to the first of the target dates with room,
+    in one transaction.
+
+    Returns:
+        int: The number of requests moved.
+    """
+    requested = set(map(tuple, session.execute(
+        select(
+            CollectionRequestModel.household_id,
+            CollectionRequestModel.collection_date_id)
+        .where(
+            CollectionRequestModel.household_id.in_(
+                {household_id for _, household_id in requests}),
+            CollectionRequestModel.collection_date_id.in_(targets)))))
+    full = set()
+    moved = 0
+    for request_id, household_id in requests:
+        for target_id in targets:
+            if target_id in full or (household_id, target_id) in requested:
+                continue
+            if not reserve(session, [target_id]):
+                full.add(target_id)
+                continue
+            session.execute(
+                update(CollectionRequestModel)
+                .where(CollectionRequestModel.id == request_id)
+                .values(collection_date_id=target_id),
+                execution_options={"synchronize_session": False})
+            requested.add((household_id, target_id))
+            moved += 1
+            break
+    if moved:
+        release(session, date_id, moved)
+    session.commit()
+    return moved
+
+
+@click.command("rebalance")
+@click.option("--area", help="Only rebalance this area.")
+@click.option(
+    "--window", default=14, show_default=True,
+    help="Number of days a request may move.")
+@with_appcontext
+def rebalance_command(area, window):
+    """
+    Move the requests over the capacity of upcoming collection dates to
+    neighbouring dates of their area.
+    """
+    result = rebalance(area=area, window=window)
+    click.echo(
+        f"Moved {result['moved']} requests, {result['left']} left over "
+        "capacity")
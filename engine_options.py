@@ -0,0 +1,155 @@
+"""
+This module configures the SQLAlchemy engine of the application.
+
+The options are read from the app config, falling back to the environment
+variable of the same name:
+
+- ``DB_POOL_SIZE``: connections kept open per worker (default 5)
+- ``DB_MAX_OVERFLOW``: extra connections opened under load (default 10)
+- ``DB_POOL_TIMEOUT``: seconds to wait for a free connection (default 30)
+- ``DB_POOL_RECYCLE``: seconds after which a connection is replaced
+  (default 1800)
+- ``DB_POOL_PRE_PING``: test connections before use, "1" or "0"
+  (default on), so connections dropped by a failover are replaced
+- ``DB_STATEMENT_TIMEOUT``: milliseconds a Postgres statement may run
+  (default 0, no limit)
+
+Pool sizes only apply to servers; SQLite keeps the pool chosen by
+Flask-SQLAlchemy. Connections inherited through a fork (gunicorn with
+``preload_app``) are dropped in the child so workers never share them.
+"""
+
+import os
+import time
+import weakref
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from db import db
+
+
+DEFAULTS = {
+    "DB_POOL_SIZE": 5,
+    "DB_MAX_OVERFLOW": 10,
+    "DB_POOL_TIMEOUT": 30,
+    "DB_POOL_RECYCLE": 1800,
+    "DB_POOL_PRE_PING": True,
+    "DB_STATEMENT_TIMEOUT": 0,
+}
+
+_apps = weakref.WeakSet()
+
+
+def _from_env(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes", "on")
+    return type(default)(value)
+
+
+def config_from_env(app, defaults):
+    """
+    Set the missing settings of the app config from the environment
+    variable of the same name, or from their default.
+
+    Args:
+        app (Flask): The application.
+        defaults (dict): The default of each setting; its type is used to
+        parse the environment variable.
+    """
+    for name, default in defaults.items():
+        app.config.setdefault(name, _from_env(name, default))
+
+
+def engine_options(uri, config):
+    """
+    Build the keyword arguments of create_engine() for a database URI.
+
+    Args:
+        uri (str): The database URI.
+        config (dict): The DB_* settings.
+
+    Returns:
+        dict: The engine options.
+    """
+    url = make_url(uri)
+    options = {"pool_pre_ping": config["DB_POOL_PRE_PING"]}
+    if url.get_backend_name() == "sqlite":
+        return options
+
+    options.update(
+        pool_size=config["DB_POOL_SIZE"],
+        max_overflow=config["DB_MAX_OVERFLOW"],
+        pool_timeout=config["DB_POOL_TIMEOUT"],
+        pool_recycle=config["DB_POOL_RECYCLE"],
+    )
+    if url.get_backend_name() == "postgresql":
+        if config["DB_STATEMENT_TIMEOUT"]:
+            timeout = config["DB_STATEMENT_TIMEOUT"]
+            if url.get_driver_name() == "asyncpg":
+                # asyncpg takes no libpq "options" string
+                options["connect_args"] = {
+                    "server_settings": {"statement_timeout": str(timeout)}
+                }
+            else:
+                options["connect_args"] = {
+                    "options": f"-c statement_timeout={timeout}"
+                }
+    return options
+
+
+def init_app(app):
+    """
+    Fill SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings.
+
+    Must run before db.init_app(). Options already present in
+    SQLALCHEMY_ENGINE_OPTIONS take precedence.
+    """
+    config_from_env(app, DEFAULTS)
+    options = engine_options(app.config["SQLALCHEMY_DATABASE_URI"], app.config)
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    _apps.add(app)
+
+
+def _dispose_after_fork():
+    for app in list(_apps):
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def pool_status(engine):
+    """
+    Report the checkout statistics of the pool of an engine.
+
+    Returns:
+        dict: The pool class and, for queue pools, its size and the
+        number of connections checked in, checked out and in overflow.
+    """
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            status[name] = method()
+    return status
+
+
+def check_database():
+    """
+    Run a trivial query and time it.
+
+    Returns:
+        float: The round trip in milliseconds.
+    """
+    start = time.perf_counter()
+    with db.engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return (time.perf_counter() - start) * 1000
@@ -0,0 +1,144 @@
+"""
+This module checks that the queries run by the resources use the indexes
+declared on the models.
+
+The check runs ``EXPLAIN QUERY PLAN`` on SQLite and ``EXPLAIN`` on Postgres
+and looks for the expected index names in the plan. It is exposed as the
+``flask check-indexes`` command.
+"""
+
+from datetime import date
+
+import click
+from sqlalchemy import select
+
+from db import db
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import CollectorModel
+from schedule import schedule_statement
+
+
+# (description, statement, indexes any of which the plan must use)
+INDEXED_QUERIES = (
+    (
+        "collection dates of a collector",
+        select(CollectionDateModel).where(
+            CollectionDateModel.collector_id == 1),
+        (
+            "ix_collection_dates_collector_id",
+            "ix_collection_dates_collector_id_collection_date",
+        ),
+    ),
+    (
+        "collection dates of a collector in a range",
+        select(CollectionDateModel).where(
+            CollectionDateModel.collector_id == 1,
+            CollectionDateModel.collection_date.between(
+                date(2024, 1, 1), date(2024, 1, 31))),
+        ("ix_collection_dates_collector_id_collection_date",),
+    ),
+    (
+        "collection dates in a range",
+        select(CollectionDateModel).where(
+            CollectionDateModel.collection_date.between(
+                date(2024, 1, 1), date(2024, 1, 31))),
+        ("ix_collection_dates_collection_date",),
+    ),
+    (
+        "collection requests of a household",
+        select(CollectionRequestModel).where(
+            CollectionRequestModel.household_id == 1),
+        (
+            "ix_collection_requests_household_id",
+            "ix_collection_requests_household_id_status",
+        ),
+    ),
+    (
+        "collection requests of a household by status",
+        select(CollectionRequestModel).where(
+            CollectionRequestModel.household_id == 1,
+            CollectionRequestModel.status == "pending"),
+        ("ix_collection_requests_household_id_status",),
+    ),
+    (
+        "collection requests of collection dates",
+        select(CollectionRequestModel).where(
+            CollectionRequestModel.collection_date_id.in_([1, 2, 3])),
+        ("ix_collection_requests_collection_date_id",),
+    ),
+    (
+        "route sheet of a collector",
+        schedule_statement(1, date(2024, 1, 1), date(2024, 1, 7)),
+        ("ix_collection_dates_collector_id_collection_date",),
+    ),
+    (
+        "collector of a user",
+        select(CollectorModel).where(CollectorModel.user_id == 1),
+        ("ix_collectors_user_id",),
+    ),
+)
+
+
+def query_plan(statement, connection):
+    """
+    Return the plan of a statement as a list of lines.
+
+    Args:
+        statement (Select): The statement to explain.
+        connection (Connection): The connection to explain it on.
+
+    Returns:
+        list: The lines of the plan.
+    """
+    dialect = connection.dialect
+    sql = str(statement.compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+    if dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN {sql}")
+    return [row[0] for row in rows]
+
+
+def check_indexes(connection):
+    """
+    Explain every indexed query and report those not using their index.
+
+    On Postgres sequential scans are disabled for the check, since the
+    planner prefers them on small tables even when an index is usable.
+
+    Args:
+        connection (Connection): The connection to run the check on.
+
+    Returns:
+        list: (description, plan) tuples of the queries missing an index.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+    failures = []
+    for description, statement, indexes in INDEXED_QUERIES:
+        plan = query_plan(statement, connection)
+        if not any(index in line for line in plan for index in indexes):
+            failures.append((description, plan))
+    return failures
+
+
+@click.command("check-indexes")
+def check_indexes_command():
+    """
+    Check that the resource queries use the database indexes.
+    """
+    with db.engine.connect() as connection:
+        with connection.begin():
+            failures = check_indexes(connection)
+
+    for description, plan in failures:
+        click.echo(f"{description} does not use an index:", err=True)
+        for line in plan:
+            click.echo(f"    {line}", err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo(f"{len(INDEXED_QUERIES)} queries use their indexes")
@@ -0,0 +1,115 @@
+"""
+This module streams collection requests for reporting.
+
+Rows are read through a server-side cursor in chunks of ``CHUNK_SIZE`` and
+each chunk is serialized and sent before the next one is read, so memory
+use does not depend on the number of exported rows.
+"""
+
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from db import db
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import HouseholdModel
+
+
+CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    CollectionRequestModel.id,
+    CollectionRequestModel.status,
+    CollectionRequestModel.household_id,
+    HouseholdModel.house_number,
+    HouseholdModel.area,
+    CollectionRequestModel.collection_date_id,
+    CollectionDateModel.collection_date,
+    CollectionDateModel.collector_id,
+)
+
+FIELDNAMES = tuple(column.key for column in EXPORT_COLUMNS)
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_statement(from_date=None, to_date=None, area=None):
+    """
+    Build the statement selecting the exported rows, ordered by id.
+
+    Args:
+        from_date (date): The first collection date to export.
+        to_date (date): The last collection date to export.
+        area (str): The household area to export.
+    """
+    statement = (
+        select(*EXPORT_COLUMNS)
+        .join(CollectionRequestModel.household)
+        .join(CollectionRequestModel.collection_date)
+        .order_by(CollectionRequestModel.id)
+    )
+    if from_date is not None:
+        statement = statement.where(
+            CollectionDateModel.collection_date >= from_date)
+    if to_date is not None:
+        statement = statement.where(
+            CollectionDateModel.collection_date <= to_date)
+    if area is not None:
+        statement = statement.where(HouseholdModel.area == area)
+    return statement
+
+
+def _ndjson_chunk(rows):
+    return "".join(
+        json.dumps(dict(zip(FIELDNAMES, row)), default=str) + "\n"
+        for row in rows
+    )
+
+
+def _csv_writer():
+    buffer = io.StringIO()
+    return buffer, csv.writer(buffer)
+
+
+def _csv_chunk(rows):
+    buffer, writer = _csv_writer()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _csv_header():
+    buffer, writer = _csv_writer()
+    writer.writerow(FIELDNAMES)
+    return buffer.getvalue()
+
+
+def stream_export(statement, export_format="ndjson", chunk_size=CHUNK_SIZE):
+    """
+    Yield the rows of the statement serialized chunk by chunk.
+
+    Args:
+        statement (Select): The statement selecting the rows.
+        export_format (str): "ndjson" or "csv".
+        chunk_size (int): The number of rows fetched and sent at a time.
+
+    Yields:
+        str: The serialized chunks.
+    """
+    serialize = _csv_chunk if export_format == "csv" else _ndjson_chunk
+    if export_format == "csv":
+        yield _csv_header()
+
+    result = db.session.execute(
+        statement.execution_options(
+            yield_per=chunk_size, stream_results=True))
+    try:
+        for rows in result.partitions():
+            yield serialize(rows)
+    finally:
+        result.close()
@@ -0,0 +1,244 @@
+"""
+This module runs password hashing outside of the request workers.
+
+pbkdf2 hashing and verification are CPU bound. They are submitted to a
+bounded executor so that a burst of logins cannot hold every worker: when
+the executor queue is full the request is refused with a 503 and a
+Retry-After header instead of waiting.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from flask_smorest import abort
+from passlib.hash import pbkdf2_sha256
+
+from metrics import current_metrics
+
+
+class HashingBusy(Exception):
+    """
+    Raised when the hashing executor cannot accept more work.
+    """
+
+
+def _hasher(rounds):
+    if rounds is None:
+        return pbkdf2_sha256
+    return pbkdf2_sha256.using(rounds=rounds)
+
+
+def _hash(password, rounds):
+    return _hasher(rounds).hash(password)
+
+
+def _verify(password, password_hash):
+    return pbkdf2_sha256.verify(password, password_hash)
+
+
+class _InlineExecutor:
+    """
+    Executor running the work in the calling thread.
+    """
+
+    def submit(self, fn, *args):
+        future = _DoneFuture()
+        try:
+            future.value = fn(*args)
+        except Exception as error:
+            future.error = error
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class _DoneFuture:
+    value = None
+    error = None
+
+    def add_done_callback(self, fn):
+        fn(self)
+
+    def result(self, timeout=None):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class HashingExecutor:
+    """
+    Bounded executor for password hashing.
+
+    At most ``max_workers + max_queue`` hashes are in flight; further
+    submissions raise HashingBusy immediately.
+
+    Attributes:
+        kind (str): "process", "thread" or "inline".
+        max_workers (int): The number of hashing workers.
+        max_queue (int): The number of hashes allowed to wait for a worker.
+        rounds (int): The pbkdf2 rounds of new hashes, None for the
+        passlib default.
+        timeout (float): The number of seconds to wait for a result.
+    """
+
+    def __init__(self, kind="process", max_workers=None, max_queue=32,
+                 rounds=None, timeout=10):
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(
+            self.max_workers + self.max_queue)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        # created on first use so that gunicorn workers fork before it
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(self.max_workers)
+                elif self.kind == "thread":
+                    self._executor = ThreadPoolExecutor(self.max_workers)
+                else:
+                    self._executor = _InlineExecutor()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HashingBusy()
+
+    def hash(self, password):
+        """
+        Hash a password with the configured rounds.
+        """
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, password, password_hash):
+        """
+        Check a password against a stored hash.
+        """
+        return self._run(_verify, password, password_hash)
+
+    def needs_rehash(self, password_hash):
+        """
+        Tell whether a stored hash was made with other rounds than the
+        configured ones.
+        """
+        return _hasher(self.rounds).needs_update(password_hash)
+
+    def shutdown(self):
+        """
+        Stop the workers of the executor.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def init_app(app):
+    """
+    Create the hashing executor of the application.
+
+    The executor is configured with ``HASHING_EXECUTOR`` ("process",
+    "thread" or "inline"), ``HASHING_MAX_WORKERS``, ``HASHING_MAX_QUEUE``,
+    ``HASHING_TIMEOUT``, ``HASHING_RETRY_AFTER`` (seconds sent in the
+    Retry-After header) and ``PASSWORD_HASH_ROUNDS``. Each of them may be
+    set from the environment variable of the same name.
+    """
+    app.config.setdefault(
+        "HASHING_EXECUTOR", os.getenv("HASHING_EXECUTOR", "process"))
+    app.config.setdefault(
+        "HASHING_MAX_WORKERS", _env_int("HASHING_MAX_WORKERS"))
+    app.config.setdefault(
+        "HASHING_MAX_QUEUE", _env_int("HASHING_MAX_QUEUE") or 32)
+    app.config.setdefault(
+        "HASHING_TIMEOUT", _env_int("HASHING_TIMEOUT") or 10)
+    app.config.setdefault(
+        "HASHING_RETRY_AFTER", _env_int("HASHING_RETRY_AFTER") or 1)
+    app.config.setdefault(
+        "PASSWORD_HASH_ROUNDS", _env_int("PASSWORD_HASH_ROUNDS"))
+    app.extensions["hashing"] = HashingExecutor(
+        kind=app.config["HASHING_EXECUTOR"],
+        max_workers=app.config["HASHING_MAX_WORKERS"],
+        max_queue=app.config["HASHING_MAX_QUEUE"],
+        rounds=app.config["PASSWORD_HASH_ROUNDS"],
+        timeout=app.config["HASHING_TIMEOUT"]
+    )
+
+
+def _executor():
+    return current_app.extensions["hashing"]
+
+
+def _busy():
+    abort(
+        503,
+        message="Server busy, please retry later",
+        headers={"Retry-After": str(current_app.config["HASHING_RETRY_AFTER"])}
+        )
+
+
+def _timed(operation, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    except HashingBusy:
+        _busy()
+    finally:
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.observe(
+                "ecotrack_password_hash_duration_seconds",
+                (("operation", operation),),
+                time.perf_counter() - start)
+
+
+def hash_password(password):
+    """
+    Hash a password on the executor of the current app.
+
+    Raises:
+        abort(503): If the executor queue is full.
+    """
+    return _timed("hash", _executor().hash, password)
+
+
+def verify_password(password, password_hash):
+    """
+    Check a password on the executor of the current app.
+
+    Raises:
+        abort(503): If the executor queue is full.
+    """
+    return _timed("verify", _executor().verify, password, password_hash)
+
+
+def needs_rehash(password_hash):
+    """
+    Tell whether a stored hash should be replaced on the next login.
+    """
+    return _executor().needs_rehash(password_hash)
@@ -0,0 +1,84 @@
+"""
+This module maps the authenticated user to its household or collector.
+
+Tokens carry the ``household_id`` and ``collector_id`` claims of the
+user, so the mapping costs no query. Tokens issued without them, by
+older versions of the app or by tests, fall back to a lookup by user id;
+the async routes of the ASGI app fill the claim in on their own session
+with ``entity_claims()`` first, as the lookup would block the event loop.
+A claim is only as fresh as the token: a profile created after login is
+seen on the next login.
+"""
+
+from flask_smorest import abort
+from sqlalchemy import select
+
+from db import db
+from models import CollectorModel
+from models import HouseholdModel
+
+
+# The claim and model of the profile of each role
+ENTITY_CLAIMS = {
+    "household": ("household_id", HouseholdModel),
+    "collector": ("collector_id", CollectorModel),
+}
+
+
+def _entity_id(jwt, claim, model):
+    if claim in jwt:
+        return jwt[claim]
+    return db.session.scalar(
+        select(model.id).where(model.user_id == jwt.get("sub")))
+
+
+def current_household_id(jwt):
+    """
+    Return the ID of the household of the authenticated user.
+
+    Args:
+        jwt (dict): The claims of the access token.
+
+    Raises:
+        abort(403): If the user has no household profile.
+    """
+    household_id = _entity_id(jwt, "household_id", HouseholdModel)
+    if household_id is None:
+        abort(403, message="Household profile required")
+    return household_id
+
+
+def current_collector_id(jwt):
+    """
+    Return the ID of the collector of the authenticated user.
+
+    Args:
+        jwt (dict): The claims of the access token.
+
+    Raises:
+        abort(403): If the user has no collector profile.
+    """
+    collector_id = _entity_id(jwt, "collector_id", CollectorModel)
+    if collector_id is None:
+        abort(403, message="Collector profile required")
+    return collector_id
+
+
+async def entity_claims(jwt, session):
+    """
+    Add the household or collector ID of the user to claims lacking it.
+
+    Args:
+        jwt (dict): The claims of the access token.
+        session (AsyncSession): The session looking the ID up.
+
+    Returns:
+        dict: The claims, with the ID of the profile of the role, None
+        when the user has none.
+    """
+    claim, model = ENTITY_CLAIMS.get(jwt.get("role"), (None, None))
+    if claim is None or claim in jwt:
+        return jwt
+    entity_id = await session.scalar(
+        select(model.id).where(model.user_id == jwt.get("sub")))
+    return {**jwt, claim: entity_id}
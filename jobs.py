@@ -0,0 +1,263 @@
+"""
+This module runs heavy work outside of the request workers.
+
+Endpoints queue a job, a row of the ``jobs`` table naming a task and
+its JSON payload, and answer 202 at once. ``flask worker`` processes
+claim the jobs and run their task in an app context.
+
+A worker claims a job by switching it from "queued" to "running" in its
+own short transaction. On PostgreSQL and MySQL the job is picked with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so workers never wait for each
+other's rows. SQLite has no row locks but serializes its writers, so a
+single conditional ``UPDATE ... RETURNING`` picks and takes the job.
+
+Delivery is at least once: a job still running after ``JOB_LEASE``
+seconds is taken to belong to a dead worker and is claimed again, so
+tasks must be safe to repeat; when that was its last attempt, it fails
+instead. A task that raises is queued again after
+an exponential backoff with jitter, ``JOB_BACKOFF`` seconds doubled at
+each attempt up to ``JOB_BACKOFF_MAX``, and fails for good after
+``JOB_MAX_ATTEMPTS`` attempts.
+
+Tasks are registered with the ``task`` decorator; they take the job and
+return a JSON-serializable result.
+"""
+
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, or_, select, update
+
+from db import db
+from engine_options import config_from_env
+from models import JobModel
+
+
+DEFAULTS = {
+    "JOB_MAX_ATTEMPTS": 5,
+    "JOB_BACKOFF": 2.0,
+    "JOB_BACKOFF_MAX": 300.0,
+    "JOB_LEASE": 600,
+    "JOB_POLL_INTERVAL": 1.0,
+    "JOB_FILES_DIR": "",
+}
+
+# Tasks by name
+TASKS = {}
+
+
+def init_app(app):
+    """
+    Read the settings of the job queue.
+    """
+    config_from_env(app, DEFAULTS)
+    if not app.config["JOB_FILES_DIR"]:
+        app.config["JOB_FILES_DIR"] = os.path.join(app.instance_path, "jobs")
+
+
+def task(name):
+    """
+    Register a function as the task of the jobs of a name.
+    """
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+
+def utcnow():
+    """
+    Return the current UTC time, naive as the job columns.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue(name, payload=None, user_id=None, delay=0, max_attempts=None):
+    """
+    Queue a job and commit it with the current transaction.
+
+    Args:
+        name (str): The name of a registered task.
+        payload (dict): The JSON-serializable arguments of the task.
+        user_id (int): The ID of the user queueing the job.
+        delay (float): Seconds before the job may start.
+        max_attempts (int): Attempts before the job fails,
+        JOB_MAX_ATTEMPTS by default.
+
+    Returns:
+        JobModel: The queued job.
+
+    Raises:
+        LookupError: If no task has this name.
+    """
+    if name not in TASKS:
+        raise LookupError(f"No task named {name!r}")
+    now = utcnow()
+    job = JobModel(
+        name=name,
+        payload=payload or {},
+        status="queued",
+        attempts=0,
+        max_attempts=(
+            max_attempts or current_app.config["JOB_MAX_ATTEMPTS"]),
+        run_at=now + timedelta(seconds=delay),
+        user_id=user_id,
+        created_at=now,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def claim(worker):
+    """
+    Take the next job due, in its own transaction.
+
+    Args:
+        worker (str): The name of the worker.
+
+    Returns:
+        JobModel: The job, now running, or None when no job is due.
+    """
+    session = db.session
+    now = utcnow()
+    lease = timedelta(seconds=current_app.config["JOB_LEASE"])
+    expired = and_(
+        JobModel.status == "running", JobModel.locked_at < now - lease)
+    # the worker of these died on their last attempt, so only the
+    # exception handler of run() would have failed them
+    session.execute(
+        update(JobModel)
+        .where(expired, JobModel.attempts >= JobModel.max_attempts)
+        .values(status="failed", finished_at=now,
+                error="Lease expired on the last attempt"),
+        execution_options={"synchronize_session": False})
+    due = or_(
+        and_(JobModel.status == "queued", JobModel.run_at <= now),
+        and_(expired, JobModel.attempts < JobModel.max_attempts),
+    )
+    next_job = (
+        select(JobModel.id).where(due)
+        .order_by(JobModel.run_at, JobModel.id).limit(1))
+    take = update(JobModel).values(
+        status="running",
+        locked_by=worker,
+        locked_at=now,
+        attempts=JobModel.attempts + 1,
+    )
+
+    if session.get_bind().dialect.name == "sqlite":
+        job_id = session.scalar(
+            take.where(JobModel.id == next_job.scalar_subquery(), due)
+            .returning(JobModel.id),
+            execution_options={"synchronize_session": False})
+    else:
+        job_id = session.scalar(next_job.with_for_update(skip_locked=True))
+        if job_id is not None:
+            session.execute(
+                take.where(JobModel.id == job_id),
+                execution_options={"synchronize_session": False})
+    session.commit()
+    return None if job_id is None else session.get(JobModel, job_id)
+
+
+def backoff(attempts):
+    """
+    Return the seconds to wait before the next attempt of a job.
+    """
+    config = current_app.config
+    delay = min(
+        config["JOB_BACKOFF_MAX"], config["JOB_BACKOFF"] * 2 ** (attempts - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def run(job):
+    """
+    Run the task of a claimed job and record how it went.
+
+    Returns:
+        bool: Whether the task succeeded.
+    """
+    job_id, name, attempts = job.id, job.name, job.attempts
+    try:
+        if name not in TASKS:
+            raise LookupError(f"No task named {name!r}")
+        result = TASKS[name](job)
+    except Exception as error:
+        db.session.rollback()
+        current_app.logger.exception(
+            "Job %s (%s) failed on attempt %s", job_id, name, attempts)
+        job = db.session.get(JobModel, job_id)
+        job.error = f"{type(error).__name__}: {error}"
+        if attempts >= job.max_attempts:
+            job.status = "failed"
+            job.finished_at = utcnow()
+        else:
+            job.status = "queued"
+            job.run_at = utcnow() + timedelta(seconds=backoff(attempts))
+        db.session.commit()
+        return False
+
+    job.status = "succeeded"
+    job.result = result
+    job.error = None
+    job.finished_at = utcnow()
+    db.session.commit()
+    return True
+
+
+def work(worker=None, burst=False, max_jobs=None):
+    """
+    Claim and run jobs until stopped.
+
+    Must run inside an app context.
+
+    Args:
+        worker (str): The name of the worker, host:pid by default.
+        burst (bool): Stop when no job is due instead of waiting.
+        max_jobs (int): Stop after this many jobs.
+
+    Returns:
+        int: The number of jobs run.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    ran = 0
+    while max_jobs is None or ran < max_jobs:
+        job = claim(worker)
+        if job is None:
+            if burst:
+                break
+            time.sleep(current_app.config["JOB_POLL_INTERVAL"])
+            continue
+        run(job)
+        ran += 1
+        # start each job with a fresh identity map
+        db.session.remove()
+    return ran
+
+
+@click.command("worker")
+@click.option("--name", help="Name of the worker, host:pid by default.")
+@click.option(
+    "--burst", is_flag=True, help="Stop when no job is due.")
+@click.option(
+    "--max-jobs", type=int, help="Stop after this many jobs.")
+@with_appcontext
+def worker_command(name, burst, max_jobs):
+    """
+    Run the queued background jobs.
+    """
+    if current_app.config.get("RESPONSE_CACHE_BACKEND") == "local":
+        click.echo(
+            "Warning: RESPONSE_CACHE_BACKEND is local, so the web processes "
+            "do not see the cache invalidations of the jobs and may serve "
+            "responses older than their writes for RESPONSE_CACHE_TTL "
+            "seconds. Use a shared backend such as Redis.", err=True)
+    ran = work(worker=name, burst=burst, max_jobs=max_jobs)
+    click.echo(f"Ran {ran} jobs")
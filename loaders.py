@@ -0,0 +1,55 @@
+"""
+This module contains the loader strategies used when querying models
+for serialization.
+
+The schemas nest relationships of the models they dump. Loading those
+relationships lazily runs one query per row, so the resources apply the
+options below to load them for the whole result in a constant number of
+queries.
+"""
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import CollectorModel
+from models import HouseholdModel
+
+
+LOADER_OPTIONS = {
+    # HouseholdSchema.collection_requests
+    HouseholdModel: (
+        selectinload(HouseholdModel.collection_requests),
+    ),
+    # CollectorSchema.collection_dates
+    CollectorModel: (
+        selectinload(CollectorModel.collection_dates),
+    ),
+    # CollectionDateSchema.collection_requests
+    CollectionDateModel: (
+        selectinload(CollectionDateModel.collection_requests),
+    ),
+    # CollectionRequestSchema.household and .collection_date
+    CollectionRequestModel: (
+        joinedload(CollectionRequestModel.household),
+        joinedload(CollectionRequestModel.collection_date),
+    ),
+}
+
+
+def eager(model, query=None):
+    """
+    Return a query on the model loading the relationships its schema nests.
+
+    Args:
+        model (db.Model): The model class to query.
+        query (Query or Select): An existing query on the model, defaults
+        to ``model.query``.
+
+    Returns:
+        Query or Select: The query with the loader options of the model
+        applied.
+    """
+    if query is None:
+        query = model.query
+    return query.options(*LOADER_OPTIONS.get(model, ()))
@@ -0,0 +1,251 @@
+"""
+This module records request, SQL, JWT and password hashing metrics and
+serves them at /metrics in the Prometheus text format.
+
+Each thread records into its own shard of counters, so the hot path is a
+few dictionary updates without any lock. The shards are only summed when
+/metrics is scraped. Like the other caches of the app, the metrics are
+kept per application and per process; with several gunicorn workers each
+worker exposes its own series.
+"""
+
+import bisect
+import threading
+import time
+
+from flask import Response, current_app, g, has_app_context
+from flask import has_request_context, request
+from flask_jwt_extended import JWTManager
+
+from db import db
+from sql_timing import observe_statements
+
+
+# Upper bounds of the histogram buckets, in seconds
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+# Upper bounds of the histogram buckets, in statements
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HELP = {
+    "ecotrack_request_duration_seconds": (
+        "histogram", "Time spent handling requests", LATENCY_BUCKETS),
+    "ecotrack_requests_total": (
+        "counter", "Responses sent, by status", None),
+    "ecotrack_request_sql_statements": (
+        "histogram", "SQL statements run per request", COUNT_BUCKETS),
+    "ecotrack_request_sql_duration_seconds": (
+        "histogram", "Time spent in SQL per request", LATENCY_BUCKETS),
+    "ecotrack_sql_statements_total": (
+        "counter", "SQL statements run", None),
+    "ecotrack_sql_duration_seconds_total": (
+        "counter", "Time spent in SQL", None),
+    "ecotrack_jwt_decode_duration_seconds": (
+        "histogram", "Time spent decoding access tokens", LATENCY_BUCKETS),
+    "ecotrack_password_hash_duration_seconds": (
+        "histogram", "Time spent hashing and verifying passwords",
+        LATENCY_BUCKETS),
+}
+
+
+class Metrics:
+    """
+    Per-thread sharded counters and histograms.
+
+    Counters map (name, labels) to a value. Histograms map (name, labels)
+    to a list holding the count of each bucket, then the total count and
+    the sum of the observations.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = ({}, {})
+            self._local.shard = shard
+            # only taken once per thread
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        """
+        Add a value to a counter.
+        """
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """
+        Record an observation in a histogram.
+        """
+        histograms = self._shard()[1]
+        key = (name, labels)
+        buckets = HELP[name][2]
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(buckets) + 3)
+        histogram[bisect.bisect_left(buckets, value)] += 1
+        histogram[-2] += 1
+        histogram[-1] += value
+
+    def collect(self):
+        """
+        Sum the shards of every thread.
+
+        Returns:
+            tuple: The counters and histograms dictionaries.
+        """
+        counters = {}
+        histograms = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard_counters, shard_histograms in shards:
+            # dict() copies atomically, even while the owner thread writes
+            for key, value in dict(shard_counters).items():
+                counters[key] = counters.get(key, 0) + value
+            for key, histogram in dict(shard_histograms).items():
+                total = histograms.setdefault(key, [0] * len(histogram))
+                for index, value in enumerate(list(histogram)):
+                    total[index] += value
+        return counters, histograms
+
+    def render(self):
+        """
+        Render the metrics in the Prometheus text exposition format.
+        """
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, description, buckets) in HELP.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (key_name, labels), value in sorted(counters.items()):
+                    if key_name == name:
+                        lines.append(
+                            f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            for (key_name, labels), histogram in sorted(histograms.items()):
+                if key_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, histogram):
+                    cumulative += count
+                    lines.append(
+                        f"{name}_bucket"
+                        f"{_labels(labels + (('le', _number(bound)),))}"
+                        f" {cumulative}")
+                lines.append(
+                    f"{name}_bucket{_labels(labels + (('le', '+Inf'),))}"
+                    f" {histogram[-2]}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram[-2]}")
+                lines.append(
+                    f"{name}_sum{_labels(labels)} {_number(histogram[-1])}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace(
+        "\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def current_metrics():
+    """
+    Return the metrics of the current app, or None outside of an app or
+    when metrics are disabled.
+    """
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("metrics")
+
+
+class InstrumentedJWTManager(JWTManager):
+    """
+    JWTManager timing the decoding of access tokens.
+    """
+
+    def _decode_jwt_from_config(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super()._decode_jwt_from_config(*args, **kwargs)
+        finally:
+            metrics = current_metrics()
+            if metrics is not None:
+                metrics.observe(
+                    "ecotrack_jwt_decode_duration_seconds", (),
+                    time.perf_counter() - start)
+
+
+def _observe_statement(statement, parameters, elapsed):
+    metrics = current_metrics()
+    if metrics is None:
+        return
+    metrics.inc("ecotrack_sql_statements_total")
+    metrics.inc("ecotrack_sql_duration_seconds_total", (), elapsed)
+    if has_request_context() and "sql_statements" in g:
+        g.sql_statements += 1
+        g.sql_seconds += elapsed
+
+
+def init_app(app):
+    """
+    Record the metrics of the application and serve them at /metrics.
+
+    Disabled when ``METRICS_ENABLED`` is false.
+    """
+    app.config.setdefault("METRICS_ENABLED", True)
+    if not app.config["METRICS_ENABLED"]:
+        return
+    metrics = app.extensions["metrics"] = Metrics()
+
+    with app.app_context():
+        observe_statements(db.engine, _observe_statement)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_start = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if "request_start" not in g:
+            return response
+        endpoint = (("endpoint", request.endpoint or "unknown"),)
+        labels = (("method", request.method),) + endpoint
+        metrics.observe(
+            "ecotrack_request_duration_seconds", labels,
+            time.perf_counter() - g.request_start)
+        metrics.inc(
+            "ecotrack_requests_total",
+            labels + (("status", str(response.status_code)),))
+        metrics.observe(
+            "ecotrack_request_sql_statements", endpoint, g.sql_statements)
+        metrics.observe(
+            "ecotrack_request_sql_duration_seconds", endpoint,
+            g.sql_seconds)
+        return response
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        return Response(
+            metrics.render(),
+            mimetype="text/plain; version=0.0.4; charset=utf-8")
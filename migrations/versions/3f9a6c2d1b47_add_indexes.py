@@ -0,0 +1,46 @@
+"""add indexes on foreign keys and filter columns
+
+Revision ID: 3f9a6c2d1b47
+Revises: 56038e7ba0fe
+Create Date: 2026-10-18 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a6c2d1b47'
+down_revision = '56038e7ba0fe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('collectors', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_collectors_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('collection_dates', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_collection_dates_collector_id'), ['collector_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_collection_dates_collection_date'), ['collection_date'], unique=False)
+        batch_op.create_index('ix_collection_dates_collector_id_collection_date', ['collector_id', 'collection_date'], unique=False)
+
+    with op.batch_alter_table('collection_requests', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_collection_requests_household_id'), ['household_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_collection_requests_collection_date_id'), ['collection_date_id'], unique=False)
+        batch_op.create_index('ix_collection_requests_household_id_status', ['household_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('collection_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_collection_requests_household_id_status')
+        batch_op.drop_index(batch_op.f('ix_collection_requests_collection_date_id'))
+        batch_op.drop_index(batch_op.f('ix_collection_requests_household_id'))
+
+    with op.batch_alter_table('collection_dates', schema=None) as batch_op:
+        batch_op.drop_index('ix_collection_dates_collector_id_collection_date')
+        batch_op.drop_index(batch_op.f('ix_collection_dates_collection_date'))
+        batch_op.drop_index(batch_op.f('ix_collection_dates_collector_id'))
+
+    with op.batch_alter_table('collectors', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_collectors_user_id'))
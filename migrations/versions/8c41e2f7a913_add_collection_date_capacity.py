@@ -0,0 +1,42 @@
+"""add the capacity of collectors and collection dates
+
+Revision ID: 8c41e2f7a913
+Revises: 3f9a6c2d1b47
+Create Date: 2026-10-18 14:03:52.617204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41e2f7a913'
+down_revision = '3f9a6c2d1b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('collectors', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('capacity', sa.Integer(), server_default='50', nullable=False))
+
+    with op.batch_alter_table('collection_dates', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('capacity', sa.Integer(), server_default='50', nullable=False))
+        batch_op.add_column(sa.Column('used', sa.Integer(), server_default='0', nullable=False))
+
+    # the existing requests use their places, even over the capacity,
+    # which flask rebalance then spreads
+    op.execute(
+        "UPDATE collection_dates SET used = ("
+        "SELECT COUNT(*) FROM collection_requests"
+        " WHERE collection_requests.collection_date_id = collection_dates.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('collection_dates', schema=None) as batch_op:
+        batch_op.drop_column('used')
+        batch_op.drop_column('capacity')
+
+    with op.batch_alter_table('collectors', schema=None) as batch_op:
+        batch_op.drop_column('capacity')
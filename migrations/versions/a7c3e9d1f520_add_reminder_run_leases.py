@@ -0,0 +1,30 @@
+"""add the lease of reminder runs
+
+Revision ID: a7c3e9d1f520
+Revises: e4f8c2b7d316
+Create Date: 2026-10-18 21:04:52.730164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9d1f520'
+down_revision = 'e4f8c2b7d316'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reminder_runs', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('locked_by', sa.String(length=120), nullable=True))
+        batch_op.add_column(
+            sa.Column('locked_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('reminder_runs', schema=None) as batch_op:
+        batch_op.drop_column('locked_at')
+        batch_op.drop_column('locked_by')
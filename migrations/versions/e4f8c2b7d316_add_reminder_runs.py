@@ -0,0 +1,33 @@
+"""add the reminder_runs table
+
+Revision ID: e4f8c2b7d316
+Revises: d9e3a1f6b285
+Create Date: 2026-10-18 19:12:40.518372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4f8c2b7d316'
+down_revision = 'd9e3a1f6b285'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reminder_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('collection_day', sa.Date(), nullable=False),
+    sa.Column('household_id', sa.Integer(), nullable=True),
+    sa.Column('sent', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('collection_day')
+    )
+
+
+def downgrade():
+    op.drop_table('reminder_runs')
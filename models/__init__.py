@@ -4,3 +4,5 @@ from models.collection_date import CollectionDateModel  # noqa: F401
 from models.collector import CollectorModel  # noqa: F401
 from models.user import UserModel  # noqa: F401
 from models.admin import AdminModel  # noqa: F401
+from models.job import JobModel  # noqa: F401
+from models.reminder_run import ReminderRunModel  # noqa: F401
@@ -14,10 +14,19 @@ class CollectionDateModel(db.Model):
         id (int): The primary key of the collection date.
         collection_date (str): The date of the collection.
         collector_id (int): The foreign key referencing the collector.
+        capacity (int): The maximum number of collection requests.
+        used (int): The number of collection requests reserved.
         collector (CollectorModel): The relationship to the collector model.
     """
 
     __tablename__ = "collection_dates"
+    __table_args__ = (
+        db.Index(
+            "ix_collection_dates_collector_id_collection_date",
+            "collector_id",
+            "collection_date"
+            ),
+        )
 
     id = db.Column(
         db.Integer,
@@ -25,12 +34,26 @@ class CollectionDateModel(db.Model):
         )
     collection_date = db.Column(
         db.Date,
-        nullable=False
+        nullable=False,
+        index=True
         )
     collector_id = db.Column(
         db.Integer,
         db.ForeignKey("collectors.id"),
-        nullable=False
+        nullable=False,
+        index=True
+        )
+    capacity = db.Column(
+        db.Integer,
+        nullable=False,
+        default=50,
+        server_default="50"
+        )
+    used = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default="0"
         )
     collector = db.relationship(
         "CollectorModel",
@@ -39,5 +62,5 @@ class CollectionDateModel(db.Model):
     collection_requests = db.relationship(
         "CollectionRequestModel",
         back_populates="collection_date",
-        lazy="dynamic"
+        lazy="select"
         )
@@ -22,6 +22,13 @@ class CollectionRequestModel(db.Model):
     """
 
     __tablename__ = "collection_requests"
+    __table_args__ = (
+        db.Index(
+            "ix_collection_requests_household_id_status",
+            "household_id",
+            "status"
+            ),
+        )
 
     id = db.Column(
         db.Integer,
@@ -34,12 +41,14 @@ class CollectionRequestModel(db.Model):
     household_id = db.Column(
         db.Integer,
         db.ForeignKey("households.id"),
-        nullable=False
+        nullable=False,
+        index=True
         )
     collection_date_id = db.Column(
         db.Integer,
         db.ForeignKey("collection_dates.id"),
-        nullable=False
+        nullable=False,
+        index=True
         )
     household = db.relationship(
         "HouseholdModel",
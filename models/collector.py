@@ -12,6 +12,8 @@ class CollectorModel(db.Model):
     Attributes:
         id (int): The primary key of the collector.
         allocated_area (str): The area allocated to the collector.
+        capacity (int): The number of collection requests each new
+        collection date of the collector takes.
         collection_dates (Relationship): The collection dates
         associated with the collector.
     """
@@ -26,10 +28,17 @@ class CollectorModel(db.Model):
         db.String(80),
         nullable=False
         )
+    capacity = db.Column(
+        db.Integer,
+        nullable=False,
+        default=50,
+        server_default="50"
+        )
     user_id = db.Column(
         db.Integer,
         db.ForeignKey("users.id"),
-        nullable=False
+        nullable=False,
+        index=True
         )
     user = db.relationship(
         "UserModel",
@@ -39,5 +48,5 @@ class CollectorModel(db.Model):
     collection_dates = db.relationship(
         "CollectionDateModel",
         back_populates="collector",
-        lazy="dynamic"
+        lazy="select"
         )
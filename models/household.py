@@ -13,6 +13,8 @@ class HouseholdModel(db.Model):
         id (int): The primary key of the household.
         house_number (str): The house number of the household.
         area (str): The area where the household is located.
+        latitude (float): The latitude of the household, if known.
+        longitude (float): The longitude of the household, if known.
         collection_requests (Relationship): The collection requests
         associated with the household.
     """
@@ -30,6 +32,14 @@ class HouseholdModel(db.Model):
         db.String(80),
         nullable=False
         )
+    latitude = db.Column(
+        db.Float,
+        nullable=True
+        )
+    longitude = db.Column(
+        db.Float,
+        nullable=True
+        )
     user_id = db.Column(
         db.Integer,
         db.ForeignKey("users.id"),
@@ -44,5 +54,5 @@ class HouseholdModel(db.Model):
     collection_requests = db.relationship(
         "CollectionRequestModel",
         back_populates="household",
-        lazy="dynamic"
+        lazy="select"
         )
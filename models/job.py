@@ -0,0 +1,98 @@
+"""
+This module contains the model for the job table in the database.
+"""
+
+from db import db
+
+
+class JobModel(db.Model):
+    """
+    Class representing the job table in the database.
+
+    Attributes:
+        id (int): The primary key of the job.
+        name (str): The name of the task the job runs.
+        payload (dict): The arguments of the task.
+        status (str): "queued", "running", "succeeded" or "failed".
+        attempts (int): The number of times the job was started.
+        max_attempts (int): The number of attempts before the job fails.
+        run_at (datetime): When the job may start, in UTC.
+        locked_by (str): The worker running the job.
+        locked_at (datetime): When the worker started the job, in UTC.
+        result (dict): What the task returned.
+        error (str): The error of the last failed attempt.
+        user_id (int): The foreign key referencing the user who queued
+        the job.
+        created_at (datetime): When the job was queued, in UTC.
+        finished_at (datetime): When the job succeeded or failed, in UTC.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        db.Index(
+            "ix_jobs_status_run_at",
+            "status",
+            "run_at"
+            ),
+        )
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True
+        )
+    name = db.Column(
+        db.String(80),
+        nullable=False
+        )
+    payload = db.Column(
+        db.JSON,
+        nullable=False
+        )
+    status = db.Column(
+        db.String(20),
+        nullable=False,
+        default="queued"
+        )
+    attempts = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0
+        )
+    max_attempts = db.Column(
+        db.Integer,
+        nullable=False
+        )
+    run_at = db.Column(
+        db.DateTime,
+        nullable=False
+        )
+    locked_by = db.Column(
+        db.String(120),
+        nullable=True
+        )
+    locked_at = db.Column(
+        db.DateTime,
+        nullable=True
+        )
+    result = db.Column(
+        db.JSON,
+        nullable=True
+        )
+    error = db.Column(
+        db.Text,
+        nullable=True
+        )
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id"),
+        nullable=True,
+        index=True
+        )
+    created_at = db.Column(
+        db.DateTime,
+        nullable=False
+        )
+    finished_at = db.Column(
+        db.DateTime,
+        nullable=True
+        )
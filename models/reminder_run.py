@@ -0,0 +1,60 @@
+"""
+This module contains the model for the reminder_run table in the
+database.
+"""
+
+from db import db
+
+
+class ReminderRunModel(db.Model):
+    """
+    Class representing the reminder_run table in the database: the
+    checkpoint of the reminders of a collection day.
+
+    Attributes:
+        id (int): The primary key of the run.
+        collection_day (date): The day of the collections reminded.
+        household_id (int): The last household handled.
+        sent (int): The number of reminders sent.
+        started_at (datetime): When the run started, in UTC.
+        finished_at (datetime): When every reminder was sent, in UTC.
+        locked_by (str): The run sending the reminders.
+        locked_at (datetime): When the run last renewed its lease, in UTC.
+    """
+
+    __tablename__ = "reminder_runs"
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True
+        )
+    collection_day = db.Column(
+        db.Date,
+        nullable=False,
+        unique=True
+        )
+    household_id = db.Column(
+        db.Integer,
+        nullable=True
+        )
+    sent = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0
+        )
+    started_at = db.Column(
+        db.DateTime,
+        nullable=False
+        )
+    finished_at = db.Column(
+        db.DateTime,
+        nullable=True
+        )
+    locked_by = db.Column(
+        db.String(120),
+        nullable=True
+        )
+    locked_at = db.Column(
+        db.DateTime,
+        nullable=True
+        )
@@ -0,0 +1,351 @@
+"""
+This module reminds households of their upcoming collections.
+
+Every household with a pending collection request on a date of the
+reminded day gets one reminder, however many requests it has that day.
+The pipeline works chunk by chunk, so memory use does not depend on the
+number of recipients:
+
+1. the households are scanned ``REMINDER_CHUNK_SIZE`` at a time in the
+   order of their primary key, each query starting after the last
+   household of the previous chunk (a keyset scan);
+2. a household is selected once when one or more of its pending
+   requests are on the day, which the ``(household_id, status)`` index
+   of the requests answers without sorting the requests of the day;
+3. the reminders of the chunk are rendered and handed to the transport
+   in one call;
+4. the last household of the chunk is committed as the checkpoint of
+   the day.
+
+A run for a day resumes from its checkpoint, and a finished day is not
+reminded again. A run stopped between a send and its checkpoint sends
+that chunk again when resumed, so delivery is at least once.
+
+Only one run sends the reminders of a day at a time. A run takes a lease
+on the checkpoint with a conditional ``UPDATE`` before sending, renews
+it with each checkpoint and gives it back when it stops. Other runs
+raise ``ReminderRunBusy`` until the lease is given back or is older
+than ``REMINDER_LEASE`` seconds, which only happens when its run died.
+A run whose lease was taken over stops at its next checkpoint.
+
+The transport is set by ``NOTIFICATION_TRANSPORT``: "log" writes the
+reminders to the ``ecotrack.notifications`` logger, "file" appends them
+as JSON lines to ``NOTIFICATION_FILE``, and any object with a
+``send(messages)`` method can be given in the app config.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import date, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from engine_options import config_from_env
+from jobs import utcnow
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import HouseholdModel
+from models import ReminderRunModel
+from models import UserModel
+
+
+DEFAULTS = {
+    "REMINDER_DAYS_AHEAD": 1,
+    "REMINDER_CHUNK_SIZE": 1000,
+    "REMINDER_LEASE": 600,
+    "NOTIFICATION_TRANSPORT": "log",
+    "NOTIFICATION_FILE": "",
+}
+
+SUBJECT = "Waste collection on {day}"
+
+BODY = (
+    "Hello {username}, your waste at {house_number}, {area} will be "
+    "collected on {day}. Please put your bins out the evening before."
+)
+
+logger = logging.getLogger("ecotrack.notifications")
+
+
+class ReminderRunBusy(Exception):
+    """
+    Raised when another run is sending the reminders of a day.
+    """
+
+
+class LogTransport:
+    """
+    Transport writing each reminder to a logger.
+    """
+
+    def __init__(self, logger=logger):
+        self.logger = logger
+
+    def send(self, messages):
+        for message in messages:
+            self.logger.info(json.dumps(message))
+
+
+class FileTransport:
+    """
+    Transport appending the reminders to a file, one JSON object per
+    line.
+
+    Args:
+        path (str): The path of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, messages):
+        lines = "".join(json.dumps(message) + "\n" for message in messages)
+        with self._lock, open(self.path, "a") as file:
+            file.write(lines)
+
+
+def init_app(app):
+    """
+    Read the settings of the reminders.
+    """
+    config_from_env(app, DEFAULTS)
+    if not app.config["NOTIFICATION_FILE"]:
+        app.config["NOTIFICATION_FILE"] = os.path.join(
+            app.instance_path, "notifications.ndjson")
+
+
+def current_transport():
+    """
+    Return the transport of the current app.
+    """
+    transport = current_app.config["NOTIFICATION_TRANSPORT"]
+    if transport == "log":
+        return LogTransport()
+    if transport == "file":
+        path = current_app.config["NOTIFICATION_FILE"]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return FileTransport(path)
+    return transport
+
+
+def recipients_statement(day, after=None, limit=None):
+    """
+    Select the households with a pending request on a day, with their
+    user, ordered by ID.
+
+    Args:
+        day (date): The day of the collection dates.
+        after (int): The household ID the scan starts after.
+        limit (int): The maximum number of rows.
+    """
+    pending = (
+        select(CollectionRequestModel.id)
+        .join(CollectionRequestModel.collection_date)
+        .where(
+            CollectionRequestModel.household_id == HouseholdModel.id,
+            CollectionRequestModel.status == "pending",
+            CollectionDateModel.collection_date == day,
+        )
+        .exists()
+    )
+    statement = (
+        select(
+            HouseholdModel.id.label("household_id"),
+            HouseholdModel.house_number,
+            HouseholdModel.area,
+            HouseholdModel.user_id,
+            UserModel.username,
+        )
+        .join(HouseholdModel.user)
+        .where(pending)
+        .order_by(HouseholdModel.id)
+        .limit(limit)
+    )
+    if after is not None:
+        statement = statement.where(HouseholdModel.id > after)
+    return statement
+
+
+def render(rows, day):
+    """
+    Render the reminders of a chunk of households.
+
+    Args:
+        rows (list): The rows of recipients_statement().
+        day (date): The day reminded.
+
+    Returns:
+        list: The reminders, as dictionaries.
+    """
+    day_text = day.strftime("%A %d %B %Y")
+    subject = SUBJECT.format(day=day_text)
+    return [
+        {
+            "user_id": row.user_id,
+            "household_id": row.household_id,
+            "day": day.isoformat(),
+            "subject": subject,
+            "body": BODY.format(
+                username=row.username, house_number=row.house_number,
+                area=row.area, day=day_text),
+        }
+        for row in rows
+    ]
+
+
+def _checkpoint(day):
+    session = db.session
+    run = session.scalar(
+        select(ReminderRunModel).where(
+            ReminderRunModel.collection_day == day))
+    if run is None:
+        try:
+            run = ReminderRunModel(
+                collection_day=day, sent=0, started_at=utcnow())
+            session.add(run)
+            session.commit()
+        except IntegrityError:
+            # created by a concurrent run
+            session.rollback()
+            run = session.scalar(
+                select(ReminderRunModel).where(
+                    ReminderRunModel.collection_day == day))
+    return run
+
+
+def _take_lease(run_id, owner, lease):
+    now = utcnow()
+    taken = db.session.execute(
+        update(ReminderRunModel)
+        .where(
+            ReminderRunModel.id == run_id,
+            ReminderRunModel.finished_at.is_(None),
+            or_(ReminderRunModel.locked_by.is_(None),
+                ReminderRunModel.locked_at < now - lease))
+        .values(locked_by=owner, locked_at=now),
+        execution_options={"synchronize_session": False}).rowcount
+    db.session.commit()
+    return taken == 1
+
+
+def _release_lease(run_id, owner):
+    db.session.rollback()
+    db.session.execute(
+        update(ReminderRunModel)
+        .where(ReminderRunModel.id == run_id,
+               ReminderRunModel.locked_by == owner)
+        .values(locked_by=None, locked_at=None),
+        execution_options={"synchronize_session": False})
+    db.session.commit()
+
+
+def send_reminders(day=None, chunk_size=None, transport=None):
+    """
+    Remind the households with a pending request on a day, resuming from
+    the checkpoint of the day.
+
+    Must run inside an app context.
+
+    Args:
+        day (date): The day reminded, REMINDER_DAYS_AHEAD days from today
+        by default.
+        chunk_size (int): The number of households read at a time,
+        REMINDER_CHUNK_SIZE by default.
+        transport: The transport, the one of the app by default.
+
+    Returns:
+        dict: The day, the number of reminders sent by this run and by
+        every run of the day, and whether the run resumed a checkpoint.
+
+    Raises:
+        ReminderRunBusy: If another run is sending the reminders of the
+        day, or took them over from this one.
+    """
+    config = current_app.config
+    day = day or date.today() + timedelta(days=config["REMINDER_DAYS_AHEAD"])
+    chunk_size = chunk_size or config["REMINDER_CHUNK_SIZE"]
+    transport = transport or current_transport()
+    lease = timedelta(seconds=config["REMINDER_LEASE"])
+    owner = uuid.uuid4().hex
+    session = db.session
+
+    run = _checkpoint(day)
+    run_id = run.id
+    leased = run.finished_at is None and _take_lease(run_id, owner, lease)
+    # read again, as another run may have moved on or finished
+    session.refresh(run)
+    if run.finished_at is None and not leased:
+        raise ReminderRunBusy(f"The reminders of {day} are being sent")
+    total, after = run.sent, run.household_id
+    result = {"day": day.isoformat(), "sent": 0, "resumed": after is not None}
+    if run.finished_at is not None:
+        result["total"] = total
+        return result
+
+    try:
+        while True:
+            rows = session.execute(
+                recipients_statement(day, after, chunk_size)).all()
+            if not rows:
+                break
+            messages = render(rows, day)
+            transport.send(messages)
+            after = rows[-1].household_id
+            # only while this run holds the lease, which it renews
+            renewed = session.execute(
+                update(ReminderRunModel)
+                .where(ReminderRunModel.id == run_id,
+                       ReminderRunModel.locked_by == owner)
+                .values(
+                    household_id=after,
+                    sent=ReminderRunModel.sent + len(messages),
+                    locked_at=utcnow()),
+                execution_options={"synchronize_session": False}).rowcount
+            session.commit()
+            if not renewed:
+                raise ReminderRunBusy(
+                    f"The reminders of {day} were taken over by another run")
+            result["sent"] += len(messages)
+    except BaseException:
+        _release_lease(run_id, owner)
+        raise
+
+    session.execute(
+        update(ReminderRunModel)
+        .where(ReminderRunModel.id == run_id)
+        .values(finished_at=utcnow(), locked_by=None, locked_at=None),
+        execution_options={"synchronize_session": False})
+    session.commit()
+    result["total"] = total + result["sent"]
+    return result
+
+
+@click.command("remind")
+@click.option(
+    "--day", type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Day of the collections, REMINDER_DAYS_AHEAD days from today by "
+    "default.")
+@click.option("--chunk-size", type=int, help="Households read at a time.")
+@with_appcontext
+def remind_command(day, chunk_size):
+    """
+    Remind the households of their pending collections of a day.
+    """
+    try:
+        result = send_reminders(
+            day=day and day.date(), chunk_size=chunk_size)
+    except ReminderRunBusy as error:
+        raise click.ClickException(str(error))
+    resumed = " (resumed)" if result["resumed"] else ""
+    click.echo(
+        f"Sent {result['sent']} reminders for {result['day']}{resumed}, "
+        f"{result['total']} in total")
@@ -0,0 +1,245 @@
+"""
+This module contains the keyset (cursor) pagination used by the list
+endpoints.
+
+List endpoints return a query or a select() statement instead of a list.
+It is narrowed to the rows after the ``after`` cursor, ordered by ``id``
+and limited to ``limit`` rows, so the cost of a page does not depend on
+the table size.
+"""
+
+import http
+from copy import deepcopy
+from functools import lru_cache, wraps
+from urllib.parse import urlencode
+
+from flask import request
+from flask_smorest import Blueprint as BaseBlueprint
+from flask_smorest.utils import unpack_tuple_response
+from marshmallow import EXCLUDE, Schema, fields, post_load, validate
+from sqlalchemy import Select
+
+from db import db
+
+
+class CursorPaginationParameters:
+    """
+    Holds the cursor pagination arguments of a request.
+
+    Attributes:
+        limit (int): The maximum number of items in the page.
+        after (int): The id after which the page starts.
+        next_cursor (int): The cursor of the next page, or None on the
+        last page.
+    """
+
+    def __init__(self, limit, after=None):
+        self.limit = limit
+        self.after = after
+        self.next_cursor = None
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}"
+            f"(limit={self.limit!r},after={self.after!r})"
+        )
+
+
+@lru_cache(maxsize=None)
+def _cursor_parameters_schema_factory(def_limit, max_limit):
+    """
+    Generate a schema deserializing the ``limit`` and ``after`` arguments.
+    """
+
+    class CursorPaginationParametersSchema(Schema):
+        """
+        This schema represents the cursor pagination arguments.
+        """
+
+        class Meta:
+            unknown = EXCLUDE
+
+        limit = fields.Int(
+            load_default=def_limit,
+            validate=validate.Range(min=1, max=max_limit)
+        )
+        after = fields.Int(
+            load_default=None,
+            validate=validate.Range(min=0)
+        )
+
+        @post_load
+        def make_parameters(self, data, **kwargs):
+            return CursorPaginationParameters(**data)
+
+    return CursorPaginationParametersSchema
+
+
+def cursor_statement(query, page_params):
+    """
+    Narrow a query to the rows of a page, plus one.
+
+    Args:
+        query (Query or Select): The query on the paginated entity.
+        page_params (CursorPaginationParameters): The page arguments.
+
+    Returns:
+        Query or Select: The query ordered by id after the cursor and
+        limited to one more row than the page.
+    """
+    key = query.column_descriptions[0]["entity"].id
+    if page_params.after is not None:
+        query = query.filter(key > page_params.after)
+    return query.order_by(key).limit(page_params.limit + 1)
+
+
+def cursor_rows(rows, page_params):
+    """
+    Trim the rows read by cursor_statement() to the page and set the
+    cursor of the next page.
+
+    Returns:
+        list: The rows of the page.
+    """
+    if len(rows) > page_params.limit:
+        rows = rows[:page_params.limit]
+        page_params.next_cursor = rows[-1].id
+    return rows
+
+
+def cursor_link(base_url, args, page_params):
+    """
+    Build the ``Link`` header value pointing to the next page.
+
+    Args:
+        base_url (str): The URL of the endpoint, without query string.
+        args (dict): The query arguments of the current page.
+        page_params (CursorPaginationParameters): The page arguments.
+    """
+    args = dict(args)
+    args["limit"] = page_params.limit
+    args["after"] = page_params.next_cursor
+    return f'<{base_url}?{urlencode(args)}>; rel="next"'
+
+
+def parse_cursor_parameters(args):
+    """
+    Load the cursor pagination arguments outside of a Blueprint view,
+    with the default page sizes.
+
+    Args:
+        args (Mapping): The query arguments.
+
+    Raises:
+        ValidationError: If ``limit`` or ``after`` is invalid.
+    """
+    defaults = Blueprint.DEFAULT_CURSOR_PAGINATION_PARAMETERS
+    schema = _cursor_parameters_schema_factory(
+        defaults["limit"], defaults["max_limit"])
+    return schema().load(args)
+
+
+class CursorPage:
+    """
+    Pager slicing a SQLAlchemy query on its primary key.
+
+    One extra row is fetched to know whether a next page exists, so a page
+    always costs a single indexed range query.
+    """
+
+    def __init__(self, query, page_params):
+        self.query = query
+        self.page_params = page_params
+
+    @property
+    def items(self):
+        query = cursor_statement(self.query, self.page_params)
+        if isinstance(query, Select):
+            rows = db.session.scalars(query).all()
+        else:
+            rows = query.all()
+        return cursor_rows(rows, self.page_params)
+
+
+class Blueprint(BaseBlueprint):
+    """
+    Blueprint adding cursor pagination on top of flask-smorest's
+    pagination hooks.
+    """
+
+    # Defaults for the ``limit`` query argument
+    DEFAULT_CURSOR_PAGINATION_PARAMETERS = {"limit": 50, "max_limit": 500}
+
+    def cursor_paginate(self, pager=CursorPage, *, limit=None, max_limit=None):
+        """
+        Decorator paginating the query returned by the endpoint.
+
+        The endpoint response is wrapped in an envelope holding the
+        ``items`` of the page and the ``next_cursor``. A ``Link`` header
+        pointing to the next page is set when there is one.
+
+        Args:
+            pager (type): The pager class slicing the returned query.
+            limit (int): The default page size.
+            max_limit (int): The maximum page size.
+        """
+        if limit is None:
+            limit = self.DEFAULT_CURSOR_PAGINATION_PARAMETERS["limit"]
+        if max_limit is None:
+            max_limit = self.DEFAULT_CURSOR_PAGINATION_PARAMETERS["max_limit"]
+        params_schema = _cursor_parameters_schema_factory(limit, max_limit)
+
+        parser = self.PAGINATION_ARGUMENTS_PARSER
+        error_status_code = parser.DEFAULT_VALIDATION_STATUS
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                page_params = parser.parse(
+                    params_schema, request, location="query")
+
+                result, status, headers = unpack_tuple_response(
+                    func(*args, **kwargs))
+
+                items = pager(result, page_params=page_params).items
+                result = {
+                    "items": items,
+                    "next_cursor": page_params.next_cursor,
+                }
+                headers = self._set_cursor_link(page_params, headers)
+
+                return result, status, headers
+
+            wrapper._apidoc = deepcopy(getattr(wrapper, "_apidoc", {}))
+            wrapper._apidoc["pagination"] = {
+                "parameters": {"in": "query", "schema": params_schema},
+                "response": {
+                    error_status_code: http.HTTPStatus(
+                        error_status_code).name,
+                },
+            }
+
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def _set_cursor_link(page_params, headers):
+        """
+        Add a ``Link`` header to the next page, if any.
+        """
+        if page_params.next_cursor is None:
+            return headers
+        if headers is None:
+            headers = {}
+        headers["Link"] = cursor_link(
+            request.base_url, request.args.to_dict(), page_params)
+        return headers
+
+    def _document_pagination_metadata(self, spec, resp_doc):
+        resp_doc.setdefault("headers", {}).update({
+            "Link": {
+                "description": "Link to the next page",
+                "schema": {"type": "string"},
+            }
+        })
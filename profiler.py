@@ -0,0 +1,176 @@
+"""
+This module profiles the SQL run by a request and logs slow statements.
+
+The profiler is opt-in. With ``SQL_PROFILER`` set to "header", a request
+sending the ``X-SQL-Profile: 1`` header is profiled; with "always", every
+request is. A profiled request records each statement with its
+parameters, its duration and the line of the app that ran it; the
+parameters are logged as their types, and as their values only when
+``SQL_LOG_PARAMETERS`` is set. The
+response gets a ``Server-Timing`` header summing them up, and the full
+profile is logged as JSON on the ``ecotrack.sql_profile`` logger.
+
+Independently of the profiler, any statement slower than
+``SLOW_QUERY_MS`` milliseconds (0 to disable) is logged as JSON on the
+``ecotrack.slow_queries`` logger.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+
+from flask import current_app, g, has_app_context, has_request_context
+from flask import request
+
+import sql_timing
+from db import db
+from engine_options import config_from_env
+
+
+DEFAULTS = {
+    "SQL_PROFILER": "off",
+    "SQL_PROFILER_HEADER": "X-SQL-Profile",
+    "SLOW_QUERY_MS": 200,
+    "SQL_LOG_PARAMETERS": False,
+}
+
+# Longest parameters representation kept in a profile entry
+MAX_PARAMETERS_LENGTH = 500
+
+profile_log = logging.getLogger("ecotrack.sql_profile")
+slow_query_log = logging.getLogger("ecotrack.slow_queries")
+
+
+def _types(parameters):
+    if isinstance(parameters, dict):
+        return {key: _types(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_types(value) for value in parameters]
+    return type(parameters).__name__
+
+
+def _parameters(parameters):
+    # the values hold password hashes, tokens and usernames, so only
+    # their types are logged unless asked for
+    if not current_app.config["SQL_LOG_PARAMETERS"]:
+        parameters = _types(parameters)
+    text = repr(parameters)
+    if len(text) > MAX_PARAMETERS_LENGTH:
+        text = text[:MAX_PARAMETERS_LENGTH] + "..."
+    return text
+
+
+def call_site(root):
+    """
+    Find the innermost frame of the app on the current stack.
+
+    Args:
+        root (str): The directory of the app.
+
+    Returns:
+        str: The file, line and function of the frame, or None when the
+        statement was not run from the app.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(root)
+                and filename not in (__file__, sql_timing.__file__)
+                and "site-packages" not in filename):
+            path = os.path.relpath(filename, root)
+            return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _observe_statement(statement, parameters, seconds):
+    elapsed = seconds * 1000
+    if not has_app_context():
+        return
+    threshold = current_app.config["SLOW_QUERY_MS"]
+    slow = bool(threshold) and elapsed >= threshold
+    profile = g.get("sql_profile") if has_request_context() else None
+    if profile is None and not slow:
+        return
+
+    entry = {
+        "statement": statement,
+        "parameters": _parameters(parameters),
+        "duration_ms": round(elapsed, 3),
+        "call_site": call_site(current_app.root_path),
+    }
+    if profile is not None:
+        profile.append(entry)
+    if slow:
+        record = {"event": "slow_query", "threshold_ms": threshold}
+        if has_request_context():
+            record.update(method=request.method, path=request.path)
+        record.update(entry)
+        slow_query_log.warning(json.dumps(record))
+
+
+def _profiling_requested():
+    mode = current_app.config["SQL_PROFILER"]
+    if mode == "always":
+        return True
+    if mode == "header":
+        header = current_app.config["SQL_PROFILER_HEADER"]
+        return request.headers.get(header, "").lower() in ("1", "true", "yes")
+    return False
+
+
+def server_timing(profile, total_ms):
+    """
+    Build the Server-Timing header of a profiled request.
+
+    Args:
+        profile (list): The statements recorded for the request.
+        total_ms (float): The time spent handling the request.
+
+    Returns:
+        str: The header value.
+    """
+    sql_ms = sum(entry["duration_ms"] for entry in profile)
+    slowest_ms = max((entry["duration_ms"] for entry in profile), default=0)
+    return ", ".join([
+        f'sql;dur={sql_ms:.3f};desc="{len(profile)} statements"',
+        f'sql-slowest;dur={slowest_ms:.3f}',
+        f'app;dur={total_ms:.3f}',
+    ])
+
+
+def init_app(app):
+    """
+    Register the profiler and the slow-query log on the app's engine.
+
+    Must run after db.init_app().
+    """
+    config_from_env(app, DEFAULTS)
+    with app.app_context():
+        sql_timing.observe_statements(db.engine, _observe_statement)
+
+    @app.before_request
+    def start_sql_profile():
+        if _profiling_requested():
+            g.sql_profile = []
+            g.sql_profile_start = time.perf_counter()
+
+    @app.after_request
+    def finish_sql_profile(response):
+        profile = g.pop("sql_profile", None)
+        if profile is None:
+            return response
+        total_ms = (time.perf_counter() - g.sql_profile_start) * 1000
+        response.headers.add(
+            "Server-Timing", server_timing(profile, total_ms))
+        profile_log.info(json.dumps({
+            "event": "sql_profile",
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(total_ms, 3),
+            "statements": profile,
+        }))
+        return response
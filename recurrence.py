@@ -0,0 +1,56 @@
+"""
+This module expands recurrence rules into lists of dates.
+
+A rule is a subset of iCalendar RRULEs: a daily or weekly frequency, an
+interval, optional weekdays for weekly rules, a start date and an
+inclusive end date, e.g. "every Tuesday until 2024-06-30".
+"""
+
+from datetime import timedelta
+
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+def expand_recurrence(start, until, freq="weekly", interval=1,
+                      weekdays=None, limit=None):
+    """
+    List the dates of a recurrence.
+
+    Args:
+        start (date): The first date the rule may produce.
+        until (date): The last date the rule may produce.
+        freq (str): "daily" or "weekly".
+        interval (int): Produce every ``interval`` days or weeks.
+        weekdays (list): For weekly rules, the weekdays ("MO" to "SU")
+        to produce, defaults to the weekday of ``start``.
+        limit (int): Stop after this many dates.
+
+    Returns:
+        list: The dates of the recurrence, in order.
+    """
+    dates = []
+    if freq == "daily":
+        step = timedelta(days=interval)
+        day = start
+        while day <= until and (limit is None or len(dates) < limit):
+            dates.append(day)
+            day += step
+        return dates
+
+    if weekdays:
+        days = sorted(WEEKDAYS.index(weekday) for weekday in set(weekdays))
+    else:
+        days = [start.weekday()]
+    week = start - timedelta(days=start.weekday())
+    step = timedelta(weeks=interval)
+    while week <= until:
+        for weekday in days:
+            day = week + timedelta(days=weekday)
+            if day < start:
+                continue
+            if day > until or (limit is not None and len(dates) >= limit):
+                return dates
+            dates.append(day)
+        week += step
+    return dates
@@ -3,13 +3,15 @@ This module contains a bluepring for the admin resources
 """
 
 from flask.views import MethodView
-from flask_smorest import Blueprint, abort
+from flask_smorest import abort
 from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required, get_jwt
 
 from db import db
+from response_cache import cached
+from pagination import Blueprint
 from models.admin import AdminModel
-from schemas import AdminSchema
+from schemas import AdminSchema, AdminPageSchema
 
 
 blp = Blueprint(
@@ -26,19 +28,27 @@ class Admins(MethodView):
     """
 
     @jwt_required()
-    @blp.response(200, AdminSchema(many=True))
+    @cached()
+    @blp.response(200, AdminPageSchema)
+    @blp.cursor_paginate()
     def get(self):
         """
-        Get all admins in the database
+        Get a page of the admins in the database
+
+        Query Args:
+            limit (int): The maximum number of admins to return
+            after (int): The cursor returned as next_cursor by the
+            previous page
 
         Returns:
-            dict: A dictionary containing all admins in the database
+            dict: A dictionary containing a page of admins and the
+            cursor of the next page
         """
         jwt = get_jwt()
 
         if jwt.get("role") != "admin":
             abort(403, message="Admin privileges required to view all admins")
-        return AdminModel.query.all()
+        return AdminModel.query
 
     @jwt_required()
     @blp.response(201, AdminSchema())
@@ -78,6 +88,7 @@ class Admin(MethodView):
     """
 
     @jwt_required()
+    @cached()
     @blp.response(200, AdminSchema)
     def get(self, admin_id):
         """
@@ -2,14 +2,28 @@
 Blueprint for handling collection dates
 """
 
+from datetime import date
+
 from flask.views import MethodView
-from flask_smorest import Blueprint, abort
+from flask_smorest import abort
+from sqlalchemy import insert, select
 from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required, get_jwt
 
+from assignment import record_dates
+from capacity import collector_capacity
 from db import db
+from identity import current_collector_id, entity_claims
+from jobs import enqueue
+from loaders import eager
+from response_cache import cached, cached_route
+from pagination import Blueprint, cursor_rows, cursor_statement
 from models import CollectionDateModel
-from schemas import CollectionDateSchema
+from recurrence import expand_recurrence
+from schemas import CollectionDateSchema, CollectionDatePageSchema
+from schemas import CollectionDateBulkSchema, CollectionDateBulkResultSchema
+from schemas import JobSchema, RebalanceArgsSchema, ReminderArgsSchema
+from resources.jobs import job_accepted
 
 
 blp = Blueprint(
@@ -18,6 +32,78 @@ blp = Blueprint(
     description="Operations on collection dates"
 )
 
+# Maximum number of dates created by one bulk request
+MAX_BULK_DATES = 366
+
+
+def collection_dates_query(jwt):
+    """
+    Select the collection dates the caller may list.
+
+    Args:
+        jwt (dict): The claims of the access token.
+
+    Returns:
+        Select: The statement on the collection dates, with the
+        relationships of the schema eagerly loaded.
+
+    Raises:
+        abort(403): If the role of the caller may not list dates.
+    """
+    user_role = jwt.get("role")
+    statement = eager(CollectionDateModel, select(CollectionDateModel))
+
+    if user_role in ("admin", "household"):
+        return statement
+
+    if user_role == "collector":
+        return statement.where(
+            CollectionDateModel.collector_id == current_collector_id(jwt))
+
+    abort(
+        403,
+        message="Admin/household/collector privileges required"
+        )
+
+
+@cached_route("collection_dates", "collection_requests")
+async def get_collection_dates(request):
+    """
+    Get a page of the collection dates, with an async session.
+
+    Served by the ASGI app in place of CollectionDates.get.
+    """
+    page_params = request.page_params()
+    # looked up here for tokens without the claim, off the sync session
+    claims = await entity_claims(request.claims, request.session)
+    statement = cursor_statement(collection_dates_query(claims), page_params)
+    rows = (await request.session.scalars(statement)).all()
+    page = {
+        "items": cursor_rows(rows, page_params),
+        "next_cursor": page_params.next_cursor,
+    }
+    return CollectionDatePageSchema().dump(page), request.link(page_params)
+
+
+@cached_route("collection_dates", "collection_requests")
+async def get_collection_date(request, collection_date_id):
+    """
+    Get a collection date by ID, with an async session.
+
+    Served by the ASGI app in place of CollectionDate.get.
+    """
+    if request.claims.get("role") not in ("collector", "admin"):
+        abort(
+            403,
+            message="Collector privileges required to view collection dates"
+            )
+    collection_date = (await request.session.scalars(
+        eager(CollectionDateModel, select(CollectionDateModel)).where(
+            CollectionDateModel.id == collection_date_id))).first()
+    if collection_date is None:
+        abort(404)
+    return CollectionDateSchema().dump(collection_date), {}
+
 
 @blp.route("/collection_dates")
 class CollectionDates(MethodView):
@@ -25,25 +111,23 @@ class CollectionDates(MethodView):
     Class for handling requests to the /collection_dates endpoint
     """
     @jwt_required()
-    @blp.response(200, CollectionDateSchema(many=True))
+    @cached("collection_requests")
+    @blp.response(200, CollectionDatePageSchema)
+    @blp.cursor_paginate()
     def get(self):
         """
-        Get all collection dates in the database
+        Get a page of the collection dates in the database
+
+        Query Args:
+            limit (int): The maximum number of collection dates to return
+            after (int): The cursor returned as next_cursor by the
+            previous page
 
         Returns:
-            dict: A dictionary containing all collection dates
-            in the database
+            dict: A dictionary containing a page of collection dates
+            and the cursor of the next page
         """
-        jwt = get_jwt()
-
-        user_role = jwt.get("role")
-
-        if user_role in ("admin", "household"):
-            return CollectionDateModel.query.all()
-
-        if user_role == "collector":
-            return CollectionDateModel.query.filter_by(
-                collector_id=jwt.get("sub")).all()
+        return collection_dates_query(get_jwt())
 
     @jwt_required()
     @blp.arguments(CollectionDateSchema)
@@ -52,6 +136,9 @@ class CollectionDates(MethodView):
         """
         Add a new collection date to the database.
 
+        The date takes the capacity of the collector unless the data
+        gives one.
+
         Args:
             collection_date_data (dict): A dictionary containing the data
             for the new collection date.
@@ -71,7 +158,11 @@ class CollectionDates(MethodView):
                 message="Collector privilege required to add collection dates"
                 )
 
-        collection_date = CollectionDateModel(**collection_date_data)
+        collector_id = current_collector_id(jwt)
+        collection_date_data.setdefault(
+            "capacity", collector_capacity(db.session, collector_id))
+        collection_date = CollectionDateModel(
+            **collection_date_data, collector_id=collector_id)
 
         try:
             db.session.add(collection_date)
@@ -83,6 +174,168 @@ class CollectionDates(MethodView):
         return collection_date
 
 
+@blp.route("/collection_dates/bulk")
+class CollectionDatesBulk(MethodView):
+    """
+    Class for handling requests to the /collection_dates/bulk endpoint
+    """
+    @jwt_required()
+    @blp.arguments(CollectionDateBulkSchema)
+    @blp.response(201, CollectionDateBulkResultSchema)
+    def post(self, bulk_data):
+        """
+        Add a batch of collection dates to the database.
+
+        The dates are either listed or produced by a recurrence rule.
+        Dates in the past, repeated in the batch or already scheduled by
+        the collector are reported as errors; the others are inserted in
+        one statement and one transaction.
+
+        Args:
+            bulk_data (dict): A dictionary containing either the list of
+            dates or the recurrence rule.
+
+        Returns:
+            dict: A dictionary containing the created collection dates
+            and the rejected dates with their error.
+
+        Raises:
+            abort(400, message): If there is an error adding the collection
+            dates to the database.
+        """
+        jwt = get_jwt()
+
+        if jwt.get("role") != "collector":
+            abort(
+                403,
+                message="Collector privilege required to add collection dates"
+                )
+        collector_id = current_collector_id(jwt)
+
+        if "recurrence" in bulk_data:
+            dates = expand_recurrence(
+                **bulk_data["recurrence"], limit=MAX_BULK_DATES + 1)
+            if len(dates) > MAX_BULK_DATES:
+                abort(
+                    422,
+                    message=f"Recurrence produces more than {MAX_BULK_DATES}"
+                    " dates"
+                    )
+        else:
+            dates = bulk_data["dates"]
+
+        scheduled = set(db.session.scalars(
+            select(CollectionDateModel.collection_date).where(
+                CollectionDateModel.collector_id == collector_id,
+                CollectionDateModel.collection_date.in_(set(dates)))))
+
+        capacity = collector_capacity(db.session, collector_id)
+        today = date.today()
+        rows = []
+        errors = []
+        for index, collection_date in enumerate(dates):
+            if collection_date < today:
+                message = "Collection date is in the past"
+            elif collection_date in scheduled:
+                message = "Collection date already scheduled"
+            else:
+                scheduled.add(collection_date)
+                rows.append({
+                    "collection_date": collection_date,
+                    "collector_id": collector_id,
+                    "capacity": capacity,
+                })
+                continue
+            errors.append({
+                "index": index,
+                "date": collection_date,
+                "message": message,
+            })
+
+        created = []
+        if rows:
+            try:
+                created = db.session.execute(
+                    insert(CollectionDateModel).returning(
+                        CollectionDateModel.id,
+                        CollectionDateModel.collection_date),
+                    rows).mappings().all()
+                record_dates(db.session, created, collector_id, capacity)
+                db.session.commit()
+            except SQLAlchemyError as error:
+                db.session.rollback()
+                abort(400, message=str(error))
+
+        return {"created": created, "errors": errors}
+
+
+@blp.route("/collection_dates/rebalance")
+class CollectionDatesRebalance(MethodView):
+    """
+    Class for handling requests to the /collection_dates/rebalance endpoint
+    """
+    @jwt_required()
+    @blp.arguments(RebalanceArgsSchema)
+    @blp.response(202, JobSchema)
+    def post(self, rebalance_args):
+        """
+        Queue a rebalancing of the collection dates over their capacity
+
+        Args:
+            rebalance_args (dict): The area to rebalance, every area by
+            default, and the number of days a request may move (window)
+
+        Returns:
+            tuple: The queued job and the HTTP status code 202
+
+        Raises:
+            403: If the user is not an admin
+        """
+        jwt = get_jwt()
+        if jwt.get("role") != "admin":
+            abort(
+                403,
+                message="Admin privileges required to rebalance dates"
+                )
+        return job_accepted(enqueue(
+            "rebalance", RebalanceArgsSchema().dump(rebalance_args),
+            user_id=jwt.get("sub")))
+
+
+@blp.route("/collection_dates/reminders")
+class CollectionDatesReminders(MethodView):
+    """
+    Class for handling requests to the /collection_dates/reminders endpoint
+    """
+    @jwt_required()
+    @blp.arguments(ReminderArgsSchema)
+    @blp.response(202, JobSchema)
+    def post(self, reminder_args):
+        """
+        Queue the reminders of the households with a pending collection
+        request on a day
+
+        Args:
+            reminder_args (dict): The day, REMINDER_DAYS_AHEAD days from
+            today by default
+
+        Returns:
+            tuple: The queued job and the HTTP status code 202
+
+        Raises:
+            403: If the user is not an admin
+        """
+        jwt = get_jwt()
+        if jwt.get("role") != "admin":
+            abort(
+                403,
+                message="Admin privileges required to send reminders"
+                )
+        return job_accepted(enqueue(
+            "reminders", ReminderArgsSchema().dump(reminder_args),
+            user_id=jwt.get("sub")))
+
+
 @blp.route("/collection_dates/<collection_date_id>")
 class CollectionDate(MethodView):
     """
@@ -90,6 +343,7 @@ class CollectionDate(MethodView):
     endpoint
     """
     @jwt_required()
+    @cached("collection_requests")
     @blp.response(200, CollectionDateSchema)
     def get(self, collection_date_id):
         """
@@ -104,7 +358,7 @@ class CollectionDate(MethodView):
         """
         jwt = get_jwt()
         if jwt.get("role") in ("collector", "admin"):
-            return CollectionDateModel.query.get_or_404(collection_date_id)
+            return eager(CollectionDateModel).get_or_404(collection_date_id)
 
         abort(
             403,
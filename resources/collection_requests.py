@@ -2,14 +2,34 @@
 Blueprint for handling collection requests
 """
 
+from datetime import date
+
+from flask import Response, stream_with_context
 from flask.views import MethodView
-from flask_smorest import Blueprint, abort
+from flask_smorest import abort
+from sqlalchemy import case, insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required, get_jwt
 
+from assignment import assign_collection_date, record_requests
+from capacity import release, reserve
 from db import db
-from models import CollectionRequestModel
-from schemas import CollectionRequestSchema
+from export import CONTENT_TYPES, export_statement, stream_export
+from identity import current_collector_id, current_household_id
+from identity import entity_claims
+from jobs import enqueue
+from loaders import eager
+from response_cache import cached, cached_route
+from pagination import Blueprint, cursor_rows, cursor_statement
+from models import CollectionRequestModel, CollectionDateModel
+from schemas import CollectionRequestSchema, CollectionRequestPageSchema
+from schemas import CollectionRequestBulkSchema
+from schemas import CollectionRequestBulkResultSchema
+from schemas import CollectionRequestStatusUpdateSchema
+from schemas import CollectionRequestStatusResultSchema
+from schemas import CollectionRequestExportArgsSchema
+from schemas import JobSchema
+from resources.jobs import job_accepted
 
 
 blp = Blueprint(
@@ -19,32 +39,95 @@ blp = Blueprint(
 )
 
 
+def collection_requests_query(jwt):
+    """
+    Select the collection requests the caller may list.
+
+    Args:
+        jwt (dict): The claims of the access token.
+
+    Returns:
+        Select: The statement on the collection requests, with the
+        relationships of the schema eagerly loaded.
+
+    Raises:
+        abort(403): If the caller is neither an admin nor a household.
+    """
+    statement = eager(CollectionRequestModel, select(CollectionRequestModel))
+    if jwt.get("role") == "admin":
+        return statement
+    if jwt.get("role") == "household":
+        return statement.where(
+            CollectionRequestModel.household_id == current_household_id(jwt))
+
+    abort(
+        403,
+        message="Admin/household privileges required to access resources"
+        )
+
+
+@cached_route(
+    "collection_requests", "households", "collection_dates")
+async def get_collection_requests(request):
+    """
+    Get a page of the collection requests, with an async session.
+
+    Served by the ASGI app in place of CollectionRequests.get.
+    """
+    page_params = request.page_params()
+    # looked up here for tokens without the claim, off the sync session
+    claims = await entity_claims(request.claims, request.session)
+    statement = cursor_statement(
+        collection_requests_query(claims), page_params)
+    rows = (await request.session.scalars(statement)).unique().all()
+    page = {
+        "items": cursor_rows(rows, page_params),
+        "next_cursor": page_params.next_cursor,
+    }
+    return (
+        CollectionRequestPageSchema().dump(page), request.link(page_params))
+
+
+@cached_route(
+    "collection_requests", "households", "collection_dates")
+async def get_collection_request(request, collection_request_id):
+    """
+    Get a collection request by ID, with an async session.
+
+    Served by the ASGI app in place of CollectionRequest.get.
+    """
+    collection_request = (await request.session.scalars(
+        eager(CollectionRequestModel, select(CollectionRequestModel)).where(
+            CollectionRequestModel.id == collection_request_id)
+    )).unique().first()
+    if collection_request is None:
+        abort(404)
+    return CollectionRequestSchema().dump(collection_request), {}
+
+
 @blp.route("/collection_requests")
 class CollectionRequests(MethodView):
     """
     Class for handling requests to the /collection_requests endpoint
     """
     @jwt_required()
-    @blp.response(200, CollectionRequestSchema(many=True))
+    @cached("households", "collection_dates")
+    @blp.response(200, CollectionRequestPageSchema)
+    @blp.cursor_paginate()
     def get(self):
         """
-        Get all collection requests in the database
+        Get a page of the collection requests in the database
+
+        Query Args:
+            limit (int): The maximum number of collection requests to return
+            after (int): The cursor returned as next_cursor by the
+            previous page
 
         Returns:
-            dict: A dictionary containing all collection requests in
-            the database
+            dict: A dictionary containing a page of collection requests
+            and the cursor of the next page
         """
-        jwt = get_jwt()
-        if jwt.get("role") == "admin":
-            return CollectionRequestModel.query.all()
-        else:
-            return CollectionRequestModel.query.filter_by(
-                household_id=jwt.get("sub")).all()
-
-        abort(
-            403,
-            message="Admin/household privileges required to access resources"
-            )
+        return collection_requests_query(get_jwt())
 
     @jwt_required()
     @blp.arguments(CollectionRequestSchema)
@@ -53,6 +136,11 @@ class CollectionRequests(MethodView):
         """
         Add a new collection request to the database
 
+        A place is reserved on the collection date of the request.
+        Without a collection_date_id, the request is given the earliest
+        upcoming collection date of the area of the household with room
+        for it.
+
         Args:
             collection_request_data (dict): A dictionary containing the
             data for the new collection request
@@ -63,6 +151,10 @@ class CollectionRequests(MethodView):
         Raises:
             abort(400, message): If there is an error adding the collection
             request to the database
+            abort(403, message): If the request is for another household
+            abort(404): If the collection date does not exist
+            abort(409, message): If no collection date can take the request
+            or the collection date is full
         """
         jwt = get_jwt()
         if jwt.get("role") != "household":
@@ -70,6 +162,26 @@ class CollectionRequests(MethodView):
                 403,
                 message="Household privileges required to access resources"
                 )
+        household_id = current_household_id(jwt)
+        if collection_request_data["household_id"] != household_id:
+            abort(
+                403,
+                message="Cannot request a collection for another household"
+                )
+        date_id = collection_request_data.get("collection_date_id")
+        if date_id is None:
+            date_id = assign_collection_date(household_id)
+            if date_id is None:
+                abort(
+                    409,
+                    message="No upcoming collection date with room in the "
+                    "area of the household"
+                    )
+            collection_request_data["collection_date_id"] = date_id
+        elif not reserve(db.session, [date_id]):
+            db.session.rollback()
+            db.get_or_404(CollectionDateModel, date_id)
+            abort(409, message="Collection date is full")
 
         collection_request = CollectionRequestModel(**collection_request_data)
         try:
@@ -82,6 +194,252 @@ class CollectionRequests(MethodView):
         return collection_request
 
 
+@blp.route("/collection_requests/bulk")
+class CollectionRequestsBulk(MethodView):
+    """
+    Class for handling requests to the /collection_requests/bulk endpoint
+    """
+    @jwt_required()
+    @blp.arguments(CollectionRequestBulkSchema)
+    @blp.response(201, CollectionRequestBulkResultSchema)
+    def post(self, bulk_data):
+        """
+        Add a batch of collection requests for the household of the user.
+
+        Requests on unknown, past or full collection dates, or on dates
+        the household already requested, are reported as errors; the
+        others reserve their places and are inserted in one statement and
+        one transaction.
+
+        Args:
+            bulk_data (dict): A dictionary containing the list of requests.
+
+        Returns:
+            dict: A dictionary containing the created collection requests
+            and the rejected requests with their error.
+
+        Raises:
+            abort(400, message): If there is an error adding the collection
+            requests to the database
+        """
+        jwt = get_jwt()
+        if jwt.get("role") != "household":
+            abort(
+                403,
+                message="Household privileges required to access resources"
+                )
+        household_id = current_household_id(jwt)
+
+        date_ids = {item["collection_date_id"]
+                    for item in bulk_data["requests"]}
+        dates = dict(db.session.execute(
+            select(
+                CollectionDateModel.id,
+                CollectionDateModel.collection_date
+            ).where(CollectionDateModel.id.in_(date_ids))).all())
+        requested = set(db.session.scalars(
+            select(CollectionRequestModel.collection_date_id).where(
+                CollectionRequestModel.household_id == household_id,
+                CollectionRequestModel.collection_date_id.in_(date_ids))))
+
+        today = date.today()
+        accepted = []
+        errors = []
+        for index, item in enumerate(bulk_data["requests"]):
+            date_id = item["collection_date_id"]
+            if date_id not in dates:
+                message = "Collection date not found"
+            elif dates[date_id] < today:
+                message = "Collection date has passed"
+            elif date_id in requested:
+                message = "Collection already requested"
+            else:
+                requested.add(date_id)
+                accepted.append((index, date_id))
+                continue
+            errors.append({
+                "index": index,
+                "collection_date_id": date_id,
+                "message": message,
+            })
+
+        created = []
+        rows = []
+        try:
+            reserved = reserve(
+                db.session, [date_id for _, date_id in accepted])
+        except SQLAlchemyError as error:
+            db.session.rollback()
+            abort(400, message=str(error))
+        for index, date_id in accepted:
+            if date_id in reserved:
+                rows.append({
+                    "status": "pending",
+                    "household_id": household_id,
+                    "collection_date_id": date_id,
+                })
+            else:
+                errors.append({
+                    "index": index,
+                    "collection_date_id": date_id,
+                    "message": "Collection date is full",
+                })
+        errors.sort(key=lambda error: error["index"])
+
+        if rows:
+            try:
+                created = db.session.execute(
+                    insert(CollectionRequestModel).returning(
+                        CollectionRequestModel.id,
+                        CollectionRequestModel.status,
+                        CollectionRequestModel.household_id,
+                        CollectionRequestModel.collection_date_id),
+                    rows).mappings().all()
+                record_requests(
+                    db.session, [row["collection_date_id"] for row in rows])
+                db.session.commit()
+            except SQLAlchemyError as error:
+                db.session.rollback()
+                abort(400, message=str(error))
+
+        return {"created": created, "errors": errors}
+
+
+@blp.route("/collection_requests/status")
+class CollectionRequestsStatus(MethodView):
+    """
+    Class for handling requests to the /collection_requests/status endpoint
+    """
+    @jwt_required()
+    @blp.arguments(CollectionRequestStatusUpdateSchema)
+    @blp.response(200, CollectionRequestStatusResultSchema)
+    def patch(self, status_data):
+        """
+        Change the status of a batch of collection requests.
+
+        Only requests on collection dates of the collector of the user are
+        changed. All changes run as a single UPDATE statement.
+
+        Args:
+            status_data (dict): A dictionary containing the list of
+            request IDs and their new status.
+
+        Returns:
+            dict: A dictionary containing the IDs of the updated requests
+            and of the requests that were not found or not assigned to
+            the collector.
+
+        Raises:
+            abort(400, message): If there is an error updating the
+            collection requests
+        """
+        jwt = get_jwt()
+        if jwt.get("role") != "collector":
+            abort(
+                403,
+                message="Collector privileges required to update requests"
+                )
+        collector_id = current_collector_id(jwt)
+
+        statuses = {item["id"]: item["status"]
+                    for item in status_data["updates"]}
+        collector_dates = select(CollectionDateModel.id).where(
+            CollectionDateModel.collector_id == collector_id)
+        statement = (
+            update(CollectionRequestModel)
+            .where(
+                CollectionRequestModel.id.in_(statuses),
+                CollectionRequestModel.collection_date_id.in_(
+                    collector_dates))
+            .values(status=case(statuses, value=CollectionRequestModel.id))
+            .returning(CollectionRequestModel.id)
+        )
+
+        try:
+            updated = set(db.session.scalars(
+                statement,
+                execution_options={"synchronize_session": False}))
+            db.session.commit()
+        except SQLAlchemyError as error:
+            db.session.rollback()
+            abort(400, message=str(error))
+
+        return {
+            "updated": sorted(updated),
+            "not_updated": sorted(set(statuses) - updated),
+        }
+
+
+@blp.route("/collection_requests/export")
+class CollectionRequestsExport(MethodView):
+    """
+    Class for handling requests to the /collection_requests/export endpoint
+    """
+    @jwt_required()
+    @blp.arguments(CollectionRequestExportArgsSchema, location="query")
+    def get(self, export_args):
+        """
+        Stream the collection requests as NDJSON or CSV
+
+        Query Args:
+            format (str): "ndjson" (default) or "csv"
+            from (date): The first collection date to export
+            to (date): The last collection date to export
+            area (str): The household area to export
+
+        Returns:
+            Response: A streamed response with one line per collection
+            request, ordered by id
+        """
+        jwt = get_jwt()
+        if jwt.get("role") != "admin":
+            abort(
+                403,
+                message="Admin privileges required to export requests"
+                )
+
+        export_format = export_args.pop("format")
+        statement = export_statement(**export_args)
+        return Response(
+            stream_with_context(stream_export(statement, export_format)),
+            mimetype=CONTENT_TYPES[export_format],
+            headers={
+                "Content-Disposition":
+                    f"attachment; filename=collection_requests."
+                    f"{export_format}",
+            }
+        )
+
+    @jwt_required()
+    @blp.arguments(CollectionRequestExportArgsSchema)
+    @blp.response(202, JobSchema)
+    def post(self, export_args):
+        """
+        Queue an export of the collection requests to a file
+
+        Args:
+            export_args (dict): The format, from, to and area, as the
+            query arguments of GET
+
+        Returns:
+            tuple: The queued job, whose file is served by
+            /jobs/<job_id>/file once it succeeded, and the HTTP status
+            code 202
+
+        Raises:
+            403: If the user is not an admin
+        """
+        jwt = get_jwt()
+        if jwt.get("role") != "admin":
+            abort(
+                403,
+                message="Admin privileges required to export requests"
+                )
+        return job_accepted(enqueue(
+            "export", CollectionRequestExportArgsSchema().dump(export_args),
+            user_id=jwt.get("sub")))
+
+
 @blp.route("/collection_requests/<collection_request_id>")
 class CollectionRequest(MethodView):
     """
@@ -89,6 +447,7 @@ class CollectionRequest(MethodView):
     /collection_requests/<collection_request_id> endpoint
     """
     @jwt_required()
+    @cached("households", "collection_dates")
     @blp.response(200, CollectionRequestSchema)
     def get(self, collection_request_id):
         """
@@ -105,7 +464,7 @@ class CollectionRequest(MethodView):
             NotFound: If the collection request with the given ID does
             not exist
         """
-        return CollectionRequestModel.query.get_or_404(collection_request_id)
+        return eager(CollectionRequestModel).get_or_404(collection_request_id)
 
     @jwt_required()
     def delete(self, collection_request_id):
@@ -122,7 +481,7 @@ class CollectionRequest(MethodView):
 
         Raises:
             NotFound: If the collection request with the given ID does
-            not exist
+            not exist or belongs to another household
         """
         jwt = get_jwt()
         if jwt.get("role") != "household":
@@ -131,8 +490,11 @@ class CollectionRequest(MethodView):
                 message="Household privilege required to do this action"
                 )
 
-        collection_request = CollectionRequestModel.query.get_or_404(
-            collection_request_id)
+        collection_request = CollectionRequestModel.query.filter_by(
+            id=collection_request_id,
+            household_id=current_household_id(jwt)
+            ).first_or_404()
+        release(db.session, collection_request.collection_date_id)
         db.session.delete(collection_request)
         db.session.commit()
         return {"message": "Collection request deleted successfully."}
@@ -3,13 +3,19 @@ Blueprint for handling requests to the /collectors endpoint
 """
 
 from flask.views import MethodView
-from flask_smorest import Blueprint, abort
+from flask_smorest import abort
 from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required, get_jwt
 
 from db import db
+from identity import current_collector_id
+from loaders import eager
+from response_cache import cached
+from pagination import Blueprint
 from models import CollectorModel
-from schemas import CollectorSchema
+from schedule import collector_schedule
+from schemas import CollectorSchema, CollectorPageSchema
+from schemas import CollectorScheduleArgsSchema, CollectorScheduleSchema
 
 
 blp = Blueprint(
@@ -25,13 +31,21 @@ class Collectors(MethodView):
     Class for handling requests to the /collectors endpoint
     """
     @jwt_required()
-    @blp.response(200, CollectorSchema(many=True))
+    @cached("collection_dates")
+    @blp.response(200, CollectorPageSchema)
+    @blp.cursor_paginate()
     def get(self):
         """
-        Get all collectors in the database
+        Get a page of the collectors in the database
+
+        Query Args:
+            limit (int): The maximum number of collectors to return
+            after (int): The cursor returned as next_cursor by the
+            previous page
 
         Returns:
-            dict: A dictionary containing all collectors in the database
+            dict: A dictionary containing a page of collectors and the
+            cursor of the next page
         """
         jwt = get_jwt()
 
@@ -40,7 +54,7 @@ class Collectors(MethodView):
                 403,
                 message="Admin privileges required to access resources"
                 )
-        return CollectorModel.query.all()
+        return eager(CollectorModel)
 
     @jwt_required()
     @blp.arguments(CollectorSchema)
@@ -76,12 +90,49 @@ class Collectors(MethodView):
         return collector
 
 
+@blp.route("/collectors/me/schedule")
+class CollectorSchedule(MethodView):
+    """
+    Class for handling requests to the /collectors/me/schedule endpoint
+    """
+    @jwt_required()
+    @cached("collection_dates", "collection_requests", "households")
+    @blp.arguments(CollectorScheduleArgsSchema, location="query")
+    @blp.response(200, CollectorScheduleSchema)
+    def get(self, schedule_args):
+        """
+        Get the route sheet of the authenticated collector
+
+        Query Args:
+            from (date): The first day, today by default
+            to (date): The last day, a week after from by default
+            order (str): "area" (default) to sort the collection requests
+            by area, "route" to order them along the route of each date
+
+        Returns:
+            dict: A dictionary containing the collection dates of the
+            collector in the range, each with its collection requests and
+            their household
+
+        Raises:
+            403: If the user is not a collector
+        """
+        jwt = get_jwt()
+        if jwt.get("role") != "collector":
+            abort(
+                403,
+                message="Collector privileges required to view a schedule"
+                )
+        return collector_schedule(current_collector_id(jwt), **schedule_args)
+
+
 @blp.route("/collectors/<collector_id>")
 class Collector(MethodView):
     """
     Class for handling requests to the /collectors/<collector_id> endpoint
     """
     @jwt_required()
+    @cached("collection_dates")
     @blp.response(200, CollectorSchema)
     def get(self, collector_id):
         """
@@ -100,7 +151,7 @@ class Collector(MethodView):
         jwt = get_jwt()
         user_role = jwt.get("role")
         if user_role == "admin":
-            return CollectorModel.query.get_or_404(collector_id)
+            return eager(CollectorModel).get_or_404(collector_id)
         abort(
             403,
             message="Admin/collector privileges required"
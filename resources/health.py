@@ -0,0 +1,51 @@
+"""
+Blueprint for handling requests to the /health endpoints
+"""
+
+from flask import current_app
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+from sqlalchemy.exc import SQLAlchemyError
+
+from db import db
+from engine_options import check_database, pool_status
+from schemas import DatabaseHealthSchema
+
+
+blp = Blueprint(
+    "health",
+    __name__,
+    description="Service health checks"
+)
+
+
+@blp.route("/health/db")
+class DatabaseHealth(MethodView):
+    """
+    Class for handling requests to the /health/db endpoint
+    """
+    @blp.response(200, DatabaseHealthSchema)
+    def get(self):
+        """
+        Check the database connection
+
+        Returns:
+            dict: A dictionary containing the status, the round trip of a
+            trivial query in milliseconds and the pool checkout statistics
+
+        Raises:
+            abort(503, message): If the database cannot be reached
+        """
+        try:
+            latency = check_database()
+        except SQLAlchemyError:
+            # driver errors name the host, database and user, so they are
+            # only logged
+            current_app.logger.exception("Database health check failed")
+            abort(503, message="The database is unavailable.")
+
+        return {
+            "status": "ok",
+            "latency_ms": latency,
+            "pool": pool_status(db.engine),
+        }
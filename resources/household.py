@@ -3,13 +3,16 @@ Blueprint for household resources
 """
 
 from flask.views import MethodView
-from flask_smorest import Blueprint, abort
+from flask_smorest import abort
 from sqlalchemy.exc import SQLAlchemyError
 from flask_jwt_extended import jwt_required, get_jwt
 
 from db import db
+from loaders import eager
+from response_cache import cached
+from pagination import Blueprint
 from models import HouseholdModel
-from schemas import HouseholdSchema
+from schemas import HouseholdSchema, HouseholdPageSchema
 
 
 blp = Blueprint(
@@ -25,17 +28,25 @@ class Households(MethodView):
     Class for handling requests to the /households endpoint
     """
     @jwt_required()
-    @blp.response(200, HouseholdSchema(many=True))
+    @cached("collection_requests")
+    @blp.response(200, HouseholdPageSchema)
+    @blp.cursor_paginate()
     def get(self):
         """
-        Get all households in the database
+        Get a page of the households in the database
+
+        Query Args:
+            limit (int): The maximum number of households to return
+            after (int): The cursor returned as next_cursor by the
+            previous page
 
         Returns:
-            dict: A dictionary containing all households in the database
+            dict: A dictionary containing a page of households and the
+            cursor of the next page
         """
         jwt = get_jwt()
         if jwt.get("role") == "admin":
-            return HouseholdModel.query.all()
+            return eager(HouseholdModel)
         abort(403, message="Admin privileges required to access resources")
 
     @jwt_required()
@@ -78,6 +89,7 @@ class Household(MethodView):
     Class for handling requests to the /households/<household_id> endpoint
     """
     @jwt_required()
+    @cached("collection_requests")
     @blp.response(200, HouseholdSchema)
     def get(self, household_id):
         """
@@ -97,7 +109,7 @@ class Household(MethodView):
         user_role = jwt.get("role")
 
         if user_role in ("admin", "collector"):
-            return HouseholdModel.query.get_or_404(household_id)
+            return eager(HouseholdModel).get_or_404(household_id)
         abort(
             403,
             message="Household/admin privileges required to access resources"
@@ -0,0 +1,133 @@
+"""
+Blueprint for handling requests to the /jobs endpoints
+"""
+
+import os
+
+from flask import current_app, send_from_directory, url_for
+from flask.views import MethodView
+from flask_smorest import abort
+from flask_jwt_extended import jwt_required, get_jwt
+
+from db import db
+from export import CONTENT_TYPES
+from pagination import Blueprint
+from models import JobModel
+from schemas import JobSchema, JobPageSchema
+
+
+blp = Blueprint(
+    "jobs",
+    __name__,
+    description="Background jobs"
+)
+
+
+def job_accepted(job):
+    """
+    Build the 202 response of an endpoint that queued a job.
+
+    Returns:
+        tuple: The job and the Location header of its status.
+    """
+    return job, {"Location": url_for("jobs.Job", job_id=job.id)}
+
+
+def visible_job(job_id):
+    """
+    Return a job the caller may see: any job for admins, their own jobs
+    for other users.
+
+    Raises:
+        404: If the job does not exist or belongs to another user.
+    """
+    job = db.get_or_404(JobModel, job_id)
+    jwt = get_jwt()
+    if jwt.get("role") != "admin" and str(job.user_id) != str(jwt.get("sub")):
+        abort(404, message="Job not found")
+    return job
+
+
+@blp.route("/jobs")
+class Jobs(MethodView):
+    """
+    Class for handling requests to the /jobs endpoint
+    """
+    @jwt_required()
+    @blp.response(200, JobPageSchema)
+    @blp.cursor_paginate()
+    def get(self):
+        """
+        Get a page of the background jobs
+
+        Query Args:
+            limit (int): The maximum number of jobs to return
+            after (int): The cursor returned as next_cursor by the
+            previous page
+
+        Returns:
+            dict: A dictionary containing a page of jobs and the cursor
+            of the next page
+        """
+        if get_jwt().get("role") != "admin":
+            abort(403, message="Admin privileges required to view jobs")
+        return JobModel.query
+
+
+@blp.route("/jobs/<int:job_id>")
+class Job(MethodView):
+    """
+    Class for handling requests to the /jobs/<job_id> endpoint
+    """
+    @jwt_required()
+    @blp.response(200, JobSchema)
+    def get(self, job_id):
+        """
+        Get the status of a background job
+
+        Args:
+            job_id (int): The ID of the job
+
+        Returns:
+            JobModel: The job, with its result once it succeeded and the
+            error of its last failed attempt
+
+        Raises:
+            404: If the job is not found
+        """
+        return visible_job(job_id)
+
+
+@blp.route("/jobs/<int:job_id>/file")
+class JobFile(MethodView):
+    """
+    Class for handling requests to the /jobs/<job_id>/file endpoint
+    """
+    @jwt_required()
+    def get(self, job_id):
+        """
+        Download the file written by a background job
+
+        Args:
+            job_id (int): The ID of the job
+
+        Returns:
+            Response: The file
+
+        Raises:
+            404: If the job is not found or wrote no file
+            409: If the job has not succeeded yet
+        """
+        job = visible_job(job_id)
+        if job.status != "succeeded":
+            abort(409, message="Job has not succeeded")
+        if not isinstance(job.result, dict) or "file" not in job.result:
+            abort(404, message="Job wrote no file")
+        directory = current_app.config["JOB_FILES_DIR"]
+        filename = job.result["file"]
+        if not os.path.isfile(os.path.join(directory, filename)):
+            abort(404, message="Job file not found")
+        return send_from_directory(
+            directory, filename,
+            mimetype=CONTENT_TYPES.get(job.result.get("format")),
+            as_attachment=True)
@@ -0,0 +1,79 @@
+"""
+Blueprint for handling requests to the /stats endpoints
+"""
+
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+from flask_jwt_extended import jwt_required, get_jwt
+
+from jobs import enqueue
+from schemas import CollectionStatsArgsSchema, CollectionStatsSchema
+from schemas import JobSchema
+from stats import cached_collection_stats
+from resources.jobs import job_accepted
+
+
+blp = Blueprint(
+    "stats",
+    __name__,
+    description="Aggregated statistics"
+)
+
+
+@blp.route("/stats/collections")
+class CollectionStats(MethodView):
+    """
+    Class for handling requests to the /stats/collections endpoint
+    """
+    @jwt_required()
+    @blp.arguments(CollectionStatsArgsSchema, location="query")
+    @blp.response(200, CollectionStatsSchema)
+    def get(self, stats_args):
+        """
+        Get counts of collection requests
+
+        Query Args:
+            bucket (str): "day" (default), "week" or "month", the size of
+            the collection date groups
+            from (date): The first collection date counted
+            to (date): The last collection date counted
+
+        Returns:
+            dict: A dictionary containing the counts of collection requests
+            by status, household area, collector area and collection date
+        """
+        jwt = get_jwt()
+        if jwt.get("role") != "admin":
+            abort(
+                403,
+                message="Admin privileges required to access statistics"
+                )
+        return cached_collection_stats(**stats_args)
+
+    @jwt_required()
+    @blp.arguments(CollectionStatsArgsSchema)
+    @blp.response(202, JobSchema)
+    def post(self, stats_args):
+        """
+        Queue a count of the collection requests
+
+        Args:
+            stats_args (dict): The bucket, from and to, as the query
+            arguments of GET
+
+        Returns:
+            tuple: The queued job, whose result holds the counts once it
+            succeeded, and the HTTP status code 202
+
+        Raises:
+            403: If the user is not an admin
+        """
+        jwt = get_jwt()
+        if jwt.get("role") != "admin":
+            abort(
+                403,
+                message="Admin privileges required to access statistics"
+                )
+        return job_accepted(enqueue(
+            "collection_stats", CollectionStatsArgsSchema().dump(stats_args),
+            user_id=jwt.get("sub")))
@@ -4,14 +4,12 @@ This module contains the User blueprint.
 
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
-from passlib.hash import pbkdf2_sha256
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt
 
 from db import db
+from hashing import hash_password, verify_password, needs_rehash
 from models import UserModel
-from models import HouseholdModel
-from models import CollectorModel
-from models import AdminModel
+from roles import resolve_role
 from schemas import UserSchema
 
 blp = Blueprint(
@@ -39,13 +37,14 @@ class UserRegister(MethodView):
 
         Raises:
         - 409 Conflict: If a user with the same username already exists.
+        - 503 Service Unavailable: If the password hashing queue is full.
         """
         if UserModel.query.filter_by(username=user_data["username"]).first():
             abort(409, message="User already exists")
 
         user = UserModel(
             username=user_data["username"],
-            password=pbkdf2_sha256.hash(user_data["password"])
+            password=hash_password(user_data["password"])
         )
         db.session.add(user)
         db.session.commit()
@@ -71,25 +70,24 @@ class UserLogin(MethodView):
 
         Raises:
         - 401 Unauthorized: If the username or password is incorrect.
+        - 503 Service Unavailable: If the password hashing queue is full.
         """
         user = UserModel.query.filter_by(
             username=user_data["username"]
             ).first()
         password = user_data["password"]
-        if user is None or not pbkdf2_sha256.verify(password, user.password):
+        if user is None or not verify_password(password, user.password):
             abort(401, message="Incorrect username or password")
 
+        # upgrade hashes made with other rounds than the configured ones
+        if needs_rehash(user.password):
+            user.password = hash_password(password)
+            db.session.commit()
+
         access_token = create_access_token(identity=user.id)
 
-        # check the role of the user
-        if HouseholdModel.query.filter_by(user_id=user.id).first():
-            role = "household"
-        elif CollectorModel.query.filter_by(user_id=user.id).first():
-            role = "collector"
-        elif AdminModel.query.filter_by(user_id=user.id).first():
-            role = "admin"
-        else:
-            role = None
+        # resolved once for the token above, so this is a cache hit
+        role = resolve_role(user.id)
 
         return {
             "message": "Logged in successfully",
@@ -0,0 +1,281 @@
+"""
+This module caches the responses of read endpoints.
+
+Responses are cached per caller: the key holds the role and subject of
+the access token, the path and the query string. Each blueprint has a
+generation counter stored in the backend, and the key of a response holds
+the generations of its blueprint and of the blueprints its data depends
+on. A successful write (POST, PUT, PATCH, DELETE) through a blueprint bumps
+its generation, which makes every response built from its data
+unreachable, in this process and in any process sharing the backend.
+Writes answered with 202 Accepted only queued a background job and bump
+nothing; the job bumps the generations of what it writes, which the web
+processes only see with a shared backend.
+
+Cached and fresh responses carry an ETag, so clients sending
+``If-None-Match`` get a 304 when the data did not change.
+"""
+
+import hashlib
+import pickle
+import threading
+from functools import wraps
+
+from flask import Response, current_app, request
+from flask_jwt_extended import get_jwt
+
+from cache import MISSING, TTLCache
+from engine_options import config_from_env
+
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+DEFAULTS = {
+    "RESPONSE_CACHE_BACKEND": "local",
+    "RESPONSE_CACHE_SIZE": 4096,
+    "RESPONSE_CACHE_TTL": 60,
+}
+
+
+class NullBackend:
+    """
+    Backend caching nothing.
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def generation(self, key):
+        return 0
+
+
+class LocalBackend:
+    """
+    In-process LRU backend.
+
+    Generations are kept apart from the entries so that they are never
+    evicted, which would bring back stale entries.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        return None if value is MISSING else value
+
+    def set(self, key, value, ttl):
+        self.entries.set(key, value)
+
+    def incr(self, key):
+        with self._lock:
+            self.generations[key] = self.generations.get(key, 0) + 1
+            return self.generations[key]
+
+    def generation(self, key):
+        return self.generations.get(key, 0)
+
+
+class RedisBackend:
+    """
+    Backend shared between processes through a Redis-compatible client.
+
+    Args:
+        client: An object with the ``get``, ``set(name, value, ex=)`` and
+        ``incr`` methods of redis-py.
+        prefix (str): The prefix of every key written by the cache.
+    """
+
+    def __init__(self, client, prefix="ecotrack:response:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + "generation:" + key)
+
+    def generation(self, key):
+        value = self.client.get(self.prefix + "generation:" + key)
+        return int(value or 0)
+
+
+class ResponseCache:
+    """
+    Response cache of an application.
+
+    Attributes:
+        backend: The backend storing the entries and generations.
+        ttl (int): The number of seconds a response stays cached.
+    """
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+
+    def key(self, namespaces, jwt=None, full_path=None):
+        """
+        Build the key of a request, the current one by default.
+
+        Args:
+            namespaces (tuple): The blueprints the response depends on.
+            jwt (dict): The claims of the caller.
+            full_path (str): The path and the query string, joined by "?".
+        """
+        if jwt is None:
+            jwt = get_jwt()
+        if full_path is None:
+            full_path = request.full_path
+        generations = ",".join(
+            f"{namespace}={self.backend.generation(namespace)}"
+            for namespace in namespaces
+        )
+        raw = "|".join((
+            generations,
+            str(jwt.get("role")),
+            str(jwt.get("sub")),
+            full_path,
+        ))
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def invalidate(self, namespace):
+        """
+        Make every response built from the namespace unreachable.
+        """
+        self.backend.incr(namespace)
+
+
+def _backend_from_config(app):
+    backend = app.config["RESPONSE_CACHE_BACKEND"]
+    if backend == "local":
+        return LocalBackend(
+            maxsize=app.config["RESPONSE_CACHE_SIZE"],
+            ttl=app.config["RESPONSE_CACHE_TTL"]
+        )
+    if backend in (None, "none"):
+        return NullBackend()
+    return backend
+
+
+def init_app(app):
+    """
+    Set up the response cache of the application.
+
+    The cache is configured with ``RESPONSE_CACHE_BACKEND`` ("local",
+    "none" or a backend object such as a RedisBackend),
+    ``RESPONSE_CACHE_SIZE`` (entries of the local backend) and
+    ``RESPONSE_CACHE_TTL`` (seconds), read from the app config or the
+    environment. The backend is created on the first
+    request, so the configuration may be changed after create_app().
+    """
+    config_from_env(app, DEFAULTS)
+    app.extensions["response_cache"] = None
+
+    @app.after_request
+    def invalidate_after_write(response):
+        # a 202 only queued a job, which invalidates what it writes
+        if (request.method in WRITE_METHODS
+                and response.status_code < 400
+                and response.status_code != 202
+                and request.blueprint is not None):
+            current_cache().invalidate(request.blueprint)
+        return response
+
+
+def current_cache():
+    """
+    Return the response cache of the current app, creating it on the
+    first call.
+    """
+    app = current_app
+    cache = app.extensions["response_cache"]
+    if cache is None:
+        cache = ResponseCache(
+            _backend_from_config(app), app.config["RESPONSE_CACHE_TTL"])
+        app.extensions["response_cache"] = cache
+    return cache
+
+
+def _conditional(response):
+    response.headers["Vary"] = "Authorization"
+    response.headers["Cache-Control"] = "private"
+    return response.make_conditional(request)
+
+
+def cached(*depends_on):
+    """
+    Decorator caching the response of a GET view.
+
+    The view must run after ``jwt_required``, so that the key can hold
+    the caller.
+
+    Args:
+        depends_on (str): The blueprints, besides the one of the view,
+        whose writes change the response.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = current_cache()
+            namespaces = (request.blueprint, *depends_on)
+            key = cache.key(namespaces)
+
+            entry = cache.backend.get(key)
+            if entry is not None:
+                body, mimetype, headers, etag = entry
+                response = Response(body, mimetype=mimetype, headers=headers)
+                response.set_etag(etag)
+                return _conditional(response)
+
+            response = func(*args, **kwargs)
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            body = response.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            headers = {
+                name: value for name, value in response.headers
+                if name in ("Link",)
+            }
+            cache.backend.set(
+                key, (body, response.mimetype, headers, etag), cache.ttl)
+            response.set_etag(etag)
+            return _conditional(response)
+
+        return wrapper
+
+    return decorator
+
+
+def cached_route(blueprint, *depends_on):
+    """
+    Decorator marking an async route of the ASGI app as cached.
+
+    The ASGI app stores its responses in the entries of cached(), under
+    the same keys, so the Flask view and the async route share them.
+
+    Args:
+        blueprint (str): The blueprint of the Flask view of the route.
+        depends_on (str): The other blueprints whose writes change the
+        response.
+    """
+
+    def decorator(func):
+        func.cache_namespaces = (blueprint, *depends_on)
+        return func
+
+    return decorator
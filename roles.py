@@ -0,0 +1,143 @@
+"""
+This module resolves the role of a user.
+
+A user is a household, a collector or an admin depending on which table
+holds a row for it. The role and the ids of those rows are read with a
+single query over the three tables and kept in a per-app cache,
+invalidated whenever one of those rows is created or deleted.
+
+They are embedded in the access token as the ``role``, ``household_id``,
+``collector_id`` and ``admin_id`` claims, so that the resources know the
+entities of the caller without a query.
+"""
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, literal, select, union_all
+
+from cache import MISSING, TTLCache
+from db import db
+from models import AdminModel
+from models import CollectorModel
+from models import HouseholdModel
+
+
+# Role tables, in the order a role is chosen when a user is in several
+ROLE_MODELS = (
+    ("household", HouseholdModel),
+    ("collector", CollectorModel),
+    ("admin", AdminModel),
+)
+
+
+def init_app(app):
+    """
+    Create the role cache of the application.
+
+    The cache is configured with ``ROLE_CACHE_SIZE`` (number of users) and
+    ``ROLE_CACHE_TTL`` (seconds).
+    """
+    app.config.setdefault("ROLE_CACHE_SIZE", 10000)
+    app.config.setdefault("ROLE_CACHE_TTL", 300)
+    app.extensions["role_cache"] = TTLCache(
+        maxsize=app.config["ROLE_CACHE_SIZE"],
+        ttl=app.config["ROLE_CACHE_TTL"]
+    )
+
+
+def query_identity(user_id):
+    """
+    Read the role of a user and the ids of its role rows in one query.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        dict: The role ("household", "collector", "admin" or None) and
+        the ID of each role row of the user under "<role>_id", None when
+        the user has no such row.
+    """
+    roles = union_all(*(
+        select(
+            literal(role).label("role"),
+            literal(priority).label("priority"),
+            model.id.label("id")
+        ).where(model.user_id == user_id)
+        for priority, (role, model) in enumerate(ROLE_MODELS)
+    )).subquery()
+    statement = select(roles.c.role, roles.c.id).order_by(
+        roles.c.priority, roles.c.id)
+    identity = {"role": None}
+    identity.update((f"{role}_id", None) for role, _ in ROLE_MODELS)
+    for role, entity_id in db.session.execute(statement):
+        if identity["role"] is None:
+            identity["role"] = role
+        if identity[f"{role}_id"] is None:
+            identity[f"{role}_id"] = entity_id
+    return identity
+
+
+def query_role(user_id):
+    """
+    Read the role of a user from the database in one query.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        str: "household", "collector", "admin" or None.
+    """
+    return query_identity(user_id)["role"]
+
+
+def resolve_identity(user_id):
+    """
+    Return the role and role row ids of a user, from the cache when
+    possible.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        dict: See query_identity().
+    """
+    cache = current_app.extensions["role_cache"]
+    identity = cache.get(_cache_key(user_id))
+    if identity is MISSING:
+        identity = query_identity(user_id)
+        cache.set(_cache_key(user_id), identity)
+    return dict(identity)
+
+
+def resolve_role(user_id):
+    """
+    Return the role of a user, from the cache when possible.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        str: "household", "collector", "admin" or None.
+    """
+    return resolve_identity(user_id)["role"]
+
+
+def invalidate_role(user_id):
+    """
+    Drop the cached role of a user.
+    """
+    if has_app_context() and "role_cache" in current_app.extensions:
+        current_app.extensions["role_cache"].delete(_cache_key(user_id))
+
+
+def _cache_key(user_id):
+    # JWT subjects and model columns may hold the id as str or int
+    return None if user_id is None else int(user_id)
+
+
+def _invalidate_target(mapper, connection, target):
+    invalidate_role(target.user_id)
+
+
+for _, _model in ROLE_MODELS:
+    event.listen(_model, "after_insert", _invalidate_target)
+    event.listen(_model, "after_delete", _invalidate_target)
@@ -0,0 +1,117 @@
+"""
+This module builds the route sheet of a collector.
+
+The collection dates of the collector in a date range are read with
+their requests and the households of the requests in one outer-joined
+query, ordered so that the rows can be grouped in a single pass. The
+requests of each date can instead be ordered along a route through the
+households, computed by the routing module.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+import routing
+from db import db
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import HouseholdModel
+
+
+# Length of the schedule when no end date is given
+DEFAULT_DAYS = 7
+
+
+def schedule_statement(collector_id, from_date, to_date):
+    """
+    Build the query of the dates, requests and households of a collector.
+
+    Within a date the rows are ordered by area, then house number, so the
+    households of an area are visited together.
+    """
+    return (
+        select(
+            CollectionDateModel.id.label("date_id"),
+            CollectionDateModel.collection_date,
+            CollectionRequestModel.id.label("request_id"),
+            CollectionRequestModel.status,
+            HouseholdModel.id.label("household_id"),
+            HouseholdModel.house_number,
+            HouseholdModel.area,
+            HouseholdModel.latitude,
+            HouseholdModel.longitude,
+        )
+        .select_from(CollectionDateModel)
+        .outerjoin(CollectionDateModel.collection_requests)
+        .outerjoin(CollectionRequestModel.household)
+        .where(
+            CollectionDateModel.collector_id == collector_id,
+            CollectionDateModel.collection_date.between(from_date, to_date),
+        )
+        .order_by(
+            CollectionDateModel.collection_date,
+            CollectionDateModel.id,
+            HouseholdModel.area,
+            HouseholdModel.house_number,
+            CollectionRequestModel.id,
+        )
+    )
+
+
+def collector_schedule(collector_id, from_date=None, to_date=None,
+                       order="area"):
+    """
+    Build the route sheet of a collector.
+
+    Args:
+        collector_id (int): The ID of the collector.
+        from_date (date): The first day, today by default.
+        to_date (date): The last day, DEFAULT_DAYS after the first one by
+        default.
+        order (str): "area" to sort the requests of each date by area and
+        house number, "route" to order them along the route of the date.
+
+    Returns:
+        dict: The range and its dates, each with its requests and their
+        household.
+    """
+    from_date = from_date or date.today()
+    to_date = to_date or from_date + timedelta(days=DEFAULT_DAYS - 1)
+
+    dates = []
+    stops = {}
+    for row in db.session.execute(
+            schedule_statement(collector_id, from_date, to_date)):
+        if not dates or dates[-1]["id"] != row.date_id:
+            dates.append({
+                "id": row.date_id,
+                "date": row.collection_date,
+                "requests": [],
+            })
+        if row.request_id is not None:
+            request = {
+                "id": row.request_id,
+                "status": row.status,
+                "household": {
+                    "id": row.household_id,
+                    "house_number": row.house_number,
+                    "area": row.area,
+                },
+            }
+            dates[-1]["requests"].append(request)
+            stops.setdefault(row.date_id, []).append(
+                (request, row.latitude, row.longitude))
+
+    if order == "route":
+        for collection_date in dates:
+            if collection_date["id"] in stops:
+                collection_date["requests"] = routing.order_stops(
+                    collection_date["id"], stops[collection_date["id"]])
+
+    return {
+        "collector_id": collector_id,
+        "from_date": from_date,
+        "to_date": to_date,
+        "dates": dates,
+    }
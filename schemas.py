@@ -1,11 +1,22 @@
 """
 This file contains the schema for the various models.
+
+The schemas derive from CompiledSchema, which dumps with functions
+generated from their fields (see serializers.py).
 """
 
-from marshmallow import Schema, fields
+from marshmallow import ValidationError, fields, validate
+from marshmallow import validates_schema
+
+from recurrence import WEEKDAYS
+from serializers import CompiledSchema
+
+
+# Statuses a collection request can be moved to
+REQUEST_STATUSES = ("pending", "collected", "missed", "cancelled")
 
 
-class PlainUserSchema(Schema):
+class PlainUserSchema(CompiledSchema):
     """
     This schema represents a user with no relationships.
     """
@@ -14,14 +25,14 @@ class PlainUserSchema(Schema):
     password = fields.Str(required=True, load_only=True)
 
 
-class PlainAdminSchema(Schema):
+class PlainAdminSchema(CompiledSchema):
     """
     This schema represents an admin.
     """
     id = fields.Int(dump_only=True)
 
 
-class PlainHouseholdSchema(Schema):
+class PlainHouseholdSchema(CompiledSchema):
     """
     This schema represents a household.
     """
@@ -30,7 +41,7 @@ class PlainHouseholdSchema(Schema):
     area = fields.Str(required=True)
 
 
-class PlainCollectorSchema(Schema):
+class PlainCollectorSchema(CompiledSchema):
     """
     This schema represents a collector.
     """
@@ -38,15 +49,15 @@ class PlainCollectorSchema(Schema):
     allocated_area = fields.Str(required=True)
 
 
-class PlainCollectionDateSchema(Schema):
+class PlainCollectionDateSchema(CompiledSchema):
     """
     This schema represents a collection date.
     """
     id = fields.Int(dump_only=True)
-    date = fields.Date(required=True)
+    date = fields.Date(required=True, attribute="collection_date")
 
 
-class PlainCollectionRequestSchema(Schema):
+class PlainCollectionRequestSchema(CompiledSchema):
     """
     This schema represents a collection request.
     """
@@ -77,7 +88,8 @@ class CollectionRequestSchema(PlainCollectionRequestSchema):
     This schema represents a collection request with relationships.
     """
     household_id = fields.Int(required=True, load_only=True)
-    collection_date_id = fields.Int(required=True, load_only=True)
+    # left out to have the request assigned a date, see assignment.py
+    collection_date_id = fields.Int(load_only=True)
     household = fields.Nested(PlainHouseholdSchema(), dump_only=True)
     collection_date = fields.Nested(
         PlainCollectionDateSchema(), dump_only=True)
@@ -87,6 +99,9 @@ class CollectionDateSchema(PlainCollectionDateSchema):
     """
     This schema represents a collection date with relationships.
     """
+    # the capacity of the collector when left out
+    capacity = fields.Int(validate=validate.Range(min=0))
+    used = fields.Int(dump_only=True)
     collection_requests = fields.List(fields.Nested(
         PlainCollectionRequestSchema()), dump_only=True)
 
@@ -95,15 +110,307 @@ class HouseholdSchema(PlainHouseholdSchema):
     """
     This schema represents a household with relationships.
     """
+    latitude = fields.Float(
+        allow_none=True, validate=validate.Range(min=-90, max=90))
+    longitude = fields.Float(
+        allow_none=True, validate=validate.Range(min=-180, max=180))
     user_id = fields.Int(dump_only=True)
     collection_requests = fields.List(fields.Nested(
         PlainCollectionRequestSchema()), dump_only=True)
 
+    @validates_schema
+    def validate_coordinates(self, data, **kwargs):
+        if (data.get("latitude") is None) != (data.get("longitude") is None):
+            raise ValidationError(
+                "latitude and longitude must be given together")
+
 
 class CollectorSchema(PlainCollectorSchema):
     """
     This schema represents a collector with relationships.
     """
     user_id = fields.Int(dump_only=True)
+    capacity = fields.Int(validate=validate.Range(min=0))
     collection_dates = fields.List(fields.Nested(
         PlainCollectionDateSchema()), dump_only=True)
+
+
+class RecurrenceSchema(CompiledSchema):
+    """
+    This schema represents a recurrence rule producing collection dates.
+    """
+    start = fields.Date(required=True)
+    until = fields.Date(required=True)
+    freq = fields.Str(
+        load_default="weekly", validate=validate.OneOf(("daily", "weekly")))
+    interval = fields.Int(load_default=1, validate=validate.Range(min=1))
+    weekdays = fields.List(fields.Str(validate=validate.OneOf(WEEKDAYS)))
+
+    @validates_schema
+    def validate_range(self, data, **kwargs):
+        if data["until"] < data["start"]:
+            raise ValidationError(
+                "until must not be before start", field_name="until")
+
+
+class CollectionDateBulkSchema(CompiledSchema):
+    """
+    This schema represents a batch of collection dates to create, either
+    listed or produced by a recurrence rule.
+    """
+    dates = fields.List(
+        fields.Date(), validate=validate.Length(min=1, max=366))
+    recurrence = fields.Nested(RecurrenceSchema())
+
+    @validates_schema
+    def validate_source(self, data, **kwargs):
+        if ("dates" in data) == ("recurrence" in data):
+            raise ValidationError(
+                "Exactly one of dates and recurrence is required")
+
+
+class CollectionDateBulkErrorSchema(CompiledSchema):
+    """
+    This schema represents a collection date rejected from a batch.
+    """
+    index = fields.Int()
+    date = fields.Date()
+    message = fields.Str()
+
+
+class CollectionDateBulkResultSchema(CompiledSchema):
+    """
+    This schema represents the outcome of a batch of collection dates.
+    """
+    created = fields.List(fields.Nested(PlainCollectionDateSchema()))
+    errors = fields.List(fields.Nested(CollectionDateBulkErrorSchema()))
+
+
+class CollectionRequestBulkItemSchema(CompiledSchema):
+    """
+    This schema represents a collection request of a batch.
+    """
+    collection_date_id = fields.Int(required=True)
+
+
+class CollectionRequestBulkSchema(CompiledSchema):
+    """
+    This schema represents a batch of collection requests to create.
+    """
+    requests = fields.List(
+        fields.Nested(CollectionRequestBulkItemSchema()),
+        required=True,
+        validate=validate.Length(min=1, max=500))
+
+
+class CollectionRequestBulkErrorSchema(CompiledSchema):
+    """
+    This schema represents a collection request rejected from a batch.
+    """
+    index = fields.Int()
+    collection_date_id = fields.Int()
+    message = fields.Str()
+
+
+class CollectionRequestBulkResultSchema(CompiledSchema):
+    """
+    This schema represents the outcome of a batch of collection requests.
+    """
+    created = fields.List(fields.Nested(PlainCollectionRequestSchema()))
+    errors = fields.List(fields.Nested(CollectionRequestBulkErrorSchema()))
+
+
+class CollectionRequestStatusItemSchema(CompiledSchema):
+    """
+    This schema represents the new status of a collection request.
+    """
+    id = fields.Int(required=True)
+    status = fields.Str(
+        required=True, validate=validate.OneOf(REQUEST_STATUSES))
+
+
+class CollectionRequestStatusUpdateSchema(CompiledSchema):
+    """
+    This schema represents a batch of collection request status changes.
+    """
+    updates = fields.List(
+        fields.Nested(CollectionRequestStatusItemSchema()),
+        required=True,
+        validate=validate.Length(min=1, max=1000))
+
+
+class CollectionRequestStatusResultSchema(CompiledSchema):
+    """
+    This schema represents the outcome of a batch of status changes.
+    """
+    updated = fields.List(fields.Int())
+    not_updated = fields.List(fields.Int())
+
+
+class CollectionRequestExportArgsSchema(CompiledSchema):
+    """
+    This schema represents the query arguments of a collection request
+    export.
+    """
+    format = fields.Str(
+        load_default="ndjson", validate=validate.OneOf(("ndjson", "csv")))
+    from_date = fields.Date(data_key="from")
+    to_date = fields.Date(data_key="to")
+    area = fields.Str()
+
+
+class CollectionStatsArgsSchema(CompiledSchema):
+    """
+    This schema represents the query arguments of the collection
+    statistics.
+    """
+    bucket = fields.Str(
+        load_default="day", validate=validate.OneOf(("day", "week", "month")))
+    from_date = fields.Date(data_key="from")
+    to_date = fields.Date(data_key="to")
+
+
+class CollectionStatsSchema(CompiledSchema):
+    """
+    This schema represents counts of collection requests.
+    """
+    by_status = fields.Dict(keys=fields.Str(), values=fields.Int())
+    by_area = fields.Dict(keys=fields.Str(), values=fields.Int())
+    by_allocated_area = fields.Dict(keys=fields.Str(), values=fields.Int())
+    by_date = fields.Dict(keys=fields.Str(), values=fields.Int())
+
+
+class DatabaseHealthSchema(CompiledSchema):
+    """
+    This schema represents the health of the database connection.
+    """
+    status = fields.Str()
+    latency_ms = fields.Float()
+    pool = fields.Dict(keys=fields.Str())
+
+
+class CollectorScheduleArgsSchema(CompiledSchema):
+    """
+    This schema represents the query arguments of a collector schedule.
+    """
+    from_date = fields.Date(data_key="from")
+    to_date = fields.Date(data_key="to")
+    order = fields.Str(validate=validate.OneOf(("area", "route")))
+
+    @validates_schema
+    def validate_range(self, data, **kwargs):
+        if ("from_date" in data and "to_date" in data
+                and data["to_date"] < data["from_date"]):
+            raise ValidationError("to must not be before from", "to")
+
+
+class ScheduleRequestSchema(CompiledSchema):
+    """
+    This schema represents a collection request on a route sheet.
+    """
+    id = fields.Int()
+    status = fields.Str()
+    household = fields.Nested(PlainHouseholdSchema())
+
+
+class ScheduleDateSchema(CompiledSchema):
+    """
+    This schema represents a collection date on a route sheet.
+    """
+    id = fields.Int()
+    date = fields.Date()
+    requests = fields.List(fields.Nested(ScheduleRequestSchema()))
+
+
+class CollectorScheduleSchema(CompiledSchema):
+    """
+    This schema represents the route sheet of a collector.
+    """
+    collector_id = fields.Int()
+    from_date = fields.Date(data_key="from")
+    to_date = fields.Date(data_key="to")
+    dates = fields.List(fields.Nested(ScheduleDateSchema()))
+
+
+class RebalanceArgsSchema(CompiledSchema):
+    """
+    This schema represents the arguments of a rebalancing of the
+    collection dates.
+    """
+    area = fields.Str()
+    window = fields.Int(load_default=14, validate=validate.Range(min=0))
+
+
+class ReminderArgsSchema(CompiledSchema):
+    """
+    This schema represents the arguments of the reminders of a
+    collection day.
+    """
+    day = fields.Date()
+
+
+class JobSchema(CompiledSchema):
+    """
+    This schema represents a background job.
+    """
+    id = fields.Int()
+    name = fields.Str()
+    status = fields.Str()
+    payload = fields.Dict()
+    attempts = fields.Int()
+    max_attempts = fields.Int()
+    run_at = fields.DateTime()
+    result = fields.Raw()
+    error = fields.Str(allow_none=True)
+    user_id = fields.Int(allow_none=True)
+    created_at = fields.DateTime()
+    finished_at = fields.DateTime(allow_none=True)
+
+
+class CursorPageSchema(CompiledSchema):
+    """
+    This schema represents a page of a cursor paginated list.
+    """
+    next_cursor = fields.Int(allow_none=True)
+
+
+class AdminPageSchema(CursorPageSchema):
+    """
+    This schema represents a page of admins.
+    """
+    items = fields.List(fields.Nested(AdminSchema()))
+
+
+class HouseholdPageSchema(CursorPageSchema):
+    """
+    This schema represents a page of households.
+    """
+    items = fields.List(fields.Nested(HouseholdSchema()))
+
+
+class CollectorPageSchema(CursorPageSchema):
+    """
+    This schema represents a page of collectors.
+    """
+    items = fields.List(fields.Nested(CollectorSchema()))
+
+
+class CollectionDatePageSchema(CursorPageSchema):
+    """
+    This schema represents a page of collection dates.
+    """
+    items = fields.List(fields.Nested(CollectionDateSchema()))
+
+
+class CollectionRequestPageSchema(CursorPageSchema):
+    """
+    This schema represents a page of collection requests.
+    """
+    items = fields.List(fields.Nested(CollectionRequestSchema()))
+
+
+class JobPageSchema(CursorPageSchema):
+    """
+    This schema represents a page of background jobs.
+    """
+    items = fields.List(fields.Nested(JobSchema()))
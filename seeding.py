@@ -0,0 +1,318 @@
+"""
+This module generates synthetic data directly in the database.
+
+Rows are built in Python and inserted with SQLAlchemy Core in batches,
+bypassing the ORM unit of work and the API. Every user gets the same
+password hash, computed once, so seeding costs a single pbkdf2 run
+whatever the number of users.
+
+Each table's INSERT is compiled once by SQLAlchemy Core and every batch
+is sent as one executemany() of it. A multi-row ``insert().values(rows)``
+is compiled again for every batch and is an order of magnitude slower
+on SQLite.
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+import click
+from sqlalchemy import func, select, text
+
+from db import db
+from hashing import hash_password
+from models import AdminModel
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import CollectorModel
+from models import HouseholdModel
+from models import UserModel
+
+
+# Areas and their share of the households
+AREAS = {
+    "Central": 0.25,
+    "North": 0.2,
+    "South": 0.2,
+    "East": 0.15,
+    "West": 0.12,
+    "Harbour": 0.05,
+    "Hills": 0.03,
+}
+
+# Centre of the town the households are spread around, and the size of
+# an area, in degrees; the areas sit side by side on a grid
+TOWN = (51.5, -0.12)
+AREA_SIZE = 0.02
+
+# Statuses and their share of the collection requests
+STATUSES = {
+    "pending": 0.55,
+    "collected": 0.35,
+    "missed": 0.07,
+    "cancelled": 0.03,
+}
+
+DEFAULT_PASSWORD = "password"
+
+
+def _next_id(connection, model):
+    return (connection.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def _insert(connection, model, rows, batch_size):
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    # compiled once; the batches go straight to the driver's
+    # executemany(), skipping the per-row parameter processing of
+    # connection.execute()
+    compiled = model.__table__.insert().compile(
+        dialect=connection.dialect, column_keys=list(first))
+    if compiled.positional:
+        keys = compiled.positiontup
+
+        def parameters(row):
+            return tuple(row[key] for key in keys)
+    else:
+        def parameters(row):
+            return row
+
+    batch = [parameters(first)]
+    count = 0
+    for row in rows:
+        batch.append(parameters(row))
+        if len(batch) == batch_size:
+            connection.exec_driver_sql(compiled.string, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        connection.exec_driver_sql(compiled.string, batch)
+    return count + len(batch)
+
+
+def _advance_sequences(connection, models):
+    # the rows were inserted with explicit ids, which PostgreSQL does not
+    # take from the sequences of the tables; without this the next row
+    # inserted by the API would get a seeded id. SQLite and MySQL carry
+    # on after the largest id by themselves.
+    if connection.dialect.name != "postgresql":
+        return
+    quote = connection.dialect.identifier_preparer.quote
+    for model in models:
+        table = model.__table__.name
+        connection.execute(
+            text(f"SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+                 f"max(id)) FROM {quote(table)}"),
+            {"table": table})
+
+
+def _choices(rng, weights, count):
+    return rng.choices(list(weights), weights=list(weights.values()), k=count)
+
+
+def seed(households=1000, collectors=50, admins=1, dates_per_collector=52,
+         requests=10000, capacity=50, password=DEFAULT_PASSWORD,
+         start=None, batch_size=5000, random_seed=0, defer_indexes=True):
+    """
+    Insert synthetic users, households, collectors, collection dates and
+    collection requests.
+
+    Households are spread over AREAS by weight, at random coordinates
+    within their area, and every area gets at least one collector when
+    there are enough of them. Collectors get weekly dates from ``start``.
+    Each request is made by a random household for a date of a collector
+    of its area.
+
+    Usernames are "household-<user id>", "collector-<user id>" and
+    "admin-<user id>", so seeding can be repeated on the same database.
+
+    Must run inside an app context.
+
+    Args:
+        households (int): The number of households.
+        collectors (int): The number of collectors.
+        admins (int): The number of admins.
+        dates_per_collector (int): The number of dates of each collector.
+        requests (int): The number of collection requests.
+        capacity (int): The capacity of every collector and date; dates
+        drawn by more requests are over it, as ``flask rebalance``
+        expects.
+        password (str): The password of every user.
+        start (date): The first collection date, today by default.
+        batch_size (int): The number of rows per INSERT.
+        random_seed (int): The seed of the generator.
+        defer_indexes (bool): Drop the secondary indexes of the seeded
+        tables before inserting and build them again afterwards, which
+        is faster than updating them row by row. The tables are locked
+        until the end of the transaction.
+
+    Returns:
+        dict: The number of rows inserted in each table.
+    """
+    rng = random.Random(random_seed)
+    start = start or date.today()
+    password_hash = hash_password(password)
+    areas = list(AREAS)
+
+    indexes = []
+    if defer_indexes:
+        indexes = [
+            index for model in (HouseholdModel, CollectorModel,
+                                CollectionDateModel, CollectionRequestModel)
+            for index in model.__table__.indexes
+        ]
+
+    with db.engine.begin() as connection:
+        for index in indexes:
+            index.drop(connection)
+        user_id = _next_id(connection, UserModel)
+        household_id = _next_id(connection, HouseholdModel)
+        collector_id = _next_id(connection, CollectorModel)
+        admin_id = _next_id(connection, AdminModel)
+        date_id = _next_id(connection, CollectionDateModel)
+        request_id = _next_id(connection, CollectionRequestModel)
+
+        household_areas = _choices(rng, AREAS, households)
+        collector_areas = (areas * (collectors // len(areas) + 1))[:collectors]
+        if collectors > len(areas):
+            collector_areas[len(areas):] = _choices(
+                rng, AREAS, collectors - len(areas))
+
+        def users():
+            kinds = (
+                ["household"] * households + ["collector"] * collectors
+                + ["admin"] * admins
+            )
+            for offset, kind in enumerate(kinds):
+                yield {
+                    "id": user_id + offset,
+                    "username": f"{kind}-{user_id + offset}",
+                    "password": password_hash,
+                }
+
+        counts = {"users": _insert(connection, UserModel, users(), batch_size)}
+        corners = {
+            area: (TOWN[0] + AREA_SIZE * (index // 3 - 1),
+                   TOWN[1] + AREA_SIZE * (index % 3 - 1))
+            for index, area in enumerate(areas)
+        }
+        counts["households"] = _insert(connection, HouseholdModel, (
+            {
+                "id": household_id + index,
+                "house_number": str(rng.randint(1, 300)),
+                "area": area,
+                "latitude": corners[area][0] + AREA_SIZE * rng.random(),
+                "longitude": corners[area][1] + AREA_SIZE * rng.random(),
+                "user_id": user_id + index,
+            }
+            for index, area in enumerate(household_areas)
+        ), batch_size)
+        counts["collectors"] = _insert(connection, CollectorModel, (
+            {
+                "id": collector_id + index,
+                "allocated_area": area,
+                "capacity": capacity,
+                "user_id": user_id + households + index,
+            }
+            for index, area in enumerate(collector_areas)
+        ), batch_size)
+        counts["admins"] = _insert(connection, AdminModel, (
+            {
+                "id": admin_id + index,
+                "user_id": user_id + households + collectors + index,
+            }
+            for index in range(admins)
+        ), batch_size)
+
+        dates_by_area = {}
+        date_rows = []
+        for index, area in enumerate(collector_areas):
+            first = start + timedelta(days=index % 7)
+            for week in range(dates_per_collector):
+                dates_by_area.setdefault(area, []).append(
+                    date_id + len(date_rows))
+                date_rows.append({
+                    "id": date_id + len(date_rows),
+                    # ISO text, which every driver accepts for a DATE
+                    "collection_date": (
+                        first + timedelta(weeks=week)).isoformat(),
+                    "collector_id": collector_id + index,
+                    "capacity": capacity,
+                    "used": 0,
+                })
+        all_dates = [row["id"] for row in date_rows]
+
+        # the date of each request is drawn before the dates are
+        # inserted, so their places used are counted here: an UPDATE
+        # counting them afterwards has no index to use while the indexes
+        # are deferred
+        statuses, picks, request_dates = [], [], []
+        if households and all_dates:
+            # drawn for all rows at once, much faster than row by row
+            statuses = _choices(rng, STATUSES, requests)
+            picks = rng.choices(range(households), k=requests)
+            area_dates = [
+                dates_by_area.get(area, all_dates) for area in household_areas
+            ]
+            draw = rng.random
+            for household in picks:
+                dates = area_dates[household]
+                picked = dates[int(draw() * len(dates))]
+                date_rows[picked - date_id]["used"] += 1
+                request_dates.append(picked)
+        counts["collection_dates"] = _insert(
+            connection, CollectionDateModel, date_rows, batch_size)
+        counts["collection_requests"] = _insert(
+            connection, CollectionRequestModel, (
+                {
+                    "id": request_id + index,
+                    "status": statuses[index],
+                    "household_id": household_id + household,
+                    "collection_date_id": request_dates[index],
+                }
+                for index, household in enumerate(picks)
+            ), batch_size)
+        for index in indexes:
+            index.create(connection)
+        _advance_sequences(connection, (
+            UserModel, HouseholdModel, CollectorModel, AdminModel,
+            CollectionDateModel, CollectionRequestModel))
+    return counts
+
+
+@click.command("seed")
+@click.option("--households", default=1000, show_default=True)
+@click.option("--collectors", default=50, show_default=True)
+@click.option("--admins", default=1, show_default=True)
+@click.option("--dates-per-collector", default=52, show_default=True)
+@click.option("--requests", default=10000, show_default=True)
+@click.option(
+    "--capacity", default=50, show_default=True,
+    help="Requests each collection date takes.")
+@click.option(
+    "--password", default=DEFAULT_PASSWORD, show_default=True,
+    help="Password of every generated user.")
+@click.option(
+    "--start", type=click.DateTime(["%Y-%m-%d"]),
+    help="First collection date, today by default.")
+@click.option("--batch-size", default=5000, show_default=True)
+@click.option("--random-seed", default=0, show_default=True)
+@click.option(
+    "--defer-indexes/--keep-indexes", default=True, show_default=True,
+    help="Rebuild the secondary indexes after inserting.")
+def seed_command(start, **options):
+    """
+    Fill the database with synthetic users, households, collectors,
+    collection dates and collection requests.
+    """
+    begin = time.perf_counter()
+    counts = seed(start=start.date() if start else None, **options)
+    elapsed = time.perf_counter() - begin
+    for table, count in counts.items():
+        click.echo(f"{table}: {count}")
+    total = sum(counts.values())
+    click.echo(
+        f"Inserted {total} rows in {elapsed:.2f}s"
+        f" ({total / elapsed:,.0f} rows/s)")
@@ -0,0 +1,293 @@
+"""
+This module compiles the dump of marshmallow schemas into plain Python
+functions.
+
+Marshmallow dumps an object by walking the fields of the schema and
+calling several methods of each field for every value. The list
+endpoints dump thousands of nested values per page, so the schemas of
+schemas.py derive from CompiledSchema, whose dump() runs a function
+generated from the fields instead:
+
+    def dump_object(obj):
+        return {
+            "id": None if (v0 := obj.id) is None else int(v0),
+            "household": None if (v1 := obj.household) is None
+                else dump_household(v1),
+            ...
+        }
+
+The function is generated once per schema class and options, on the
+first dump, and returns what Schema.dump() returns. Integer, string,
+date and datetime fields are formatted inline, and nested schemas and
+lists call the generated function of their items; other fields are
+dumped by the field itself. Schemas with dump hooks or a custom
+get_attribute() are left to marshmallow, and so is an object lacking an
+attribute of the schema, as marshmallow knows how to skip it or apply
+its default.
+
+Objects are read by attribute, except dicts, which are read by key. ORM
+instances and SQL rows are both read by attribute.
+"""
+
+import keyword
+import threading
+from contextlib import contextmanager
+
+from marshmallow import Schema, fields, missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+from marshmallow.utils import ensure_text_type
+from sqlalchemy.engine import Row
+
+
+# Generated dump functions, by schema class and options
+_compiled = {}
+_lock = threading.Lock()
+
+# Classes whose instances are read by attribute, as marshmallow does for
+# objects without __getitem__ and for SQL rows
+_object_types = {Row}
+
+# Whether CompiledSchema.dump() uses the generated functions
+_enabled = True
+
+
+@contextmanager
+def disabled():
+    """
+    Dump with marshmallow only, while the block runs.
+
+    Meant for tests and benchmarks comparing the two; it affects every
+    thread.
+    """
+    global _enabled
+    previous, _enabled = _enabled, False
+    try:
+        yield
+    finally:
+        _enabled = previous
+
+
+def _options_key(schema):
+    if schema.context:
+        return None
+    return (
+        type(schema),
+        None if schema.only is None else frozenset(schema.only),
+        frozenset(schema.exclude),
+        frozenset(schema.load_only),
+        frozenset(schema.dump_only),
+    )
+
+
+def _compilable(schema):
+    return (
+        not schema._hooks[PRE_DUMP]
+        and not schema._hooks[POST_DUMP]
+        and schema.dict_class is dict
+        and type(schema).get_attribute is Schema.get_attribute
+    )
+
+
+class _Generator:
+    """
+    Builds the source of the dump functions of one schema.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.namespace = {"missing": missing, "get_attribute": None}
+        self.counter = 0
+
+    def name(self, prefix, value):
+        self.counter += 1
+        name = f"{prefix}{self.counter}"
+        self.namespace[name] = value
+        return name
+
+    def variable(self):
+        self.counter += 1
+        return f"v{self.counter}"
+
+    def nested(self, field):
+        schema = field.schema
+        many = schema.many or field.many
+        if isinstance(schema, CompiledSchema) and _compilable(schema):
+            dump = self.name("dump", compile_schema(schema))
+            if many:
+                item = self.variable()
+                return lambda value: (
+                    f"[{dump}({item}) for {item} in {value}]")
+            return lambda value: f"{dump}({value})"
+        dump = self.name("dump", schema.dump)
+        return lambda value: f"{dump}({value}, many={many!r})"
+
+    def formatter(self, field):
+        """
+        Return a function building the expression formatting a value that
+        is not None, or None when the field is not compiled.
+        """
+        kind = type(field)
+        # values of the target type are kept as they are, which is what
+        # the conversions would return
+        if kind is fields.Integer and not field.as_string:
+            function = self.name("number", field.num_type)
+            return lambda value: (
+                f"{value} if {value}.__class__ is int else "
+                f"{function}({value})")
+        if kind is fields.String:
+            function = self.name("text", ensure_text_type)
+            return lambda value: (
+                f"{value} if {value}.__class__ is str else "
+                f"{function}({value})")
+        if kind in (fields.Date, fields.DateTime):
+            data_format = field.format or field.DEFAULT_FORMAT
+            function = field.SERIALIZATION_FUNCS.get(data_format)
+            if function is None:
+                data_format = self.name("format", data_format)
+                return lambda value: f"{value}.strftime({data_format})"
+            function = self.name("date", function)
+            return lambda value: f"{function}({value})"
+        if kind is fields.Nested:
+            return self.nested(field)
+        if kind is fields.List:
+            inner = self.formatter(field.inner)
+            if inner is None:
+                return None
+            item = self.variable()
+            return lambda value: (
+                f"[None if {item} is None else {inner(item)} "
+                f"for {item} in {value}]")
+        return None
+
+    def source(self, mapping):
+        """
+        Build the source of the function dumping one object.
+
+        Args:
+            mapping (bool): Read the values by key instead of attribute.
+        """
+        name = "dump_mapping" if mapping else "dump_object"
+        entries = []
+        generic = False
+        for attr_name, field in self.schema.dump_fields.items():
+            key = field.data_key if field.data_key is not None else attr_name
+            attribute = field.attribute or attr_name
+            formatter = self.formatter(field)
+            readable = (
+                attribute.isidentifier() and not keyword.iskeyword(attribute)
+                or mapping
+            )
+            if formatter is None or "." in attribute or not readable:
+                generic = True
+                entries.append((key, None, self.name("field", field),
+                                attr_name))
+                continue
+            variable = self.variable()
+            read = f"obj[{attribute!r}]" if mapping else f"obj.{attribute}"
+            expression = (
+                f"None if ({variable} := {read}) is None "
+                f"else {formatter(variable)}"
+            )
+            entries.append((key, expression, None, None))
+
+        if not generic:
+            lines = [f"def {name}(obj):", "    return {"]
+            lines += [
+                f"        {key!r}: {expression},"
+                for key, expression, _, _ in entries
+            ]
+            lines.append("    }")
+            return "\n".join(lines)
+
+        # fields dumped by marshmallow may be missing and skipped, so the
+        # dict is filled in order
+        lines = [f"def {name}(obj):", "    data = {}"]
+        for key, expression, field, attr_name in entries:
+            if expression is not None:
+                lines.append(f"    data[{key!r}] = {expression}")
+                continue
+            lines += [
+                f"    value = {field}.serialize("
+                f"{attr_name!r}, obj, accessor=get_attribute)",
+                "    if value is not missing:",
+                f"        data[{key!r}] = value",
+            ]
+        lines.append("    return data")
+        return "\n".join(lines)
+
+    def compile(self):
+        schema = self.schema
+        self.namespace["get_attribute"] = schema.get_attribute
+        self.namespace["fallback"] = (
+            lambda obj: Schema.dump(schema, obj, many=False))
+        self.namespace["object_types"] = _object_types
+        source = "\n\n".join((
+            self.source(mapping=False),
+            self.source(mapping=True),
+            DISPATCH,
+        ))
+        exec(compile(
+            source, f"<dump {type(schema).__name__}>", "exec"),
+            self.namespace)
+        return self.namespace["dump"]
+
+
+DISPATCH = """
+def dump(obj):
+    kind = obj.__class__
+    try:
+        if kind in object_types:
+            return dump_object(obj)
+        if kind is dict:
+            return dump_mapping(obj)
+        if not hasattr(kind, "__getitem__"):
+            object_types.add(kind)
+            return dump_object(obj)
+    except (AttributeError, KeyError):
+        pass
+    return fallback(obj)
+"""
+
+
+def compile_schema(schema):
+    """
+    Return the function dumping one object with a schema.
+
+    The function is generated on the first call for the class and the
+    options of the schema, and reused afterwards.
+
+    Args:
+        schema (Schema): The schema instance.
+
+    Returns:
+        callable: The function taking an object and returning its dump.
+    """
+    key = _options_key(schema)
+    function = _compiled.get(key) if key is not None else None
+    if function is not None:
+        return function
+    if not _compilable(schema):
+        function = lambda obj: Schema.dump(schema, obj, many=False)  # noqa
+    else:
+        function = _Generator(schema).compile()
+    if key is not None:
+        with _lock:
+            function = _compiled.setdefault(key, function)
+    return function
+
+
+class CompiledSchema(Schema):
+    """
+    Schema dumping with a function generated from its fields.
+
+    Loading and validation are those of marshmallow.
+    """
+
+    def dump(self, obj, *, many=None):
+        if not _enabled:
+            return super().dump(obj, many=many)
+        many = self.many if many is None else bool(many)
+        function = compile_schema(self)
+        if many:
+            return [function(item) for item in obj]
+        return function(obj)
@@ -0,0 +1,55 @@
+"""
+This module times the SQL statements of the app's engine once for every
+module observing them.
+
+The start of a statement is kept on its execution context rather than on
+its connection, so a statement that raises, for which
+``after_cursor_execute`` never fires, leaves nothing behind on the
+pooled connection. Statements run without a context, such as the
+sequence fetches of some dialects, are not timed.
+"""
+
+import time
+import weakref
+
+from sqlalchemy import event
+
+
+# Observers of each engine
+_observers = weakref.WeakKeyDictionary()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    for observer in _observers.get(conn.engine, ()):
+        observer(statement, parameters, elapsed)
+
+
+def observe_statements(engine, observer):
+    """
+    Call a function with the duration of every statement of an engine.
+
+    The listeners timing the statements are registered with the first
+    observer of the engine.
+
+    Args:
+        engine (Engine): The engine.
+        observer (callable): Called with the statement, its parameters and
+        its duration in seconds, after each statement that succeeded.
+    """
+    observers = _observers.get(engine)
+    if observers is None:
+        observers = _observers[engine] = []
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    observers.append(observer)
@@ -0,0 +1,179 @@
+"""
+This module tunes SQLite for serving several workers.
+
+For file databases, every new connection is switched to WAL journaling
+with the pragmas below, so readers never wait for the writer. Writers
+still exclude each other: within a process, a session takes the write
+lock on its first write and keeps it until its transaction ends, so
+threads queue in Python instead of failing with "database is locked".
+Between processes, SQLite waits up to ``busy_timeout`` for the database
+lock, and a statement that still gets "database is locked" is retried
+with exponential backoff and jitter.
+
+Settings, read from the app config or the environment:
+
+- ``SQLITE_PRODUCTION_MODE``: enable the mode (default on)
+- ``SQLITE_JOURNAL_MODE`` (default "WAL")
+- ``SQLITE_SYNCHRONOUS`` (default "NORMAL")
+- ``SQLITE_BUSY_TIMEOUT``: milliseconds (default 5000)
+- ``SQLITE_MMAP_SIZE``: bytes (default 256 MiB)
+- ``SQLITE_CACHE_SIZE``: pages, or KiB when negative (default -65536)
+- ``SQLITE_WRITE_LOCK_TIMEOUT``: seconds to wait for the write lock
+  (default 30)
+- ``SQLITE_WRITE_RETRIES``: retries of a locked statement (default 5)
+- ``SQLITE_RETRY_DELAY``: base delay of the retries in seconds
+  (default 0.01)
+"""
+
+import random
+import sqlite3
+import threading
+import time
+import weakref
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as LockTimeoutError
+from sqlalchemy.orm import Session
+
+from db import db
+from engine_options import config_from_env
+
+
+DEFAULTS = {
+    "SQLITE_PRODUCTION_MODE": True,
+    "SQLITE_JOURNAL_MODE": "WAL",
+    "SQLITE_SYNCHRONOUS": "NORMAL",
+    "SQLITE_BUSY_TIMEOUT": 5000,
+    "SQLITE_MMAP_SIZE": 256 * 1024 * 1024,
+    "SQLITE_CACHE_SIZE": -65536,
+    "SQLITE_WRITE_LOCK_TIMEOUT": 30,
+    "SQLITE_WRITE_RETRIES": 5,
+    "SQLITE_RETRY_DELAY": 0.01,
+}
+
+# Serializes the writers of this process
+write_lock = threading.RLock()
+
+# Engines running in production mode, with their settings
+_engines = weakref.WeakKeyDictionary()
+
+
+def is_locked_error(error):
+    """
+    Tell whether a DBAPI error is SQLite reporting a busy database.
+    """
+    return (
+        isinstance(error, sqlite3.OperationalError)
+        and ("locked" in str(error) or "busy" in str(error))
+    )
+
+
+def _set_pragmas(settings):
+    def connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(
+            f"PRAGMA journal_mode={settings['SQLITE_JOURNAL_MODE']}")
+        cursor.execute(
+            f"PRAGMA synchronous={settings['SQLITE_SYNCHRONOUS']}")
+        cursor.execute(
+            f"PRAGMA busy_timeout={int(settings['SQLITE_BUSY_TIMEOUT'])}")
+        cursor.execute(
+            f"PRAGMA mmap_size={int(settings['SQLITE_MMAP_SIZE'])}")
+        cursor.execute(
+            f"PRAGMA cache_size={int(settings['SQLITE_CACHE_SIZE'])}")
+        cursor.close()
+
+    return connect
+
+
+def _with_retries(settings, run):
+    retries = settings["SQLITE_WRITE_RETRIES"]
+    delay = settings["SQLITE_RETRY_DELAY"]
+    for attempt in range(retries + 1):
+        try:
+            return run()
+        except sqlite3.OperationalError as error:
+            if attempt == retries or not is_locked_error(error):
+                raise
+            time.sleep(random.uniform(0, delay * 2 ** attempt))
+
+
+def _retry_execute(settings):
+    def do_execute(cursor, statement, parameters, context):
+        _with_retries(settings, lambda: cursor.execute(statement, parameters))
+        return True
+
+    return do_execute
+
+
+def _retry_executemany(settings):
+    def do_executemany(cursor, statement, parameters, context):
+        _with_retries(
+            settings, lambda: cursor.executemany(statement, parameters))
+        return True
+
+    return do_executemany
+
+
+def init_app(app):
+    """
+    Enable the production mode on the engine of a file SQLite database.
+
+    Must run after db.init_app(). Does nothing for other databases and
+    for in-memory SQLite.
+    """
+    config_from_env(app, DEFAULTS)
+    if not app.config["SQLITE_PRODUCTION_MODE"]:
+        return
+
+    with app.app_context():
+        engine = db.engine
+    url = engine.url
+    if url.get_backend_name() != "sqlite":
+        return
+    if url.database in (None, "", ":memory:"):
+        return
+
+    settings = {name: app.config[name] for name in DEFAULTS}
+    _engines[engine] = settings
+    event.listen(engine, "connect", _set_pragmas(settings))
+    event.listen(engine, "do_execute", _retry_execute(settings), retval=True)
+    event.listen(
+        engine, "do_executemany", _retry_executemany(settings), retval=True)
+
+
+def _settings(session):
+    try:
+        return _engines.get(session.get_bind())
+    except Exception:
+        return None
+
+
+def _acquire_write_lock(session):
+    if session.info.get("sqlite_write_lock"):
+        return
+    settings = _settings(session)
+    if settings is None:
+        return
+    if not write_lock.acquire(timeout=settings["SQLITE_WRITE_LOCK_TIMEOUT"]):
+        raise LockTimeoutError("Timed out waiting for the SQLite write lock")
+    session.info["sqlite_write_lock"] = True
+
+
+@event.listens_for(Session, "before_flush")
+def _lock_before_flush(session, flush_context, instances):
+    _acquire_write_lock(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _lock_before_dml(orm_execute_state):
+    if (orm_execute_state.is_insert or orm_execute_state.is_update
+            or orm_execute_state.is_delete):
+        _acquire_write_lock(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _unlock_after_transaction(session, transaction):
+    if transaction.parent is None and session.info.pop(
+            "sqlite_write_lock", False):
+        write_lock.release()
@@ -0,0 +1,116 @@
+"""
+This module computes the collection statistics served by /stats.
+
+Every count is a single GROUP BY aggregate; no model is loaded. Results
+are kept in a short-lived per-app cache so that dashboards polling the
+endpoint do not run the aggregates on every request.
+"""
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from cache import MISSING, TTLCache
+from db import db
+from models import CollectionDateModel
+from models import CollectionRequestModel
+from models import CollectorModel
+from models import HouseholdModel
+
+
+BUCKETS = ("day", "week", "month")
+
+
+def init_app(app):
+    """
+    Create the statistics cache of the application.
+
+    The cache is configured with ``STATS_CACHE_TTL`` (seconds).
+    """
+    app.config.setdefault("STATS_CACHE_TTL", 10)
+    app.extensions["stats_cache"] = TTLCache(
+        maxsize=256,
+        ttl=app.config["STATS_CACHE_TTL"]
+    )
+
+
+def date_bucket(column, bucket, dialect_name):
+    """
+    Return an expression truncating a date column to the start of its
+    day, week (Monday) or month, as an ISO date string.
+    """
+    if dialect_name == "sqlite":
+        if bucket == "week":
+            return func.date(column, "-6 days", "weekday 1")
+        if bucket == "month":
+            return func.date(column, "start of month")
+        return func.date(column)
+    if bucket == "day":
+        return func.to_char(column, "YYYY-MM-DD")
+    return func.to_char(func.date_trunc(bucket, column), "YYYY-MM-DD")
+
+
+def _counts(key, *joins, join_date=False, from_date=None, to_date=None):
+    statement = select(key, func.count(CollectionRequestModel.id))
+    statement = statement.select_from(CollectionRequestModel)
+    if join_date or from_date is not None or to_date is not None:
+        statement = statement.join(CollectionRequestModel.collection_date)
+    for join in joins:
+        statement = statement.join(join)
+    if from_date is not None:
+        statement = statement.where(
+            CollectionDateModel.collection_date >= from_date)
+    if to_date is not None:
+        statement = statement.where(
+            CollectionDateModel.collection_date <= to_date)
+    statement = statement.group_by(key).order_by(key)
+    return {str(value): count for value, count in db.session.execute(
+        statement)}
+
+
+def collection_stats(bucket="day", from_date=None, to_date=None):
+    """
+    Count the collection requests by status, household area, collector
+    area and collection date bucket.
+
+    Args:
+        bucket (str): "day", "week" or "month".
+        from_date (date): The first collection date counted.
+        to_date (date): The last collection date counted.
+
+    Returns:
+        dict: The counts, keyed by grouping.
+    """
+    dialect_name = db.session.get_bind().dialect.name
+    date_range = {"from_date": from_date, "to_date": to_date}
+    return {
+        "by_status": _counts(
+            CollectionRequestModel.status, **date_range),
+        "by_area": _counts(
+            HouseholdModel.area,
+            CollectionRequestModel.household,
+            **date_range),
+        "by_allocated_area": _counts(
+            CollectorModel.allocated_area,
+            CollectionDateModel.collector,
+            join_date=True,
+            **date_range),
+        "by_date": _counts(
+            date_bucket(
+                CollectionDateModel.collection_date, bucket, dialect_name),
+            join_date=True,
+            **date_range),
+    }
+
+
+def cached_collection_stats(bucket="day", from_date=None, to_date=None):
+    """
+    Return collection_stats() from the cache of the current app when
+    fresh enough.
+    """
+    cache = current_app.extensions["stats_cache"]
+    key = ("collections", bucket, from_date, to_date)
+    stats = cache.get(key)
+    if stats is MISSING:
+        stats = collection_stats(bucket, from_date, to_date)
+        cache.set(key, stats)
+    return stats
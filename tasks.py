@@ -0,0 +1,76 @@
+"""
+This module contains the background tasks queued by the endpoints.
+
+Payloads hold the arguments as the endpoint received them, dumped with
+the schema of the endpoint; each task loads them back with it.
+"""
+
+import os
+
+from flask import current_app
+
+from capacity import rebalance
+from export import export_statement, stream_export
+from jobs import task
+from notifications import send_reminders
+from schemas import CollectionRequestExportArgsSchema
+from schemas import CollectionStatsArgsSchema, CollectionStatsSchema
+from schemas import RebalanceArgsSchema, ReminderArgsSchema
+from stats import collection_stats
+
+
+@task("export")
+def export_task(job):
+    """
+    Write the exported collection requests to a file of the job.
+
+    Returns:
+        dict: The name of the file, in JOB_FILES_DIR, and its format.
+    """
+    args = CollectionRequestExportArgsSchema().load(job.payload)
+    export_format = args.pop("format")
+    directory = current_app.config["JOB_FILES_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    filename = f"job-{job.id}.{export_format}"
+    # written aside and renamed, so a retried job never serves a partial
+    # file
+    path = os.path.join(directory, filename)
+    with open(f"{path}.part", "w", newline="") as file:
+        for chunk in stream_export(export_statement(**args), export_format):
+            file.write(chunk)
+    os.replace(f"{path}.part", path)
+    return {"file": filename, "format": export_format}
+
+
+@task("collection_stats")
+def collection_stats_task(job):
+    """
+    Count the collection requests.
+
+    Returns:
+        dict: The counts, as GET /stats/collections returns them.
+    """
+    args = CollectionStatsArgsSchema().load(job.payload)
+    return CollectionStatsSchema().dump(collection_stats(**args))
+
+
+@task("rebalance")
+def rebalance_task(job):
+    """
+    Rebalance the collection dates over their capacity.
+
+    Returns:
+        dict: The number of requests moved and left over the capacity.
+    """
+    return rebalance(**RebalanceArgsSchema().load(job.payload))
+
+
+@task("reminders")
+def reminders_task(job):
+    """
+    Remind the households of their pending collections of a day.
+
+    Returns:
+        dict: What send_reminders() returned.
+    """
+    return send_reminders(**ReminderArgsSchema().load(job.payload))
@@ -0,0 +1,51 @@
+"""
+Helpers for asserting the number of SQL statements run by a request.
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from db import db
+
+
+class QueryCountMixin:
+    """
+    Mixin for unittest test cases adding SQL statement count assertions.
+
+    The test case must define ``self.app``.
+    """
+
+    @contextmanager
+    def count_queries(self):
+        """
+        Count the SQL statements run inside the block.
+
+        Yields:
+            list: The statements run so far, filled in as the block runs.
+        """
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(
+                engine, "before_cursor_execute", before_cursor_execute)
+
+    @contextmanager
+    def assertNumQueries(self, count):
+        """
+        Assert that exactly ``count`` SQL statements run inside the block.
+        """
+        with self.count_queries() as statements:
+            yield statements
+        self.assertEqual(
+            len(statements), count,
+            f"{len(statements)} queries run, {count} expected:\n"
+            + "\n".join(statements))
@@ -45,7 +45,7 @@ class AdminTestCase(unittest.TestCase):
             headers={"Authorization": f"Bearer {self.admin_token}"}
         )
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.json), 1)
+        self.assertEqual(len(response.json["items"]), 1)
 
     def test_add_admin(self):
         """Test adding a new admin."""
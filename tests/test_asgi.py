@@ -0,0 +1,279 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+from flask_jwt_extended import create_access_token
+from db import db
+from models import (
+    CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel)
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    import aiosqlite  # noqa
+except ImportError:  # pragma: no cover
+    aiosqlite = None
+
+
+def call(asgi, method, path, query="", token=None, body=None,
+         headers=None):
+    """Send one HTTP request to an ASGI app and collect the response."""
+    headers = [(b"host", b"localhost")] + [
+        (name.lower().encode(), value.encode())
+        for name, value in (headers or {}).items()]
+    payload = b""
+    if token is not None:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    if body is not None:
+        payload = json.dumps(body).encode()
+        headers.append((b"content-type", b"application/json"))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path,
+        "root_path": "", "query_string": query.encode(),
+        "headers": headers, "server": ("localhost", 80),
+        "client": ("127.0.0.1", 5000),
+    }
+    received = [{"type": "http.request", "body": payload}]
+    messages = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await asgi(scope, receive, send)
+
+    asyncio.run(run())
+    start = messages[0]
+    response_headers = {
+        name.decode(): value.decode() for name, value in start["headers"]}
+    content = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], response_headers, content
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+class AsgiTestCase(unittest.TestCase):
+    def setUp(self):
+        """Create the ASGI app on a temporary SQLite file."""
+        from asgi import create_asgi_app
+        self.directory = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(self.directory.name, 'test.db')}"
+        self.asgi = create_asgi_app(
+            url, config={"RESPONSE_CACHE_BACKEND": "none"})
+        self.app = self.asgi.app
+        self.client = self.app.test_client()
+        today = date.today()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                CollectorModel(user_id=10, allocated_area="North"),
+                CollectorModel(user_id=11, allocated_area="South"),
+                HouseholdModel(user_id=20, house_number="7", area="North"),
+                HouseholdModel(user_id=21, house_number="3", area="South"),
+            ])
+            db.session.flush()
+            db.session.add_all([
+                CollectionDateModel(
+                    collector_id=1, collection_date=today + timedelta(day))
+                for day in range(3)
+            ] + [
+                CollectionDateModel(collector_id=2, collection_date=today),
+            ])
+            db.session.flush()
+            db.session.add_all([
+                CollectionRequestModel(
+                    household_id=1, collection_date_id=1, status="pending"),
+                CollectionRequestModel(
+                    household_id=1, collection_date_id=2, status="pending"),
+                CollectionRequestModel(
+                    household_id=2, collection_date_id=4, status="missed"),
+            ])
+            db.session.commit()
+            self.tokens = {
+                "admin": create_access_token(
+                    identity=1, additional_claims={"role": "admin"}),
+                "collector": create_access_token(identity=10),
+                "household": create_access_token(identity=20),
+            }
+
+    def tearDown(self):
+        """Release the engines and the temporary directory."""
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        asyncio.run(self.asgi.engine.dispose())
+        self.asgi.executor.shutdown()
+        self.directory.cleanup()
+
+    def assert_same(self, path, role, query=""):
+        """The async route answers like the Flask view."""
+        status, headers, content = call(
+            self.asgi, "GET", path, query, self.tokens.get(role))
+        url = f"{path}?{query}" if query else path
+        expected = self.client.get(url, headers={
+            "Authorization": f"Bearer {self.tokens[role]}"
+        } if role in self.tokens else {})
+        self.assertEqual(status, expected.status_code)
+        self.assertEqual(json.loads(content), expected.json)
+        self.assertEqual(headers.get("link"), expected.headers.get("Link"))
+
+    def test_async_routes_match_flask(self):
+        """Test the async reads return what the Flask views return."""
+        self.assert_same("/collection_dates", "admin")
+        self.assert_same("/collection_dates", "collector")
+        self.assert_same("/collection_dates", "collector", "limit=2")
+        self.assert_same("/collection_dates", "admin", "limit=2&after=2")
+        self.assert_same("/collection_dates/1", "collector")
+        self.assert_same("/collection_requests", "admin", "limit=1")
+        self.assert_same("/collection_requests", "household")
+        self.assert_same("/collection_requests/3", "household")
+
+    def test_tokens_without_entity_claims(self):
+        """Test tokens without the household and collector IDs are
+        resolved on the async session, never on the sync one."""
+        with self.app.app_context():
+            for user_id, role in ((10, "collector"), (20, "household")):
+                with mock.patch(
+                        "roles.resolve_identity", return_value={"role": role}):
+                    self.tokens[f"old-{role}"] = create_access_token(
+                        identity=user_id)
+            self.tokens["old-unknown"] = create_access_token(
+                identity=99, additional_claims={"role": "collector"})
+        with mock.patch.object(
+                db.session, "scalar",
+                side_effect=AssertionError("sync query in a coroutine")):
+            dates = call(self.asgi, "GET", "/collection_dates",
+                         token=self.tokens["old-collector"])
+            requests = call(self.asgi, "GET", "/collection_requests",
+                            token=self.tokens["old-household"])
+            unknown = call(self.asgi, "GET", "/collection_dates",
+                           token=self.tokens["old-unknown"])
+        self.assertEqual(dates[0], 200)
+        self.assertEqual(
+            [item["id"] for item in json.loads(dates[2])["items"]],
+            [1, 2, 3])
+        self.assertEqual(requests[0], 200)
+        self.assertEqual(
+            [item["id"] for item in json.loads(requests[2])["items"]],
+            [1, 2])
+        self.assertEqual(unknown[0], 403)
+
+    def test_async_route_errors(self):
+        """Test the async reads answer errors like the Flask views."""
+        self.assert_same("/collection_dates", None)
+        self.assert_same("/collection_dates/1", "household")
+        self.assert_same("/collection_dates/99", "admin")
+        self.assert_same("/collection_requests", "collector")
+        self.assert_same("/collection_requests/99", "admin")
+        self.assert_same("/collection_requests", "admin", "limit=0")
+
+        status, _, content = call(
+            self.asgi, "GET", "/collection_dates", token="garbage")
+        self.assertEqual(status, 422)
+        self.assertIn("msg", json.loads(content))
+
+    def test_pagination_link(self):
+        """Test the Link header of a page points to the next one."""
+        status, headers, content = call(
+            self.asgi, "GET", "/collection_dates", "limit=2",
+            self.tokens["admin"])
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(content)["next_cursor"], 2)
+        self.assertEqual(
+            headers["link"],
+            '<http://localhost/collection_dates?limit=2&after=2>; '
+            'rel="next"')
+
+    def test_other_requests_reach_flask(self):
+        """Test writes and the other routes go through the Flask app."""
+        status, _, content = call(
+            self.asgi, "POST", "/collection_requests",
+            token=self.tokens["household"],
+            body={"household_id": 1, "collection_date_id": 3})
+        self.assertEqual(status, 201)
+        self.assertEqual(json.loads(content)["collection_date"]["id"], 3)
+
+        status, headers, content = call(
+            self.asgi, "GET", "/collection_requests/export",
+            f"format=ndjson&from={date.today().isoformat()}",
+            self.tokens["admin"])
+        self.assertEqual(status, 200)
+        self.assertEqual(len(content.splitlines()), 4)
+
+        status, _, _ = call(self.asgi, "GET", "/collection_dates/abc",
+                            token=self.tokens["admin"])
+        self.assertEqual(status, 404)
+
+    def test_response_cache(self):
+        """Test the async reads share the response cache of Flask."""
+        self.app.config["RESPONSE_CACHE_BACKEND"] = "local"
+        token = self.tokens["admin"]
+        expected = self.client.get(
+            "/collection_dates", headers={"Authorization": f"Bearer {token}"})
+        with self.app.app_context():
+            # not through the API, so the cached entry stays
+            db.session.get(CollectionDateModel, 1).collection_date = (
+                date.today() + timedelta(100))
+            db.session.commit()
+
+        status, headers, content = call(
+            self.asgi, "GET", "/collection_dates", token=token)
+        self.assertEqual(status, 200)
+        self.assertEqual(content, expected.data)
+        self.assertEqual(headers["etag"], expected.headers["ETag"])
+
+        status, _, content = call(
+            self.asgi, "GET", "/collection_dates", token=token,
+            headers={"If-None-Match": expected.headers["ETag"]})
+        self.assertEqual(status, 304)
+        self.assertEqual(content, b"")
+
+        # a write through Flask invalidates the entries of both
+        self.client.post(
+            "/collection_dates", json={"date": date.today().isoformat()},
+            headers={"Authorization": f"Bearer {self.tokens['collector']}"})
+        status, _, content = call(
+            self.asgi, "GET", "/collection_dates", token=token)
+        self.assertNotEqual(content, expected.data)
+        self.assertEqual(len(json.loads(content)["items"]), 5)
+
+    def test_lifespan(self):
+        """Test the lifespan protocol completes startup and shutdown."""
+        events = [
+            {"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return events.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        asyncio.run(self.asgi({"type": "lifespan"}, receive, send))
+        self.assertEqual(sent, [
+            "lifespan.startup.complete", "lifespan.shutdown.complete"])
+
+    def test_async_database_url(self):
+        """Test the URL of the Flask app is mapped to an async driver."""
+        from asgi import async_database_url
+        self.assertEqual(
+            async_database_url("postgresql://u@db/eco").drivername,
+            "postgresql+asyncpg")
+        with self.assertRaises(ValueError):
+            async_database_url("sqlite:///:memory:")
+        with self.assertRaises(ValueError):
+            async_database_url("mysql://u@db/eco")
+
+
+if __name__ == "__main__":
+    unittest.main()
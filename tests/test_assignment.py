@@ -0,0 +1,181 @@
+import unittest
+import sys
+import os
+from datetime import date, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import update
+from app import create_app
+from assignment import DateIndex, current_index
+from db import db
+from models import (
+    CollectorModel, CollectionDateModel, HouseholdModel)
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class AssignmentTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up two areas with dates and three households in one."""
+        self.app = create_app("sqlite:///:memory:", config={
+            "RESPONSE_CACHE_BACKEND": "none",
+        })
+        self.client = self.app.test_client()
+        self.today = date.today()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                CollectorModel(
+                    user_id=1, allocated_area="North", capacity=2),
+                CollectorModel(
+                    user_id=2, allocated_area="South", capacity=2),
+            ] + [
+                HouseholdModel(
+                    user_id=user_id, house_number=str(user_id), area="North")
+                for user_id in (3, 4, 5)
+            ])
+            db.session.flush()
+            db.session.add_all([
+                # id 1: past, id 2: other area, ids 3 and 4: upcoming
+                CollectionDateModel(
+                    collector_id=collector_id, collection_date=self.day(day),
+                    capacity=2)
+                for collector_id, day in ((1, -1), (2, 1), (1, 2), (1, 5))
+            ])
+            db.session.commit()
+            self.tokens = {
+                user_id: create_access_token(identity=user_id)
+                for user_id in (1, 3, 4, 5)
+            }
+            self.tokens["admin"] = create_access_token(
+                identity=9, additional_claims={"role": "admin"})
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def day(self, offset):
+        return self.today + timedelta(offset)
+
+    def post(self, user_id, household_id=None):
+        """Post a collection request without a date."""
+        return self.client.post(
+            "/collection_requests",
+            json={"household_id": household_id or user_id - 2},
+            headers={"Authorization": f"Bearer {self.tokens[user_id]}"})
+
+    def assigned(self, user_id):
+        response = self.post(user_id)
+        if response.status_code != 201:
+            return response.status_code
+        return response.json["collection_date"]["id"]
+
+    def test_earliest_date_of_the_area(self):
+        """Test requests fill the earliest upcoming dates of the area."""
+        self.assertEqual(self.assigned(3), 3)
+        self.assertEqual(self.assigned(4), 3)
+        # the date is full for the third household
+        self.assertEqual(self.assigned(5), 4)
+        # a household is not given a date it already requested
+        self.assertEqual(self.assigned(3), 4)
+        self.assertEqual(self.assigned(4), 409)
+
+    def test_explicit_date_is_kept(self):
+        """Test a request naming its date is not reassigned."""
+        response = self.client.post(
+            "/collection_requests",
+            json={"household_id": 1, "collection_date_id": 4},
+            headers={"Authorization": f"Bearer {self.tokens[3]}"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json["collection_date"]["id"], 4)
+        self.assertEqual(self.assigned(3), 3)
+
+    def test_index_follows_writes(self):
+        """Test new, deleted and freed dates reach the loaded index."""
+        self.assertEqual(self.assigned(3), 3)
+        self.assertEqual(self.assigned(4), 3)
+
+        # a date added through the API comes before the others
+        response = self.client.post(
+            "/collection_dates", json={"date": self.day(1).isoformat()},
+            headers={"Authorization": f"Bearer {self.tokens[1]}"})
+        new_id = response.json["id"]
+        self.assertEqual(self.assigned(5), new_id)
+
+        # and so do the dates of a bulk insert
+        response = self.client.post(
+            "/collection_dates/bulk",
+            json={"dates": [self.day(0).isoformat()]},
+            headers={"Authorization": f"Bearer {self.tokens[1]}"})
+        bulk_id = response.json["created"][0]["id"]
+
+        # a deleted date is no longer assigned
+        self.client.delete(
+            f"/collection_dates/{bulk_id}",
+            headers={"Authorization": f"Bearer {self.tokens['admin']}"})
+        self.assertEqual(self.assigned(4), new_id)
+
+        # deleting a request gives its date room again
+        request_id = self.client.get(
+            "/collection_requests",
+            headers={"Authorization": f"Bearer {self.tokens[5]}"}
+        ).json["items"][0]["id"]
+        self.client.delete(
+            f"/collection_requests/{request_id}",
+            headers={"Authorization": f"Bearer {self.tokens[5]}"})
+        self.assertEqual(self.assigned(5), new_id)
+
+    def test_index_corrected_by_the_database(self):
+        """Test places the index missed are caught by the reservation."""
+        with self.app.app_context():
+            current_index()
+            # as another worker filling the date would
+            db.session.execute(
+                update(CollectionDateModel)
+                .where(CollectionDateModel.id == 3)
+                .values(used=2))
+            db.session.commit()
+        self.assertEqual(self.assigned(3), 4)
+        with self.app.app_context():
+            self.assertEqual(current_index().first("North"), 4)
+
+    def test_rolled_back_changes_are_dropped(self):
+        """Test the index only sees committed writes."""
+        with self.app.app_context():
+            index = current_index()
+            db.session.add(CollectionDateModel(
+                collector_id=1, collection_date=self.day(1)))
+            db.session.flush()
+            db.session.rollback()
+            self.assertEqual(index.first("North"), 3)
+
+
+class DateIndexTestCase(unittest.TestCase):
+    def test_heap_walk(self):
+        """Test the index walks the dates in order, skipping full ones."""
+        today = date.today()
+        index = DateIndex()
+        index.add_collector(1, "North")
+        for date_id in range(1, 101):
+            index.add_date(
+                date_id, today + timedelta(101 - date_id), 1, 1)
+        self.assertEqual(index.first("North", today=today), 100)
+        self.assertEqual(
+            index.first("North", skip={100, 99}, today=today), 98)
+        index.add_requests(100)
+        self.assertEqual(index.first("North", today=today), 99)
+        index.add_requests(100, -1)
+        self.assertEqual(index.first("North", today=today), 100)
+        index.remove_date(100)
+        self.assertEqual(index.first("North", today=today), 99)
+        self.assertIsNone(index.first("South", today=today))
+        # dates that passed leave the heap
+        self.assertEqual(
+            index.first("North", today=today + timedelta(50)), 51)
+
+
+if __name__ == "__main__":
+    unittest.main()
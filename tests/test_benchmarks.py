@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from benchmarks.run import prepare_app
+from benchmarks.runner import compare, run_client, run_load, summarize
+from benchmarks.scenarios import SCENARIOS, BenchmarkContext
+from db import db
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class BenchmarkScenariosTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        database_url = f"sqlite:///{os.path.join(self.directory, 'b.db')}"
+        self.app = prepare_app(database_url, "smoke")
+        self.app.config["JOB_FILES_DIR"] = self.directory
+        self.context = BenchmarkContext(self.app)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def test_every_route_has_a_scenario(self):
+        """Test the scenarios drive every route of the API."""
+        routes = {
+            f"{method} {rule.rule}"
+            for rule in self.app.url_map.iter_rules()
+            if rule.endpoint.split(".")[0] not in ("static", "api-docs")
+            for method in rule.methods - {"HEAD", "OPTIONS"}
+        }
+        self.assertEqual(
+            routes, {scenario.name for scenario in SCENARIOS})
+
+    def test_scenarios_succeed(self):
+        """Test every scenario gets a successful response."""
+        results = run_client(
+            self.context, SCENARIOS, iterations=2, warmup=0)
+        for name, result in results.items():
+            self.assertEqual(result["errors"], 0, name)
+            self.assertEqual(result["requests"], 2)
+
+    def test_load(self):
+        """Test concurrent workers get successful responses."""
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if scenario.name in ("GET /admins", "POST /collection_requests")
+        ]
+        results = run_load(
+            self.context, scenarios, workers=3, duration=0.2)
+        for result in results.values():
+            self.assertEqual(result["errors"], 0)
+            self.assertGreater(result["requests"], 0)
+
+
+class CompareTestCase(unittest.TestCase):
+    def test_summarize(self):
+        """Test percentiles are taken by nearest rank."""
+        latencies = [index / 1000 for index in range(1, 101)]
+        summary = summarize(latencies, 2.0, 1)
+        self.assertEqual(summary["p50_ms"], 50)
+        self.assertEqual(summary["p95_ms"], 95)
+        self.assertEqual(summary["p99_ms"], 99)
+        self.assertEqual(summary["rps"], 50)
+        self.assertEqual(summary["errors"], 1)
+
+    def test_compare(self):
+        """Test regressions over the threshold are reported."""
+        baseline = {
+            "GET /a": {"p95_ms": 10.0, "rps": 100.0},
+            "GET /b": {"p95_ms": 10.0, "rps": 100.0},
+            "GET /c": {"p95_ms": 0.1, "rps": 10000.0},
+        }
+        results = {
+            "GET /a": {"p95_ms": 12.0, "rps": 90.0},
+            "GET /b": {"p95_ms": 14.0, "rps": 70.0},
+            # doubled, but by less than the minimal delta
+            "GET /c": {"p95_ms": 0.2, "rps": 5000.0},
+            "GET /d": {"p95_ms": 100.0, "rps": 1.0},
+        }
+        regressions = compare(baseline, results, threshold=0.25)
+        self.assertEqual(regressions, [
+            "GET /b: p95 14.0ms, baseline 10.0ms",
+            "GET /b: 70.0 req/s, baseline 100.0 req/s",
+            "GET /d: no baseline",
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
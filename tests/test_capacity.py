@@ -0,0 +1,217 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from datetime import date, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func, select, update
+from app import create_app
+from capacity import rebalance, reserve
+from db import db
+from models import (
+    CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel)
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class CapacityTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up two collectors of one area and three households."""
+        self.app = create_app("sqlite:///:memory:", config={
+            "RESPONSE_CACHE_BACKEND": "none",
+        })
+        self.client = self.app.test_client()
+        self.today = date.today()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                CollectorModel(user_id=1, allocated_area="North", capacity=2),
+                CollectorModel(user_id=2, allocated_area="North", capacity=1),
+            ] + [
+                HouseholdModel(
+                    user_id=user_id, house_number=str(user_id), area="North")
+                for user_id in (3, 4, 5)
+            ])
+            db.session.flush()
+            db.session.add_all([
+                CollectionDateModel(
+                    collector_id=collector_id, capacity=capacity,
+                    collection_date=self.today + timedelta(day))
+                for collector_id, capacity, day in (
+                    (1, 2, 3), (1, 2, 10), (2, 1, 4), (2, 1, 30))
+            ])
+            db.session.commit()
+            self.tokens = {
+                user_id: create_access_token(identity=user_id)
+                for user_id in (1, 3, 4, 5)
+            }
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def post(self, user_id, date_id):
+        return self.client.post(
+            "/collection_requests",
+            json={"household_id": user_id - 2, "collection_date_id": date_id},
+            headers={"Authorization": f"Bearer {self.tokens[user_id]}"})
+
+    def used(self):
+        """The places used of each date, and their number of requests."""
+        with self.app.app_context():
+            requests = (
+                select(func.count(CollectionRequestModel.id))
+                .where(CollectionRequestModel.collection_date_id
+                       == CollectionDateModel.id)
+                .scalar_subquery())
+            rows = db.session.execute(
+                select(CollectionDateModel.used, requests)
+                .order_by(CollectionDateModel.id)).all()
+        for used, count in rows:
+            self.assertEqual(used, count)
+        return [used for used, _ in rows]
+
+    def test_reservation(self):
+        """Test a full date refuses requests until one is deleted."""
+        self.assertEqual(self.post(3, 1).status_code, 201)
+        self.assertEqual(self.post(4, 1).status_code, 201)
+        response = self.post(5, 1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json["message"], "Collection date is full")
+        self.assertEqual(self.post(5, 99).status_code, 404)
+        self.assertEqual(self.used(), [2, 0, 0, 0])
+
+        request_id = self.client.get(
+            "/collection_requests",
+            headers={"Authorization": f"Bearer {self.tokens[3]}"}
+        ).json["items"][0]["id"]
+        self.client.delete(
+            f"/collection_requests/{request_id}",
+            headers={"Authorization": f"Bearer {self.tokens[3]}"})
+        self.assertEqual(self.used(), [1, 0, 0, 0])
+        self.assertEqual(self.post(5, 1).status_code, 201)
+
+    def test_bulk_reservation(self):
+        """Test bulk requests on full dates are reported as errors."""
+        self.assertEqual(self.post(3, 3).status_code, 201)
+        response = self.client.post(
+            "/collection_requests/bulk",
+            json={"requests": [
+                {"collection_date_id": date_id} for date_id in (3, 1, 4)]},
+            headers={"Authorization": f"Bearer {self.tokens[4]}"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [item["collection_date_id"] for item in response.json["created"]],
+            [1, 4])
+        self.assertEqual(response.json["errors"], [{
+            "index": 0, "collection_date_id": 3,
+            "message": "Collection date is full"}])
+        self.assertEqual(self.used(), [1, 0, 1, 1])
+
+    def test_dates_take_the_capacity_of_the_collector(self):
+        """Test new dates copy the capacity of their collector."""
+        headers = {"Authorization": f"Bearer {self.tokens[1]}"}
+        response = self.client.post(
+            "/collection_dates",
+            json={"date": (self.today + timedelta(5)).isoformat()},
+            headers=headers)
+        self.assertEqual(response.json["capacity"], 2)
+        self.assertEqual(response.json["used"], 0)
+        response = self.client.post(
+            "/collection_dates",
+            json={"date": (self.today + timedelta(6)).isoformat(),
+                  "capacity": 7},
+            headers=headers)
+        self.assertEqual(response.json["capacity"], 7)
+        self.client.post(
+            "/collection_dates/bulk",
+            json={"dates": [(self.today + timedelta(7)).isoformat()]},
+            headers=headers)
+        with self.app.app_context():
+            self.assertEqual(
+                db.session.get(CollectionDateModel, 7).capacity, 2)
+
+    def test_rebalance(self):
+        """Test requests over the capacity move to the nearest dates."""
+        with self.app.app_context():
+            # three requests on date 1, over its capacity of 2
+            db.session.add_all([
+                CollectionRequestModel(
+                    household_id=household_id, collection_date_id=1,
+                    status="pending")
+                for household_id in (1, 2, 3)
+            ] + [
+                CollectionRequestModel(
+                    household_id=3, collection_date_id=3, status="collected"),
+            ])
+            db.session.execute(
+                update(CollectionDateModel)
+                .where(CollectionDateModel.id == 1).values(used=3))
+            db.session.execute(
+                update(CollectionDateModel)
+                .where(CollectionDateModel.id == 3)
+                .values(used=1, capacity=2))
+            db.session.commit()
+            # the last request is household 3's, which already requested
+            # the nearest date 3: it goes to date 2, the next nearest one
+            self.assertEqual(rebalance(), {"moved": 1, "left": 0})
+            self.assertEqual(
+                db.session.get(CollectionRequestModel, 3).collection_date_id,
+                2)
+            self.assertEqual(rebalance(), {"moved": 0, "left": 0})
+
+        self.assertEqual(self.used(), [2, 1, 1, 0])
+
+    def test_rebalance_command(self):
+        """Test the rebalance command reports what it did."""
+        result = self.app.test_cli_runner().invoke(
+            args=["rebalance", "--area", "North", "--window", "7"])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Moved 0 requests, 0 left over capacity", result.output)
+
+
+class ConcurrentReservationTestCase(unittest.TestCase):
+    def test_concurrent_reservations(self):
+        """Test concurrent reservations never exceed the capacity."""
+        with tempfile.TemporaryDirectory() as directory:
+            app = create_app(
+                f"sqlite:///{os.path.join(directory, 'test.db')}")
+            with app.app_context():
+                db.create_all()
+                db.session.add_all([
+                    CollectorModel(user_id=1, allocated_area="North"),
+                    CollectionDateModel(
+                        collector_id=1, collection_date=date.today(),
+                        capacity=5),
+                ])
+                db.session.commit()
+
+            reserved = []
+
+            def post():
+                with app.app_context():
+                    reserved.extend(reserve(db.session, [1]))
+                    db.session.commit()
+                    db.session.remove()
+
+            threads = [threading.Thread(target=post) for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with app.app_context():
+                self.assertEqual(len(reserved), 5)
+                self.assertEqual(
+                    db.session.get(CollectionDateModel, 1).used, 5)
+                db.session.remove()
+                db.engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
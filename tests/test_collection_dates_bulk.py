@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+from datetime import date, timedelta
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from models import CollectorModel, CollectionDateModel
+from recurrence import expand_recurrence
+from query_count import QueryCountMixin
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class CollectionDatesBulkTestCase(QueryCountMixin, unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:")
+        self.client = self.app.test_client()
+        self.today = date.today()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(CollectorModel(user_id=1, allocated_area="Area"))
+            db.session.add(CollectionDateModel(
+                collector_id=1,
+                collection_date=self.today + timedelta(days=1)))
+            db.session.commit()
+            self.collector_token = create_access_token(
+                identity=1, additional_claims={"role": "collector"})
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def post(self, data):
+        return self.client.post(
+            "/collection_dates/bulk",
+            json=data,
+            headers={"Authorization": f"Bearer {self.collector_token}"})
+
+    def test_bulk_dates_with_errors(self):
+        """Test valid dates are created and the others reported."""
+        days = [self.today + timedelta(days=n) for n in (2, 3, 3, 1, -1)]
+        response = self.post({"dates": [day.isoformat() for day in days]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [item["date"] for item in response.json["created"]],
+            [days[0].isoformat(), days[1].isoformat()])
+        self.assertEqual(
+            [(error["index"], error["message"])
+             for error in response.json["errors"]],
+            [
+                (2, "Collection date already scheduled"),
+                (3, "Collection date already scheduled"),
+                (4, "Collection date is in the past"),
+            ])
+        with self.app.app_context():
+            self.assertEqual(CollectionDateModel.query.count(), 3)
+
+    def test_bulk_recurrence(self):
+        """Test a weekly recurrence creates one date per week."""
+        start = self.today + timedelta(days=7)
+        response = self.post({"recurrence": {
+            "start": start.isoformat(),
+            "until": (start + timedelta(weeks=4)).isoformat(),
+            "weekdays": ["TU"],
+        }})
+        self.assertEqual(response.status_code, 201)
+        created = [date.fromisoformat(item["date"])
+                   for item in response.json["created"]]
+        self.assertEqual(len(created), 4)
+        self.assertTrue(all(day.weekday() == 1 for day in created))
+
+    def test_bulk_insert_statements(self):
+        """Test a batch runs a constant number of statements."""
+        days = [(self.today + timedelta(days=n)).isoformat()
+                for n in range(2, 32)]
+        with self.count_queries() as statements:
+            response = self.post({"dates": days})
+        self.assertEqual(len(response.json["created"]), 30)
+        inserts = [s for s in statements if s.startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+    def test_bulk_requires_one_source(self):
+        """Test dates and recurrence are mutually exclusive."""
+        response = self.post({})
+        self.assertEqual(response.status_code, 422)
+
+    def test_bulk_requires_collector(self):
+        """Test households cannot add collection dates."""
+        with self.app.app_context():
+            token = create_access_token(
+                identity=2, additional_claims={"role": "household"})
+        response = self.client.post(
+            "/collection_dates/bulk",
+            json={"dates": [self.today.isoformat()]},
+            headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 403)
+
+
+class RecurrenceTestCase(unittest.TestCase):
+    def test_weekly_several_weekdays(self):
+        """Test a weekly rule on two weekdays every other week."""
+        dates = expand_recurrence(
+            date(2024, 6, 5), date(2024, 6, 30),
+            interval=2, weekdays=["MO", "WE"])
+        self.assertEqual(dates, [
+            date(2024, 6, 5), date(2024, 6, 17), date(2024, 6, 19)])
+
+    def test_daily_limit(self):
+        """Test a daily rule stops at the limit."""
+        dates = expand_recurrence(
+            date(2024, 6, 1), date(2024, 12, 31), freq="daily", limit=3)
+        self.assertEqual(len(dates), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import sys
+import os
+from datetime import date, timedelta
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from models import (
+    CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel)
+from query_count import QueryCountMixin
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class CollectionRequestsBulkTestCase(QueryCountMixin, unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:")
+        self.client = self.app.test_client()
+        today = date.today()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                CollectorModel(user_id=1, allocated_area="Area"),
+                CollectorModel(user_id=2, allocated_area="Other"),
+                HouseholdModel(user_id=3, house_number="1", area="Area"),
+                CollectionDateModel(
+                    collector_id=1, collection_date=today + timedelta(1)),
+                CollectionDateModel(
+                    collector_id=1, collection_date=today + timedelta(2)),
+                CollectionDateModel(
+                    collector_id=1, collection_date=today - timedelta(1)),
+                CollectionDateModel(
+                    collector_id=2, collection_date=today + timedelta(1)),
+            ])
+            db.session.commit()
+            self.collector_token = create_access_token(
+                identity=1, additional_claims={"role": "collector"})
+            self.household_token = create_access_token(
+                identity=3, additional_claims={"role": "household"})
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def submit(self, date_ids):
+        return self.client.post(
+            "/collection_requests/bulk",
+            json={"requests": [
+                {"collection_date_id": date_id} for date_id in date_ids]},
+            headers={"Authorization": f"Bearer {self.household_token}"})
+
+    def set_status(self, updates, token=None):
+        return self.client.patch(
+            "/collection_requests/status",
+            json={"updates": [
+                {"id": request_id, "status": status}
+                for request_id, status in updates]},
+            headers={
+                "Authorization": f"Bearer {token or self.collector_token}"})
+
+    def test_bulk_submit(self):
+        """Test valid requests are created and the others reported."""
+        response = self.submit([1, 2, 2, 3, 99])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [item["collection_date_id"]
+             for item in response.json["created"]], [1, 2])
+        self.assertTrue(all(
+            item["status"] == "pending"
+            for item in response.json["created"]))
+        self.assertEqual(
+            [(error["index"], error["message"])
+             for error in response.json["errors"]],
+            [
+                (2, "Collection already requested"),
+                (3, "Collection date has passed"),
+                (4, "Collection date not found"),
+            ])
+
+    def test_status_update_single_statement(self):
+        """Test a batch of status changes runs one UPDATE."""
+        self.submit([1, 2, 4])
+        with self.count_queries() as statements:
+            response = self.set_status(
+                [(1, "collected"), (2, "missed"), (3, "collected")])
+        self.assertEqual(response.status_code, 200)
+        # request 3 is on a date of the other collector
+        self.assertEqual(response.json["updated"], [1, 2])
+        self.assertEqual(response.json["not_updated"], [3])
+        updates = [s for s in statements if s.startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+
+        with self.app.app_context():
+            statuses = dict(db.session.query(
+                CollectionRequestModel.id, CollectionRequestModel.status))
+        self.assertEqual(
+            statuses, {1: "collected", 2: "missed", 3: "pending"})
+
+    def test_status_update_invalid_status(self):
+        """Test unknown statuses are rejected."""
+        response = self.set_status([(1, "lost")])
+        self.assertEqual(response.status_code, 422)
+
+    def test_status_update_requires_collector(self):
+        """Test households cannot change statuses."""
+        response = self.set_status(
+            [(1, "collected")], token=self.household_token)
+        self.assertEqual(response.status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
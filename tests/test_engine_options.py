@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from asgi import async_database_url
+from db import db
+from engine_options import DEFAULTS, engine_options, _dispose_after_fork
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class EngineOptionsTestCase(unittest.TestCase):
+    def test_postgres_options(self):
+        """Test server databases get pool sizes and statement timeouts."""
+        config = dict(DEFAULTS, DB_POOL_SIZE=20, DB_STATEMENT_TIMEOUT=5000)
+        options = engine_options("postgresql://db/ecotrack", config)
+        self.assertEqual(options["pool_size"], 20)
+        self.assertEqual(options["max_overflow"], 10)
+        self.assertEqual(options["pool_recycle"], 1800)
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertEqual(
+            options["connect_args"],
+            {"options": "-c statement_timeout=5000"})
+
+    def test_asyncpg_options(self):
+        """Test the async PostgreSQL driver gets the statement timeout as
+        a server setting."""
+        config = dict(DEFAULTS, DB_STATEMENT_TIMEOUT=5000)
+        url = async_database_url("postgresql://db/ecotrack")
+        self.assertEqual(url.get_driver_name(), "asyncpg")
+        options = engine_options(url, config)
+        self.assertEqual(options["pool_size"], DEFAULTS["DB_POOL_SIZE"])
+        self.assertEqual(
+            options["connect_args"],
+            {"server_settings": {"statement_timeout": "5000"}})
+
+    def test_sqlite_options(self):
+        """Test SQLite keeps its pool and only gets pre-ping."""
+        options = engine_options("sqlite:///:memory:", DEFAULTS)
+        self.assertEqual(options, {"pool_pre_ping": True})
+
+    def test_environment_and_config(self):
+        """Test settings come from the environment or the config."""
+        with patch.dict(os.environ, {"DB_POOL_PRE_PING": "0"}):
+            app = create_app(
+                "sqlite:///:memory:", config={"DB_POOL_SIZE": 3})
+        self.assertFalse(app.config["DB_POOL_PRE_PING"])
+        self.assertEqual(app.config["DB_POOL_SIZE"], 3)
+        self.assertEqual(
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"],
+            {"pool_pre_ping": False})
+
+
+class DatabaseHealthTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "ecotrack.db")
+        self.app = create_app(f"sqlite:///{path}")
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def test_health_reports_pool(self):
+        """Test /health/db reports the status and pool statistics."""
+        response = self.client.get("/health/db")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["status"], "ok")
+        self.assertEqual(response.json["pool"]["pool"], "QueuePool")
+        self.assertEqual(response.json["pool"]["checkedout"], 0)
+        self.assertEqual(response.json["pool"]["checkedin"], 1)
+
+    def test_health_hides_errors(self):
+        """Test a failed check answers 503 without the driver error."""
+        error = OperationalError(
+            "SELECT 1", {}, Exception(
+                'connection to server at "db.internal" (10.0.0.5), port '
+                '5432 failed: FATAL: password authentication failed for '
+                'user "ecotrack"'))
+        with patch("resources.health.check_database", side_effect=error):
+            with self.assertLogs(self.app.logger, "ERROR") as logs:
+                response = self.client.get("/health/db")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(
+            response.json["message"], "The database is unavailable.")
+        self.assertNotIn("db.internal", response.get_data(as_text=True))
+        self.assertIn("db.internal", "\n".join(logs.output))
+
+    def test_fork_drops_inherited_connections(self):
+        """Test the fork handler empties the pools of the app."""
+        self.client.get("/health/db")
+        _dispose_after_fork()
+        with self.app.app_context():
+            self.assertEqual(db.engine.pool.checkedin(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
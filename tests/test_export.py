@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import csv
+import io
+import json
+from datetime import date
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from export import export_statement, stream_export
+from models import (
+    CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel)
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                CollectorModel(user_id=1, allocated_area="North"),
+                HouseholdModel(user_id=2, house_number="1", area="North"),
+                HouseholdModel(user_id=3, house_number="2", area="South"),
+                CollectionDateModel(
+                    collector_id=1, collection_date=date(2024, 6, 1)),
+                CollectionDateModel(
+                    collector_id=1, collection_date=date(2024, 7, 1)),
+            ])
+            for household_id, date_id in [(1, 1), (2, 1), (1, 2), (2, 2)]:
+                db.session.add(CollectionRequestModel(
+                    status="pending", household_id=household_id,
+                    collection_date_id=date_id))
+            db.session.commit()
+            self.admin_token = create_access_token(
+                identity=1, additional_claims={"role": "admin"})
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def export(self, query=""):
+        return self.client.get(
+            f"/collection_requests/export{query}",
+            headers={"Authorization": f"Bearer {self.admin_token}"})
+
+    def test_export_ndjson(self):
+        """Test every request is exported as one JSON line."""
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [1, 2, 3, 4])
+        self.assertEqual(rows[0]["collection_date"], "2024-06-01")
+        self.assertEqual(rows[1]["area"], "South")
+
+    def test_export_csv_filtered(self):
+        """Test the CSV export applies the date range and area filters."""
+        response = self.export("?format=csv&from=2024-06-15&area=North")
+        self.assertEqual(response.mimetype, "text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        self.assertEqual([row["id"] for row in rows], ["3"])
+        self.assertEqual(rows[0]["house_number"], "1")
+
+    def test_export_streams_in_chunks(self):
+        """Test the export yields one chunk per chunk_size rows."""
+        with self.app.app_context():
+            chunks = list(stream_export(export_statement(), chunk_size=3))
+        self.assertEqual(
+            [chunk.count("\n") for chunk in chunks], [3, 1])
+
+    def test_export_requires_admin(self):
+        """Test non admins cannot export."""
+        with self.app.app_context():
+            token = create_access_token(
+                identity=2, additional_claims={"role": "household"})
+        response = self.client.get(
+            "/collection_requests/export",
+            headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+import threading
+from unittest.mock import patch
+from passlib.hash import pbkdf2_sha256
+from app import create_app
+from db import db
+from hashing import HashingBusy, HashingExecutor
+from models import UserModel
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class HashingExecutorTestCase(unittest.TestCase):
+    def test_hash_and_verify_in_process_pool(self):
+        """Test hashes made by the process pool verify."""
+        executor = HashingExecutor(max_workers=1, rounds=1000)
+        try:
+            password_hash = executor.hash("secret")
+            self.assertTrue(executor.verify("secret", password_hash))
+            self.assertFalse(executor.verify("wrong", password_hash))
+        finally:
+            executor.shutdown()
+
+    def test_full_queue_raises_busy(self):
+        """Test submissions beyond workers plus queue are refused."""
+        executor = HashingExecutor(kind="thread", max_workers=1, max_queue=0)
+        release = threading.Event()
+        started = threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        thread = threading.Thread(target=executor._run, args=(block,))
+        thread.start()
+        started.wait()
+        try:
+            with self.assertRaises(HashingBusy):
+                executor.hash("secret")
+        finally:
+            release.set()
+            thread.join()
+            executor.shutdown()
+
+    def test_needs_rehash(self):
+        """Test hashes made with other rounds need a rehash."""
+        executor = HashingExecutor(kind="inline", rounds=2000)
+        self.assertTrue(executor.needs_rehash(
+            pbkdf2_sha256.using(rounds=1000).hash("secret")))
+        self.assertFalse(executor.needs_rehash(executor.hash("secret")))
+
+
+class HashingEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("sqlite:///:memory:")
+        self.app.config["HASHING_RETRY_AFTER"] = 3
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app.extensions["hashing"].shutdown()
+        self.app_context.pop()
+
+    def test_register_busy_returns_503(self):
+        """Test a full hashing queue answers 503 with Retry-After."""
+        with patch.object(
+                HashingExecutor, "_run", side_effect=HashingBusy()):
+            response = self.client.post('/register', json={
+                'username': 'testuser', 'password': 'password'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "3")
+
+    def test_login_rehashes_password(self):
+        """Test a login upgrades a hash made with other rounds."""
+        db.session.add(UserModel(
+            username="testuser",
+            password=pbkdf2_sha256.using(rounds=1000).hash("password")))
+        db.session.commit()
+        self.app.extensions["hashing"].rounds = 2000
+
+        response = self.client.post('/login', json={
+            'username': 'testuser', 'password': 'password'})
+        self.assertEqual(response.status_code, 200)
+
+        user = UserModel.query.filter_by(username="testuser").first()
+        self.assertEqual(pbkdf2_sha256.from_string(user.password).rounds, 2000)
+        self.assertTrue(pbkdf2_sha256.verify("password", user.password))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -45,7 +45,7 @@ class HouseholdTestCase(unittest.TestCase):
             headers={"Authorization": f"Bearer {self.admin_token}"}
         )
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.json), 0)
+        self.assertEqual(len(response.json["items"]), 0)
 
     def test_add_household(self):
         """Test adding a new household."""
@@ -0,0 +1,129 @@
+import unittest
+import sys
+import os
+from datetime import date, timedelta
+from unittest import mock
+from flask_jwt_extended import create_access_token, decode_token
+from app import create_app
+from db import db
+from identity import current_household_id
+from models import (
+    CollectionDateModel, CollectionRequestModel, CollectorModel,
+    HouseholdModel, UserModel)
+from query_count import QueryCountMixin
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class IdentityClaimsTestCase(QueryCountMixin, unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:", config={
+            "RESPONSE_CACHE_BACKEND": "none",
+        })
+        self.client = self.app.test_client()
+        tomorrow = date.today() + timedelta(1)
+
+        with self.app.app_context():
+            db.create_all()
+            # household ids differ from the user ids
+            db.session.add_all([
+                CollectorModel(user_id=30, allocated_area="Area"),
+                HouseholdModel(user_id=20, house_number="1", area="Area"),
+                HouseholdModel(user_id=21, house_number="2", area="Area"),
+                CollectionDateModel(collector_id=1, collection_date=tomorrow),
+            ])
+            db.session.flush()
+            db.session.add_all([
+                CollectionRequestModel(
+                    household_id=1, collection_date_id=1, status="pending"),
+                CollectionRequestModel(
+                    household_id=2, collection_date_id=1, status="pending"),
+            ])
+            db.session.commit()
+            self.token = create_access_token(identity=21)
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def test_login_claims(self):
+        """Test the login token holds the role and the entity ids."""
+        with self.app.app_context():
+            db.session.add(UserModel(id=21, username="user", password="x"))
+            db.session.commit()
+        with mock.patch("resources.user.verify_password",
+                        return_value=True), \
+                mock.patch("resources.user.needs_rehash",
+                           return_value=False):
+            response = self.client.post(
+                "/login", json={"username": "user", "password": "secret"})
+        with self.app.app_context():
+            claims = decode_token(response.json["access_token"])
+        self.assertEqual(claims["role"], "household")
+        self.assertEqual(claims["household_id"], 2)
+        self.assertIsNone(claims["collector_id"])
+        self.assertIsNone(claims["admin_id"])
+
+    def test_list_own_requests(self):
+        """Test a household lists the requests of its household id."""
+        response = self.client.get(
+            "/collection_requests", headers=self.headers())
+        self.assertEqual(
+            [item["id"] for item in response.json["items"]], [2])
+
+    def test_collector_cannot_list(self):
+        """Test collectors are refused the request listing."""
+        with self.app.app_context():
+            token = create_access_token(identity=30)
+        response = self.client.get(
+            "/collection_requests",
+            headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_create_for_own_household(self):
+        """Test a household may only request for itself."""
+        response = self.client.post(
+            "/collection_requests",
+            json={"household_id": 1, "collection_date_id": 1},
+            headers=self.headers())
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.post(
+            "/collection_requests",
+            json={"household_id": 2, "collection_date_id": 1},
+            headers=self.headers())
+        self.assertEqual(response.status_code, 201)
+
+    def test_delete_own_request(self):
+        """Test a household cannot delete the request of another one."""
+        response = self.client.delete(
+            "/collection_requests/1", headers=self.headers())
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.delete(
+            "/collection_requests/2", headers=self.headers())
+        self.assertEqual(response.status_code, 200)
+
+    def test_claims_need_no_query(self):
+        """Test the household id is taken from the token."""
+        with self.app.app_context():
+            with self.assertNumQueries(0):
+                self.assertEqual(current_household_id(
+                    {"sub": 21, "household_id": 2}), 2)
+
+    def test_token_without_claims(self):
+        """Test tokens without the claims fall back to a lookup."""
+        with self.app.app_context():
+            with self.assertNumQueries(1):
+                self.assertEqual(current_household_id({"sub": 21}), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import sys
+import os
+from app import create_app
+from db import db
+from explain import INDEXED_QUERIES, check_indexes, query_plan
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("sqlite:///:memory:")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_queries_use_indexes(self):
+        """Test every resource query plan uses its index."""
+        with db.engine.connect() as connection:
+            self.assertEqual(check_indexes(connection), [])
+
+    def test_plan_without_index(self):
+        """Test the plan reports a scan once an index is dropped."""
+        description, statement, indexes = INDEXED_QUERIES[-1]
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql(f"DROP INDEX {indexes[0]}")
+            plan = query_plan(statement, connection)
+        self.assertFalse(any(indexes[0] in line for line in plan))
+
+    def test_check_indexes_command(self):
+        """Test the flask check-indexes command succeeds."""
+        result = self.app.test_cli_runner().invoke(args=["check-indexes"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("use their indexes", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
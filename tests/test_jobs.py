@@ -0,0 +1,264 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from jobs import claim, enqueue, task, utcnow, work
+from models import (
+    AdminModel, CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel, JobModel)
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+# Jobs of the "test_flaky" task fail this many times before succeeding
+failures = Counter()
+
+
+@task("test_flaky")
+def flaky_task(job):
+    if failures[job.id] < job.payload["fail"]:
+        failures[job.id] += 1
+        raise RuntimeError("not yet")
+    return {"attempts": job.attempts}
+
+
+# Times each job of the "test_count" task ran
+runs = Counter()
+
+
+@task("test_count")
+def count_task(job):
+    runs[job.id] += 1
+    return None
+
+
+class JobsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up an admin, a household and a request on a date."""
+        failures.clear()
+        runs.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = create_app("sqlite:///:memory:", config={
+            "RESPONSE_CACHE_BACKEND": "none",
+            "JOB_FILES_DIR": self.directory.name,
+        })
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                AdminModel(user_id=1),
+                CollectorModel(user_id=2, allocated_area="North"),
+                HouseholdModel(user_id=3, house_number="1", area="North"),
+            ])
+            db.session.flush()
+            db.session.add(CollectionDateModel(
+                collector_id=1, collection_date=date.today(), used=1))
+            db.session.flush()
+            db.session.add(CollectionRequestModel(
+                household_id=1, collection_date_id=1, status="pending"))
+            db.session.commit()
+            self.tokens = {
+                user_id: create_access_token(identity=user_id)
+                for user_id in (1, 3)
+            }
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        self.directory.cleanup()
+
+    def request(self, method, path, user_id=1, **kwargs):
+        return self.client.open(
+            path, method=method,
+            headers={"Authorization": f"Bearer {self.tokens[user_id]}"},
+            **kwargs)
+
+    def work(self):
+        with self.app.app_context():
+            return work(worker="test", burst=True)
+
+    def test_export_job(self):
+        """Test an export is queued, run by a worker and downloaded."""
+        response = self.request(
+            "POST", "/collection_requests/export", json={"format": "csv"})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json["status"], "queued")
+        location = response.headers["Location"]
+        self.assertEqual(location, f"/jobs/{response.json['id']}")
+        self.assertEqual(
+            self.request("GET", f"{location}/file").status_code, 409)
+
+        self.assertEqual(self.work(), 1)
+        job = self.request("GET", location).json
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(job["result"], {"file": "job-1.csv", "format": "csv"})
+        response = self.request("GET", f"{location}/file")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/csv")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("id,status"))
+        response.close()
+
+    def test_stats_and_rebalance_jobs(self):
+        """Test the statistics and rebalancing jobs return their result."""
+        stats = self.request("POST", "/stats/collections", json={}).json
+        rebalance = self.request(
+            "POST", "/collection_dates/rebalance",
+            json={"area": "North"}).json
+        self.assertEqual(self.work(), 2)
+        self.assertEqual(
+            self.request("GET", f"/jobs/{stats['id']}").json["result"],
+            self.request("GET", "/stats/collections").json)
+        job = self.request("GET", f"/jobs/{rebalance['id']}").json
+        self.assertEqual(job["payload"], {"area": "North", "window": 14})
+        self.assertEqual(job["result"], {"moved": 0, "left": 0})
+
+    def test_admin_only(self):
+        """Test other users can neither queue jobs nor list them."""
+        for method, path in (
+                ("POST", "/collection_requests/export"),
+                ("POST", "/stats/collections"),
+                ("POST", "/collection_dates/rebalance"),
+                ("GET", "/jobs")):
+            response = self.request(method, path, user_id=3, json={})
+            self.assertEqual(response.status_code, 403, path)
+
+    def test_job_visibility(self):
+        """Test users see their own jobs and admins every job."""
+        with self.app.app_context():
+            own = enqueue("test_count", user_id=3).id
+            other = enqueue("test_count", user_id=1).id
+        self.assertEqual(
+            self.request("GET", f"/jobs/{own}", user_id=3).status_code, 200)
+        self.assertEqual(
+            self.request("GET", f"/jobs/{other}", user_id=3).status_code, 404)
+        response = self.request("GET", "/jobs?limit=1")
+        self.assertEqual([job["id"] for job in response.json["items"]], [own])
+        self.assertEqual(response.json["next_cursor"], own)
+
+    def test_retries(self):
+        """Test failed jobs are retried after a backoff, then fail."""
+        with self.app.app_context():
+            retried = enqueue("test_flaky", {"fail": 1}).id
+            failed = enqueue("test_flaky", {"fail": 5}, max_attempts=2).id
+        self.assertEqual(self.work(), 2)
+
+        with self.app.app_context():
+            job = db.session.get(JobModel, retried)
+            self.assertEqual(job.status, "queued")
+            self.assertEqual(job.error, "RuntimeError: not yet")
+            # JOB_BACKOFF is 2 seconds, with jitter down to half of it
+            self.assertGreater(job.run_at, utcnow() + timedelta(seconds=0.9))
+            # not due yet
+            self.assertIsNone(claim("test"))
+            db.session.query(JobModel).update({"run_at": utcnow()})
+            db.session.commit()
+        self.assertEqual(self.work(), 2)
+
+        with self.app.app_context():
+            job = db.session.get(JobModel, retried)
+            self.assertEqual(job.status, "succeeded")
+            self.assertEqual(job.result, {"attempts": 2})
+            self.assertIsNone(job.error)
+            job = db.session.get(JobModel, failed)
+            self.assertEqual(job.status, "failed")
+            self.assertEqual(job.attempts, 2)
+            self.assertIsNotNone(job.finished_at)
+
+    def test_expired_lease(self):
+        """Test a job left running past its lease is claimed again."""
+        with self.app.app_context():
+            job_id = enqueue("test_count").id
+            self.assertEqual(claim("dead").id, job_id)
+            self.assertIsNone(claim("test"))
+            db.session.query(JobModel).update({
+                "locked_at": utcnow() - timedelta(
+                    seconds=self.app.config["JOB_LEASE"] + 1)})
+            db.session.commit()
+            job = claim("test")
+            self.assertEqual((job.id, job.attempts), (job_id, 2))
+
+    def test_expired_last_attempt(self):
+        """Test a job whose worker died on its last attempt fails."""
+        with self.app.app_context():
+            job_id = enqueue("test_count", max_attempts=1).id
+            self.assertEqual(claim("dead").id, job_id)
+            db.session.query(JobModel).update({
+                "locked_at": utcnow() - timedelta(
+                    seconds=self.app.config["JOB_LEASE"] + 1)})
+            db.session.commit()
+            self.assertIsNone(claim("test"))
+            job = db.session.get(JobModel, job_id)
+            self.assertEqual((job.status, job.attempts), ("failed", 1))
+            self.assertEqual(job.error, "Lease expired on the last attempt")
+            self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_task(self):
+        """Test only registered tasks can be queued."""
+        with self.app.app_context():
+            with self.assertRaises(LookupError):
+                enqueue("no_such_task")
+
+    def test_worker_command(self):
+        """Test the worker command runs the queued jobs."""
+        with self.app.app_context():
+            enqueue("test_count")
+        result = self.app.test_cli_runner().invoke(
+            args=["worker", "--burst"])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Ran 1 jobs", result.output)
+        self.assertNotIn("RESPONSE_CACHE_BACKEND", result.output)
+
+        self.app.config["RESPONSE_CACHE_BACKEND"] = "local"
+        result = self.app.test_cli_runner().invoke(
+            args=["worker", "--burst"])
+        self.assertIn("RESPONSE_CACHE_BACKEND is local", result.output)
+
+
+class ConcurrentWorkersTestCase(unittest.TestCase):
+    def test_each_job_runs_once(self):
+        """Test concurrent workers never run a job twice."""
+        runs.clear()
+        with tempfile.TemporaryDirectory() as directory:
+            app = create_app(
+                f"sqlite:///{os.path.join(directory, 'test.db')}")
+            with app.app_context():
+                db.create_all()
+                job_ids = [enqueue("test_count").id for _ in range(40)]
+
+            ran = []
+
+            def worker(name):
+                with app.app_context():
+                    ran.append(work(worker=name, burst=True))
+
+            threads = [
+                threading.Thread(target=worker, args=(f"worker-{index}",))
+                for index in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with app.app_context():
+                self.assertEqual(sum(ran), 40)
+                self.assertEqual([runs[job_id] for job_id in job_ids],
+                                 [1] * 40)
+                db.session.remove()
+                db.engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
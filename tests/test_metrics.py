@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import threading
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from metrics import Metrics
+from models import AdminModel
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class MetricsEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("sqlite:///:memory:", config={
+            "HASHING_EXECUTOR": "inline",
+            "RESPONSE_CACHE_BACKEND": "none",
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(AdminModel(user_id=1))
+            db.session.commit()
+            self.admin_token = create_access_token(
+                identity=1, additional_claims={"role": "admin"})
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def metrics(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith("text/plain"))
+        return response.text
+
+    def test_request_metrics(self):
+        """Test latency, status and SQL series of an endpoint."""
+        self.client.get(
+            "/admins", headers={"Authorization": f"Bearer {self.admin_token}"})
+        self.client.get("/admins")
+        text = self.metrics()
+        self.assertIn(
+            'ecotrack_request_duration_seconds_count'
+            '{method="GET",endpoint="admins.Admins"} 2', text)
+        self.assertIn(
+            'ecotrack_requests_total'
+            '{method="GET",endpoint="admins.Admins",status="200"} 1', text)
+        self.assertIn(
+            'ecotrack_requests_total'
+            '{method="GET",endpoint="admins.Admins",status="401"} 1', text)
+        self.assertIn(
+            'ecotrack_request_sql_statements_bucket'
+            '{endpoint="admins.Admins",le="0"} 1', text)
+        self.assertIn(
+            'ecotrack_jwt_decode_duration_seconds_count 1', text)
+
+    def test_password_hash_metrics(self):
+        """Test registering records a hash duration."""
+        self.client.post(
+            "/register", json={"username": "user", "password": "secret"})
+        self.assertIn(
+            'ecotrack_password_hash_duration_seconds_count'
+            '{operation="hash"} 1', self.metrics())
+
+    def test_disabled(self):
+        """Test /metrics does not exist when metrics are disabled."""
+        app = create_app(
+            "sqlite:///:memory:", config={"METRICS_ENABLED": False})
+        self.assertEqual(app.test_client().get("/metrics").status_code, 404)
+
+
+class MetricsTestCase(unittest.TestCase):
+    def test_threads_are_summed(self):
+        """Test counters recorded by several threads are summed."""
+        metrics = Metrics()
+
+        def record():
+            for _ in range(1000):
+                metrics.inc("ecotrack_sql_statements_total")
+                metrics.observe(
+                    "ecotrack_request_sql_statements", (), 3)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        text = metrics.render()
+        self.assertIn("ecotrack_sql_statements_total 4000", text)
+        self.assertIn('ecotrack_request_sql_statements_bucket{le="2"} 0', text)
+        self.assertIn(
+            'ecotrack_request_sql_statements_bucket{le="3"} 4000', text)
+        self.assertIn(
+            'ecotrack_request_sql_statements_bucket{le="+Inf"} 4000', text)
+        self.assertIn("ecotrack_request_sql_statements_sum 12000", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
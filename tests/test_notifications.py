@@ -0,0 +1,242 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from jobs import utcnow, work
+from models import (
+    AdminModel, CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel, ReminderRunModel, UserModel)
+from notifications import ReminderRunBusy, send_reminders
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class ListTransport:
+    """Transport keeping the reminders, failing after some chunks."""
+
+    def __init__(self, fail_after=None, delay=0):
+        self.chunks = []
+        self.fail_after = fail_after
+        self.delay = delay
+
+    def send(self, messages):
+        if self.fail_after is not None and len(self.chunks) == self.fail_after:
+            raise ConnectionError("transport down")
+        time.sleep(self.delay)
+        self.chunks.append(messages)
+
+    @property
+    def households(self):
+        return [message["household_id"]
+                for chunk in self.chunks for message in chunk]
+
+
+class RemindersTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up households with requests on two dates of a day."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = create_app(
+            f"sqlite:///{os.path.join(self.directory.name, 'test.db')}",
+            config={
+                "RESPONSE_CACHE_BACKEND": "none",
+                "NOTIFICATION_TRANSPORT": "file",
+                "NOTIFICATION_FILE": os.path.join(
+                    self.directory.name, "notifications.ndjson"),
+            })
+        self.client = self.app.test_client()
+        self.day = date.today() + timedelta(days=1)
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all(
+                [UserModel(username=f"user-{index}", password="-")
+                 for index in range(1, 8)]
+                + [AdminModel(user_id=1)]
+                + [CollectorModel(user_id=user_id, allocated_area="North")
+                   for user_id in (2, 3)]
+                + [HouseholdModel(user_id=user_id, house_number=str(user_id),
+                                  area="North")
+                   for user_id in (4, 5, 6, 7)])
+            db.session.flush()
+            db.session.add_all([
+                CollectionDateModel(collector_id=1, collection_date=self.day),
+                CollectionDateModel(collector_id=2, collection_date=self.day),
+                CollectionDateModel(
+                    collector_id=1, collection_date=self.day + timedelta(7)),
+            ])
+            db.session.flush()
+            db.session.add_all([
+                CollectionRequestModel(
+                    household_id=household_id, collection_date_id=date_id,
+                    status=status)
+                for household_id, date_id, status in (
+                    # household 1 has two pending requests on the day
+                    (1, 1, "pending"),
+                    (2, 2, "pending"),
+                    (1, 2, "pending"),
+                    (3, 1, "collected"),
+                    (3, 3, "pending"),
+                    (4, 2, "pending"),
+                )
+            ])
+            db.session.commit()
+            self.token = create_access_token(identity=1)
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def test_one_reminder_per_household(self):
+        """Test each household with a pending request on the day gets one
+        reminder, whatever the chunk size."""
+        for chunk_size in (1000, 1):
+            with self.app.app_context():
+                db.session.query(ReminderRunModel).delete()
+                db.session.commit()
+                transport = ListTransport()
+                result = send_reminders(
+                    day=self.day, chunk_size=chunk_size, transport=transport)
+            self.assertEqual(transport.households, [1, 2, 4])
+            self.assertEqual(result, {
+                "day": self.day.isoformat(), "sent": 3, "resumed": False,
+                "total": 3})
+
+        message = transport.chunks[0][0]
+        self.assertEqual(message["user_id"], 4)
+        self.assertIn("Hello user-4, your waste at 4, North", message["body"])
+
+    def test_resume(self):
+        """Test a run stopped by its transport resumes from its
+        checkpoint, and a finished day is not reminded again."""
+        with self.app.app_context():
+            transport = ListTransport(fail_after=1)
+            with self.assertRaises(ConnectionError):
+                send_reminders(day=self.day, chunk_size=2, transport=transport)
+            # the first chunk was sent and checkpointed
+            self.assertEqual(transport.households, [1, 2])
+            run = db.session.scalar(db.select(ReminderRunModel))
+            self.assertEqual((run.household_id, run.sent), (2, 2))
+
+            transport = ListTransport()
+            result = send_reminders(
+                day=self.day, chunk_size=2, transport=transport)
+            self.assertEqual(transport.households, [4])
+            self.assertEqual(result["resumed"], True)
+            self.assertEqual((result["sent"], result["total"]), (1, 3))
+
+            transport = ListTransport()
+            result = send_reminders(day=self.day, transport=transport)
+            self.assertEqual(transport.chunks, [])
+            self.assertEqual((result["sent"], result["total"]), (0, 3))
+
+    def test_lease(self):
+        """Test a day leased by another run is not sent until the lease
+        is given back or expires."""
+        with self.app.app_context():
+            db.session.add(ReminderRunModel(
+                collection_day=self.day, sent=0, started_at=utcnow(),
+                locked_by="other", locked_at=utcnow()))
+            db.session.commit()
+            transport = ListTransport()
+            with self.assertRaises(ReminderRunBusy):
+                send_reminders(day=self.day, transport=transport)
+            self.assertEqual(transport.chunks, [])
+
+            db.session.query(ReminderRunModel).update({
+                "locked_at": utcnow() - timedelta(
+                    seconds=self.app.config["REMINDER_LEASE"] + 1)})
+            db.session.commit()
+            result = send_reminders(day=self.day, transport=transport)
+            self.assertEqual(transport.households, [1, 2, 4])
+            self.assertEqual(result["total"], 3)
+            run = db.session.scalar(db.select(ReminderRunModel))
+            self.assertEqual((run.locked_by, run.locked_at), (None, None))
+
+    def test_lease_taken_over(self):
+        """Test a run whose lease was taken over stops at its next
+        checkpoint."""
+        with self.app.app_context():
+            class TakenOver(ListTransport):
+                def send(self, messages):
+                    super().send(messages)
+                    with db.engine.begin() as connection:
+                        connection.execute(
+                            db.update(ReminderRunModel)
+                            .values(locked_by="other"))
+
+            transport = TakenOver()
+            with self.assertRaises(ReminderRunBusy):
+                send_reminders(day=self.day, chunk_size=1, transport=transport)
+            self.assertEqual(transport.households, [1])
+            run = db.session.scalar(db.select(ReminderRunModel))
+            self.assertEqual(
+                (run.household_id, run.sent, run.locked_by),
+                (None, 0, "other"))
+
+    def test_concurrent_runs(self):
+        """Test concurrent runs of a day remind each household once."""
+        transport = ListTransport(delay=0.05)
+        outcomes = []
+
+        def remind():
+            with self.app.app_context():
+                try:
+                    outcomes.append(send_reminders(
+                        day=self.day, chunk_size=1, transport=transport))
+                except ReminderRunBusy:
+                    outcomes.append("busy")
+
+        threads = [threading.Thread(target=remind) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(transport.households, [1, 2, 4])
+        self.assertEqual(
+            sum(outcome["sent"] for outcome in outcomes
+                if outcome != "busy"), 3)
+
+    def test_remind_command(self):
+        """Test the remind command writes the reminders to the file."""
+        with self.app.app_context():
+            result = self.app.test_cli_runner().invoke(
+                args=["remind", "--day", self.day.isoformat()])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn(
+            f"Sent 3 reminders for {self.day.isoformat()}, 3 in total",
+            result.output)
+        with open(self.app.config["NOTIFICATION_FILE"]) as file:
+            messages = [json.loads(line) for line in file]
+        self.assertEqual(
+            [message["household_id"] for message in messages], [1, 2, 4])
+
+    def test_reminders_job(self):
+        """Test the reminders are queued as a job by admins."""
+        response = self.client.post(
+            "/collection_dates/reminders", json={},
+            headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 202)
+        with self.app.app_context():
+            self.assertEqual(work(burst=True), 1)
+        job = self.client.get(
+            response.headers["Location"],
+            headers={"Authorization": f"Bearer {self.token}"}).json
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["result"]["sent"], 3)
+        self.assertEqual(job["result"]["day"], self.day.isoformat())
+
+
+if __name__ == "__main__":
+    unittest.main()
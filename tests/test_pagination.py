@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from models import HouseholdModel, AdminModel
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class CursorPaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(AdminModel(user_id=1))
+            for user_id in range(1, 6):
+                db.session.add(HouseholdModel(
+                    house_number=str(user_id), area="Area", user_id=user_id))
+            db.session.commit()
+
+            self.admin_token = create_access_token(
+                identity=1, additional_claims={"role": "admin"})
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def get(self, url):
+        return self.client.get(
+            url, headers={"Authorization": f"Bearer {self.admin_token}"})
+
+    def test_first_page(self):
+        """Test the first page holds limit items and a next cursor."""
+        response = self.get("/households?limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["house_number"] for item in response.json["items"]],
+            ["1", "2"])
+        self.assertEqual(response.json["next_cursor"], 2)
+        self.assertIn("after=2", response.headers["Link"])
+        self.assertIn('rel="next"', response.headers["Link"])
+
+    def test_walk_all_pages(self):
+        """Test following next_cursor returns every row exactly once."""
+        seen = []
+        url = "/households?limit=2"
+        while url:
+            response = self.get(url)
+            seen.extend(item["id"] for item in response.json["items"])
+            cursor = response.json["next_cursor"]
+            url = f"/households?limit=2&after={cursor}" if cursor else None
+        self.assertEqual(seen, [1, 2, 3, 4, 5])
+
+    def test_last_page(self):
+        """Test the last page has no next cursor and no Link header."""
+        response = self.get("/households?limit=10&after=3")
+        self.assertEqual(len(response.json["items"]), 2)
+        self.assertIsNone(response.json["next_cursor"])
+        self.assertNotIn("Link", response.headers)
+
+    def test_invalid_limit(self):
+        """Test an out of range limit is rejected."""
+        response = self.get("/households?limit=0")
+        self.assertEqual(response.status_code, 422)
+
+    def test_openapi_documents_cursor_arguments(self):
+        """Test the limit/after arguments appear in the OpenAPI spec."""
+        spec = self.client.get("/openapi.json").json
+        parameters = spec["paths"]["/households"]["get"]["parameters"]
+        self.assertEqual(
+            {parameter["name"] for parameter in parameters},
+            {"limit", "after"})
+
+
+if __name__ == "__main__":
+    unittest.main()
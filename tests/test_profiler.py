@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+import json
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from models import AdminModel
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class ProfilerTestCase(unittest.TestCase):
+    def create_app(self, **config):
+        config.setdefault("RESPONSE_CACHE_BACKEND", "none")
+        # the slow-query log only starts after the fixtures, so that it
+        # does not log the statements creating them
+        slow_query_ms = config.pop("SLOW_QUERY_MS", 0)
+        config["SLOW_QUERY_MS"] = 0
+        self.app = create_app("sqlite:///:memory:", config=config)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(AdminModel(user_id=1))
+            db.session.commit()
+            self.admin_token = create_access_token(
+                identity=1, additional_claims={"role": "admin"})
+        self.app.config["SLOW_QUERY_MS"] = slow_query_ms
+
+    def tearDown(self):
+        self.app.config["SLOW_QUERY_MS"] = 0
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def get_admins(self, **headers):
+        headers["Authorization"] = f"Bearer {self.admin_token}"
+        return self.client.get("/admins", headers=headers)
+
+    def test_header_enables_profile(self):
+        """Test a request asking for a profile gets Server-Timing."""
+        self.create_app(SQL_PROFILER="header")
+        self.assertNotIn("Server-Timing", self.get_admins().headers)
+
+        with self.assertLogs("ecotrack.sql_profile", "INFO") as logs:
+            response = self.get_admins(**{"X-SQL-Profile": "1"})
+        timing = response.headers["Server-Timing"]
+        self.assertIn('sql;dur=', timing)
+        self.assertIn('desc="1 statements"', timing)
+        self.assertIn('app;dur=', timing)
+
+        profile = json.loads(logs.records[0].getMessage())
+        self.assertEqual(profile["path"], "/admins")
+        self.assertEqual(len(profile["statements"]), 1)
+        statement = profile["statements"][0]
+        self.assertIn("FROM admins", statement["statement"])
+        self.assertIn("pagination.py", statement["call_site"])
+
+    def test_off_ignores_header(self):
+        """Test the header does nothing while the profiler is off."""
+        self.create_app()
+        response = self.get_admins(**{"X-SQL-Profile": "1"})
+        self.assertNotIn("Server-Timing", response.headers)
+
+    def test_always(self):
+        """Test every request is profiled in "always" mode."""
+        self.create_app(SQL_PROFILER="always")
+        self.assertIn("Server-Timing", self.get_admins().headers)
+
+    def test_slow_query_log(self):
+        """Test statements over the threshold are logged."""
+        self.create_app(SLOW_QUERY_MS=1e-9)
+        with self.assertLogs("ecotrack.slow_queries", "WARNING") as logs:
+            self.get_admins()
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["event"], "slow_query")
+        self.assertEqual(record["path"], "/admins")
+        self.assertIn("FROM admins", record["statement"])
+        self.assertIsNotNone(record["call_site"])
+
+    def test_parameters_redacted(self):
+        """Test the parameter values are only logged when asked for."""
+        for log_parameters in (False, True):
+            self.create_app(
+                SLOW_QUERY_MS=1e-9, SQL_LOG_PARAMETERS=log_parameters)
+            with self.assertLogs("ecotrack.slow_queries", "WARNING") as logs:
+                self.client.post("/login", json={
+                    "username": "secret-user", "password": "secret"})
+            records = [
+                json.loads(record.getMessage()) for record in logs.records]
+            lookup = next(
+                record for record in records
+                if "FROM users" in record["statement"])
+            if log_parameters:
+                self.assertIn("secret-user", lookup["parameters"])
+            else:
+                self.assertNotIn("secret-user", "\n".join(logs.output))
+                self.assertIn("'str'", lookup["parameters"])
+
+
+if __name__ == "__main__":
+    unittest.main()
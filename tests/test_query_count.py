@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+from datetime import date
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from models import (
+    HouseholdModel, CollectorModel, CollectionDateModel,
+    CollectionRequestModel)
+from query_count import QueryCountMixin
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class QueryCountTestCase(QueryCountMixin, unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:")
+        # rows are seeded behind the API, so responses must not be cached
+        self.app.config["RESPONSE_CACHE_BACKEND"] = "none"
+        self.client = self.app.test_client()
+        self.next_user_id = 1
+
+        with self.app.app_context():
+            db.create_all()
+            self.admin_token = create_access_token(
+                identity=1, additional_claims={"role": "admin"})
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def seed(self, count):
+        """Add households and collectors, each with nested rows."""
+        with self.app.app_context():
+            for _ in range(count):
+                user_id = self.next_user_id
+                self.next_user_id += 1
+                collector = CollectorModel(
+                    allocated_area="Area", user_id=user_id)
+                household = HouseholdModel(
+                    house_number=str(user_id), area="Area", user_id=user_id)
+                collection_date = CollectionDateModel(
+                    collection_date=date(2024, 6, 1), collector=collector)
+                db.session.add_all([
+                    collector, household, collection_date,
+                    CollectionRequestModel(
+                        status="pending", household=household,
+                        collection_date=collection_date),
+                ])
+            db.session.commit()
+
+    def count_get(self, url):
+        """Return the number of statements run by a GET request."""
+        with self.count_queries() as statements:
+            response = self.client.get(
+                url, headers={"Authorization": f"Bearer {self.admin_token}"})
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def assertConstantQueries(self, url):
+        """Assert the statement count does not grow with the row count."""
+        self.seed(2)
+        few = self.count_get(url)
+        self.seed(20)
+        self.assertEqual(self.count_get(url), few)
+
+    def test_households_constant_queries(self):
+        """Test /households does not run a query per household."""
+        self.assertConstantQueries("/households")
+
+    def test_collectors_constant_queries(self):
+        """Test /collectors does not run a query per collector."""
+        self.assertConstantQueries("/collectors")
+
+    def test_collection_dates_constant_queries(self):
+        """Test /collection_dates does not run a query per date."""
+        self.assertConstantQueries("/collection_dates")
+
+    def test_collection_requests_constant_queries(self):
+        """Test /collection_requests does not run a query per request."""
+        self.assertConstantQueries("/collection_requests")
+
+    def test_household_detail_queries(self):
+        """Test a household and its requests load in two statements."""
+        self.seed(1)
+        with self.assertNumQueries(2):
+            self.client.get(
+                "/households/1",
+                headers={"Authorization": f"Bearer {self.admin_token}"})
+
+
+if __name__ == "__main__":
+    unittest.main()
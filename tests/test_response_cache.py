@@ -0,0 +1,134 @@
+import unittest
+import sys
+import os
+from datetime import date
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from models import AdminModel, CollectorModel, CollectionDateModel
+from response_cache import RedisBackend
+from query_count import QueryCountMixin
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class FakeRedis:
+    """In-memory stand-in for a redis-py client."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None):
+        self.data[name] = value
+
+    def incr(self, name):
+        self.data[name] = str(int(self.data.get(name, 0)) + 1).encode()
+        return int(self.data[name])
+
+
+class ResponseCacheTestCase(QueryCountMixin, unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:")
+        self.configure()
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                AdminModel(user_id=1),
+                CollectorModel(user_id=2, allocated_area="Area"),
+                CollectionDateModel(
+                    collector_id=1, collection_date=date(2024, 6, 1)),
+            ])
+            db.session.commit()
+            self.admin_token = create_access_token(
+                identity=1, additional_claims={"role": "admin"})
+            self.household_token = create_access_token(
+                identity=3, additional_claims={"role": "household"})
+
+    def configure(self):
+        """Use the default local backend."""
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def get(self, url, token=None, **headers):
+        headers["Authorization"] = f"Bearer {token or self.admin_token}"
+        return self.client.get(url, headers=headers)
+
+    def test_second_get_is_cached(self):
+        """Test a repeated GET runs no query and returns the same body."""
+        first = self.get("/collection_dates")
+        with self.assertNumQueries(0):
+            second = self.get("/collection_dates")
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json, first.json)
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+
+    def test_if_none_match_returns_304(self):
+        """Test a matching ETag gets a 304 without a body."""
+        etag = self.get("/collection_dates").headers["ETag"]
+        response = self.get("/collection_dates", **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+    def test_key_depends_on_caller(self):
+        """Test callers with another role do not share entries."""
+        self.get("/collection_dates")
+        with self.count_queries() as statements:
+            self.get("/collection_dates", token=self.household_token)
+        self.assertNotEqual(len(statements), 0)
+
+    def test_write_invalidates_blueprint(self):
+        """Test a delete in the blueprint drops its cached responses."""
+        self.assertEqual(len(self.get("/collection_dates").json["items"]), 1)
+        response = self.client.delete(
+            "/collection_dates/1",
+            headers={"Authorization": f"Bearer {self.admin_token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.get("/collection_dates").json["items"]), 0)
+
+    def test_write_invalidates_dependents(self):
+        """Test a delete of a collection date drops cached collectors."""
+        before = self.get("/collectors/1").json
+        self.assertEqual(len(before["collection_dates"]), 1)
+        self.client.delete(
+            "/collection_dates/1",
+            headers={"Authorization": f"Bearer {self.admin_token}"})
+        after = self.get("/collectors/1").json
+        self.assertEqual(after["collection_dates"], [])
+
+    def test_queued_job_keeps_cache(self):
+        """Test a request answered with 202 invalidates nothing."""
+        self.get("/collection_dates")
+        response = self.client.post(
+            "/collection_dates/rebalance", json={},
+            headers={"Authorization": f"Bearer {self.admin_token}"})
+        self.assertEqual(response.status_code, 202)
+        with self.assertNumQueries(0):
+            self.get("/collection_dates")
+
+
+class SharedResponseCacheTestCase(ResponseCacheTestCase):
+    def configure(self):
+        """Use a shared backend on a fake Redis client."""
+        self.redis = FakeRedis()
+        self.app.config["RESPONSE_CACHE_BACKEND"] = RedisBackend(self.redis)
+
+    def test_entries_are_shared(self):
+        """Test entries are written to the shared backend."""
+        self.get("/collection_dates")
+        self.assertTrue(any(
+            key.startswith("ecotrack:response:") for key in self.redis.data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import sys
+import os
+from app import create_app
+from cache import TTLCache
+from db import db
+from models import HouseholdModel, CollectorModel, AdminModel
+from roles import query_identity, query_role, resolve_role
+from query_count import QueryCountMixin
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class RoleResolverTestCase(QueryCountMixin, unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([
+            HouseholdModel(house_number="1", area="Area", user_id=1),
+            CollectorModel(allocated_area="Area", user_id=2),
+            AdminModel(user_id=3),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_query_role_single_statement(self):
+        """Test each role is read with one statement."""
+        for user_id, role in [
+                (1, "household"), (2, "collector"), (3, "admin"), (4, None)]:
+            with self.assertNumQueries(1):
+                self.assertEqual(query_role(user_id), role)
+
+    def test_query_identity(self):
+        """Test the ids of every role row are read in one statement."""
+        db.session.add(AdminModel(user_id=1))
+        db.session.commit()
+        with self.assertNumQueries(1):
+            identity = query_identity(1)
+        self.assertEqual(identity, {
+            "role": "household",
+            "household_id": 1,
+            "collector_id": None,
+            "admin_id": 2,
+        })
+        self.assertEqual(query_identity(5), {
+            "role": None,
+            "household_id": None,
+            "collector_id": None,
+            "admin_id": None,
+        })
+
+    def test_household_takes_precedence(self):
+        """Test a household that is also an admin resolves to household."""
+        db.session.add(AdminModel(user_id=1))
+        db.session.commit()
+        self.assertEqual(query_role(1), "household")
+
+    def test_resolve_role_is_cached(self):
+        """Test a second lookup runs no query."""
+        resolve_role(2)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_role(2), "collector")
+
+    def test_insert_invalidates_cache(self):
+        """Test creating a role row drops the cached role."""
+        self.assertIsNone(resolve_role(4))
+        db.session.add(AdminModel(user_id=4))
+        db.session.commit()
+        self.assertEqual(resolve_role(4), "admin")
+
+    def test_delete_invalidates_cache(self):
+        """Test deleting a role row drops the cached role."""
+        self.assertEqual(resolve_role(3), "admin")
+        db.session.delete(db.session.get(AdminModel, 1))
+        db.session.commit()
+        self.assertIsNone(resolve_role(3))
+
+
+class TTLCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = TTLCache(maxsize=2, ttl=10, timer=lambda: self.now)
+
+    def test_expiry(self):
+        """Test entries expire after the ttl."""
+        self.cache.set("a", 1)
+        self.now = 9
+        self.assertEqual(self.cache.get("a"), 1)
+        self.now = 10
+        self.assertIsNone(self.cache.get("a", None))
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted."""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        self.assertIsNone(self.cache.get("b", None))
+        self.assertEqual(self.cache.get("a"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import sys
+import os
+import random
+import time
+from datetime import date
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from models import (
+    CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel)
+from routing import nearest_neighbour, path_length, plan_route, project
+from routing import two_opt
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class PlanRouteTestCase(unittest.TestCase):
+    def test_line(self):
+        """Test stops on a street are visited from one end to the other."""
+        longitudes = [0.0, 0.005, 0.003, 0.009, 0.001, 0.007, 0.002]
+        route = plan_route([(51.5, longitude) for longitude in longitudes])
+        self.assertEqual(
+            route, sorted(range(len(longitudes)), key=longitudes.__getitem__))
+
+    def test_few_stops(self):
+        """Test routes of fewer than three stops keep their order."""
+        self.assertEqual(plan_route([]), [])
+        self.assertEqual(plan_route([(51.5, 0.1), (51.4, 0.1)]), [0, 1])
+
+    def test_two_opt_shortens_the_path(self):
+        """Test 2-opt keeps every stop, the first one first, and never
+        lengthens the nearest-neighbour path."""
+        rng = random.Random(3)
+        points = [(51.5 + rng.uniform(0, 0.05), rng.uniform(0, 0.08))
+                  for _ in range(300)]
+        xs, ys = project(points)
+        path = nearest_neighbour(xs, ys)
+        improved = two_opt(xs, ys, list(path))
+        self.assertEqual(improved[0], 0)
+        self.assertEqual(sorted(improved), list(range(300)))
+        self.assertLess(path_length(xs, ys, improved),
+                        path_length(xs, ys, path))
+
+    def test_two_thousand_stops(self):
+        """Test a route of 2,000 stops takes less than a second."""
+        rng = random.Random(0)
+        points = [(51.5 + rng.uniform(0, 0.1), rng.uniform(0, 0.15))
+                  for _ in range(2000)]
+        started = time.perf_counter()
+        route = plan_route(points)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(sorted(route), list(range(2000)))
+
+
+class ScheduleRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up a collector with a date of five requests."""
+        self.app = create_app("sqlite:///:memory:", config={
+            "RESPONSE_CACHE_BACKEND": "none",
+        })
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            # house numbers run against the street, the last one is not
+            # located
+            db.session.add_all([
+                CollectorModel(user_id=1, allocated_area="North"),
+                CollectionDateModel(
+                    collector_id=1, collection_date=date.today()),
+            ] + [
+                HouseholdModel(
+                    user_id=2 + index, house_number=str(index), area="North",
+                    latitude=None if longitude is None else 51.5,
+                    longitude=longitude)
+                for index, longitude in enumerate(
+                    (0.0, 0.004, 0.001, 0.003, None))
+            ])
+            db.session.flush()
+            db.session.add_all([
+                CollectionRequestModel(
+                    household_id=household_id, collection_date_id=1,
+                    status="pending")
+                for household_id in range(1, 6)
+            ])
+            db.session.commit()
+            self.token = create_access_token(identity=1)
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def houses(self, order="route"):
+        response = self.client.get(
+            f"/collectors/me/schedule?order={order}",
+            headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 200)
+        return [request["household"]["house_number"]
+                for request in response.json["dates"][0]["requests"]]
+
+    def test_route_order(self):
+        """Test the requests follow the street, unlocated ones last."""
+        self.assertEqual(self.houses("area"), ["0", "1", "2", "3", "4"])
+        self.assertEqual(self.houses(), ["0", "2", "3", "1", "4"])
+
+    def test_unknown_order(self):
+        """Test an unknown order is rejected."""
+        response = self.client.get(
+            "/collectors/me/schedule?order=fastest",
+            headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 422)
+
+    def test_route_cache(self):
+        """Test routes are cached per date and computed again when the
+        requests of the date change."""
+        self.houses()
+        with self.app.app_context():
+            cache = self.app.extensions["route_cache"]
+            fingerprint, order = cache.get(1)
+            self.assertEqual(order, [0, 2, 3, 1])
+            # a cached route is served as it is
+            cache.set(1, (fingerprint, [3, 2, 1, 0]))
+        self.assertEqual(self.houses(), ["3", "2", "1", "0", "4"])
+
+        with self.app.app_context():
+            db.session.delete(db.session.get(CollectionRequestModel, 4))
+            db.session.commit()
+        self.assertEqual(self.houses(), ["0", "2", "1", "4"])
+
+
+class HouseholdCoordinatesTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the app."""
+        self.app = create_app("sqlite:///:memory:")
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            self.token = create_access_token(identity=1)
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def post(self, **coordinates):
+        return self.client.post(
+            "/households",
+            json={"house_number": "1", "area": "North", **coordinates},
+            headers={"Authorization": f"Bearer {self.token}"})
+
+    def test_coordinates(self):
+        """Test households take optional coordinates, given together."""
+        response = self.post(latitude=51.5, longitude=-0.12)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json["latitude"], 51.5)
+        self.assertEqual(response.json["longitude"], -0.12)
+        self.assertEqual(self.post(latitude=51.5).status_code, 422)
+        self.assertEqual(
+            self.post(latitude=91, longitude=0).status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
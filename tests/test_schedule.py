@@ -0,0 +1,133 @@
+import unittest
+import sys
+import os
+from datetime import date, timedelta
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from models import (
+    CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel)
+from query_count import QueryCountMixin
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class CollectorScheduleTestCase(QueryCountMixin, unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:")
+        self.client = self.app.test_client()
+        self.today = date.today()
+        today = self.today
+
+        with self.app.app_context():
+            db.create_all()
+            # the collector's id (1) differs from its user id (10)
+            db.session.add_all([
+                CollectorModel(user_id=10, allocated_area="North"),
+                CollectorModel(user_id=11, allocated_area="South"),
+                HouseholdModel(user_id=20, house_number="7", area="South"),
+                HouseholdModel(user_id=21, house_number="3", area="North"),
+                HouseholdModel(user_id=22, house_number="1", area="South"),
+                CollectionDateModel(
+                    collector_id=1, collection_date=today + timedelta(2)),
+                CollectionDateModel(
+                    collector_id=1, collection_date=today),
+                CollectionDateModel(
+                    collector_id=1, collection_date=today + timedelta(30)),
+                CollectionDateModel(
+                    collector_id=2, collection_date=today),
+            ])
+            db.session.flush()
+            db.session.add_all([
+                CollectionRequestModel(
+                    household_id=1, collection_date_id=2, status="pending"),
+                CollectionRequestModel(
+                    household_id=2, collection_date_id=2, status="pending"),
+                CollectionRequestModel(
+                    household_id=3, collection_date_id=2, status="missed"),
+                CollectionRequestModel(
+                    household_id=1, collection_date_id=3, status="pending"),
+                CollectionRequestModel(
+                    household_id=2, collection_date_id=4, status="pending"),
+            ])
+            db.session.commit()
+            self.collector_token = create_access_token(
+                identity=10, additional_claims={"role": "collector"})
+            self.household_token = create_access_token(
+                identity=20, additional_claims={"role": "household"})
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def get_schedule(self, query="", token=None):
+        return self.client.get(
+            f"/collectors/me/schedule{query}",
+            headers={
+                "Authorization": f"Bearer {token or self.collector_token}"})
+
+    def test_schedule(self):
+        """Test the week's dates come with requests sorted by area."""
+        response = self.get_schedule()
+        self.assertEqual(response.status_code, 200)
+        schedule = response.json
+        self.assertEqual(schedule["collector_id"], 1)
+        self.assertEqual(schedule["from"], self.today.isoformat())
+        self.assertEqual(
+            schedule["to"], (self.today + timedelta(6)).isoformat())
+        self.assertEqual([day["id"] for day in schedule["dates"]], [2, 1])
+
+        first = schedule["dates"][0]
+        self.assertEqual(first["date"], self.today.isoformat())
+        self.assertEqual(
+            [(request["household"]["area"],
+              request["household"]["house_number"])
+             for request in first["requests"]],
+            [("North", "3"), ("South", "1"), ("South", "7")])
+        self.assertEqual(first["requests"][1], {
+            "id": 3,
+            "status": "missed",
+            "household": {"id": 3, "house_number": "1", "area": "South"},
+        })
+        # a date without requests is listed too
+        self.assertEqual(schedule["dates"][1]["requests"], [])
+
+    def test_range(self):
+        """Test the from and to arguments bound the dates."""
+        later = (self.today + timedelta(30)).isoformat()
+        response = self.get_schedule(f"?from={later}&to={later}")
+        self.assertEqual([day["id"] for day in response.json["dates"]], [3])
+
+        response = self.get_schedule(
+            f"?from={later}&to={self.today.isoformat()}")
+        self.assertEqual(response.status_code, 422)
+
+    def test_single_query(self):
+        """Test the schedule is read in one query."""
+        with self.app.app_context():
+            # the collector id comes from the token
+            with self.assertNumQueries(1):
+                self.get_schedule()
+
+    def test_collector_only(self):
+        """Test other roles cannot get a schedule."""
+        response = self.get_schedule(token=self.household_token)
+        self.assertEqual(response.status_code, 403)
+
+    def test_collection_dates_of_collector(self):
+        """Test a collector lists the dates of its own collector id."""
+        response = self.client.get(
+            "/collection_dates",
+            headers={"Authorization": f"Bearer {self.collector_token}"})
+        self.assertEqual(
+            sorted(item["id"] for item in response.json["items"]),
+            [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import sys
+import os
+from unittest import mock
+from sqlalchemy import func, inspect, select
+from app import create_app
+from db import db
+from hashing import verify_password
+from models import CollectionDateModel, CollectionRequestModel
+from models import CollectorModel, HouseholdModel, UserModel
+from seeding import _advance_sequences, seed, seed_command
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class SeedingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("sqlite:///:memory:", config={
+            "HASHING_EXECUTOR": "inline",
+        })
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def count(self, model):
+        return db.session.scalar(select(func.count()).select_from(model))
+
+    def test_seed(self):
+        """Test the rows are inserted and consistent."""
+        with mock.patch(
+                "seeding.hash_password",
+                wraps=lambda password: "hash") as hash_password:
+            counts = seed(
+                households=200, collectors=10, admins=2,
+                dates_per_collector=4, requests=1000, batch_size=64)
+        hash_password.assert_called_once()
+        self.assertEqual(counts, {
+            "users": 212,
+            "households": 200,
+            "collectors": 10,
+            "admins": 2,
+            "collection_dates": 40,
+            "collection_requests": 1000,
+        })
+        self.assertEqual(self.count(CollectionRequestModel), 1000)
+
+        # every request is for a collector of the household's area
+        mismatched = db.session.scalar(
+            select(func.count())
+            .select_from(CollectionRequestModel)
+            .join(HouseholdModel)
+            .join(CollectionDateModel)
+            .join(CollectorModel)
+            .where(HouseholdModel.area != CollectorModel.allocated_area))
+        self.assertEqual(mismatched, 0)
+
+        # the places used of every date are its requests
+        counted = dict(db.session.execute(
+            select(CollectionRequestModel.collection_date_id, func.count())
+            .group_by(CollectionRequestModel.collection_date_id)).all())
+        used = dict(db.session.execute(
+            select(CollectionDateModel.id, CollectionDateModel.used)).all())
+        self.assertEqual(used, {
+            date_id: counted.get(date_id, 0) for date_id in used})
+        self.assertEqual(sum(used.values()), 1000)
+
+    def test_seed_again(self):
+        """Test seeding twice appends new rows."""
+        seed(households=5, collectors=2, dates_per_collector=2, requests=10)
+        seed(households=5, collectors=2, dates_per_collector=2, requests=10)
+        self.assertEqual(self.count(UserModel), 16)
+        self.assertEqual(self.count(CollectionRequestModel), 20)
+
+    def test_password(self):
+        """Test the users can log in with the seeded password."""
+        seed(households=2, collectors=1, dates_per_collector=1, requests=1,
+             password="secret")
+        user = db.session.scalars(select(UserModel)).first()
+        self.assertTrue(verify_password("secret", user.password))
+
+    def test_indexes_rebuilt(self):
+        """Test the deferred indexes exist after seeding."""
+        seed(households=5, collectors=2, dates_per_collector=2, requests=10)
+        indexes = {
+            index["name"] for index in
+            inspect(db.engine).get_indexes("collection_requests")
+        }
+        self.assertIn("ix_collection_requests_household_id_status", indexes)
+        self.assertIn("ix_collection_requests_collection_date_id", indexes)
+
+    def test_sequences_advanced(self):
+        """Test the PostgreSQL sequences are moved past the seeded ids."""
+        connection = mock.Mock()
+        connection.dialect.name = "postgresql"
+        connection.dialect.identifier_preparer.quote = lambda name: name
+        _advance_sequences(connection, (UserModel, CollectionRequestModel))
+        statements = [
+            (str(call.args[0]), call.args[1])
+            for call in connection.execute.call_args_list
+        ]
+        self.assertEqual(statements, [
+            ("SELECT setval(pg_get_serial_sequence(:table, 'id'), max(id)) "
+             "FROM users", {"table": "users"}),
+            ("SELECT setval(pg_get_serial_sequence(:table, 'id'), max(id)) "
+             "FROM collection_requests", {"table": "collection_requests"}),
+        ])
+
+        connection.dialect.name = "sqlite"
+        connection.execute.reset_mock()
+        _advance_sequences(connection, (UserModel,))
+        connection.execute.assert_not_called()
+
+    def test_command(self):
+        """Test the flask seed command."""
+        result = self.app.test_cli_runner().invoke(seed_command, [
+            "--households", "10", "--collectors", "2",
+            "--dates-per-collector", "3", "--requests", "50",
+            "--start", "2030-01-07",
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("collection_requests: 50", result.output)
+        self.assertIn("rows/s", result.output)
+        first = db.session.scalar(
+            select(func.min(CollectionDateModel.collection_date)))
+        self.assertEqual(first.isoformat(), "2030-01-07")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+import unittest
+import sys
+import os
+from datetime import date, datetime
+from marshmallow import Schema, fields, post_dump
+from sqlalchemy import select
+from app import create_app
+from db import db
+import schemas
+import serializers
+from serializers import CompiledSchema, compile_schema
+from models import (
+    CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel)
+from schedule import collector_schedule
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class EventSchema(CompiledSchema):
+    """A schema with every kind of field the generator handles."""
+    id = fields.Int()
+    code = fields.Int(as_string=True)
+    name = fields.Str(data_key="title")
+    day = fields.Date(attribute="when")
+    at = fields.DateTime()
+    stamp = fields.DateTime(format="%Y/%m/%d")
+    ratio = fields.Float()
+    tags = fields.List(fields.Str())
+    scores = fields.List(fields.Int(), dump_default=list)
+    place = fields.Nested(schemas.PlainHouseholdSchema(only=("area",)))
+    secret = fields.Str(load_only=True)
+    label = fields.Method("make_label")
+
+    def make_label(self, obj):
+        return f"event {self.get_attribute(obj, 'id', None)}"
+
+
+class HookedSchema(CompiledSchema):
+    """A schema with a dump hook, left to marshmallow."""
+    id = fields.Int()
+
+    @post_dump
+    def add_kind(self, data, **kwargs):
+        data["kind"] = "hooked"
+        return data
+
+
+class Event:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+class SerializersTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up the app with collection requests on several dates."""
+        self.app = create_app("sqlite:///:memory:")
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                CollectorModel(user_id=10, allocated_area="North"),
+                HouseholdModel(user_id=20, house_number="7", area="North"),
+                HouseholdModel(user_id=21, house_number="3", area="South"),
+            ])
+            db.session.flush()
+            db.session.add_all([
+                CollectionDateModel(
+                    collector_id=1, collection_date=date(2024, 5, day))
+                for day in (1, 2, 3)
+            ])
+            db.session.flush()
+            db.session.add_all([
+                CollectionRequestModel(
+                    household_id=household, collection_date_id=date_id,
+                    status=status)
+                for household, date_id, status in (
+                    (1, 1, "pending"), (2, 1, "collected"), (1, 2, "missed"))
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def assert_parity(self, schema, obj, many=None):
+        """The generated function dumps like marshmallow."""
+        with serializers.disabled():
+            expected = schema.dump(obj, many=many)
+        self.assertEqual(schema.dump(obj, many=many), expected)
+        return expected
+
+    def test_model_schemas(self):
+        """Test every model schema dumps the database like marshmallow."""
+        with self.app.app_context():
+            for schema, model in (
+                    (schemas.CollectionRequestSchema, CollectionRequestModel),
+                    (schemas.CollectionDateSchema, CollectionDateModel),
+                    (schemas.HouseholdSchema, HouseholdModel),
+                    (schemas.CollectorSchema, CollectorModel)):
+                rows = db.session.scalars(select(model)).all()
+                dump = self.assert_parity(schema(many=True), rows)
+                self.assertEqual(len(dump), len(rows))
+
+    def test_pages(self):
+        """Test the page envelopes, read by key, dump like marshmallow."""
+        with self.app.app_context():
+            requests = db.session.scalars(
+                select(CollectionRequestModel)).all()
+            dump = self.assert_parity(
+                schemas.CollectionRequestPageSchema(),
+                {"items": requests, "next_cursor": None})
+            self.assertEqual(dump["items"][0], {
+                "id": 1, "status": "pending",
+                "household": {"id": 1, "house_number": "7", "area": "North"},
+                "collection_date": {"id": 1, "date": "2024-05-01"},
+            })
+            dates = db.session.scalars(select(CollectionDateModel)).all()
+            self.assert_parity(
+                schemas.CollectionDatePageSchema(),
+                {"items": dates, "next_cursor": 3})
+
+    def test_rows_and_dicts(self):
+        """Test SQL rows and nested dicts dump like marshmallow."""
+        with self.app.app_context():
+            rows = db.session.execute(select(
+                CollectionRequestModel.id, CollectionRequestModel.status,
+                CollectionRequestModel.household_id.label("household_id"),
+                CollectionRequestModel.collection_date_id)).all()
+            self.assert_parity(
+                schemas.PlainCollectionRequestSchema(many=True), rows)
+            self.assert_parity(
+                schemas.CollectorScheduleSchema(),
+                collector_schedule(1, date(2024, 5, 1), date(2024, 5, 7)))
+
+    def test_fields(self):
+        """Test the compiled and the generic fields dump alike."""
+        schema = EventSchema()
+        events = [
+            Event(id=1, code=7, name="a", when=date(2024, 1, 2),
+                  at=datetime(2024, 1, 2, 3, 4), stamp=datetime(2024, 1, 2),
+                  ratio=0.5, tags=["x", None, 3], scores=[1, "2"],
+                  place=Event(id=1, area="North", house_number="1"),
+                  secret="s"),
+            Event(id=None, code=None, name=b"b", when=None, at=None,
+                  stamp=None, ratio=None, tags=None, scores=None,
+                  place=None),
+            # no scores attribute: the dump default applies
+            Event(id="3", code=1, name=3, when=date(2024, 1, 3), at=None,
+                  stamp=None, ratio=1, tags=[], place=None),
+        ]
+        dump = self.assert_parity(schema, events, many=True)
+        self.assertEqual(dump[0]["title"], "a")
+        self.assertEqual(dump[0]["place"], {"area": "North"})
+        self.assertEqual(dump[2]["scores"], [])
+        self.assertEqual(dump[2]["id"], 3)
+        self.assertNotIn("secret", dump[0])
+        self.assert_parity(schema, {
+            "id": 4, "code": 2, "name": "d", "when": None, "at": None,
+            "stamp": None, "ratio": 2.0, "tags": ["t"], "scores": [4],
+            "place": None})
+
+    def test_hooks_are_kept(self):
+        """Test a schema with a dump hook is dumped by marshmallow."""
+        self.assertEqual(
+            self.assert_parity(HookedSchema(), Event(id=1)),
+            {"id": 1, "kind": "hooked"})
+
+    def test_compiled_once(self):
+        """Test the function is shared by schemas with the same options."""
+        first = compile_schema(schemas.CollectionRequestSchema())
+        self.assertIs(
+            compile_schema(schemas.CollectionRequestSchema()), first)
+        self.assertIsNot(
+            compile_schema(schemas.CollectionRequestSchema(only=("id",))),
+            first)
+        self.assertEqual(
+            schemas.CollectionRequestSchema(only=("id",)).dump(Event(id=2)),
+            {"id": 2})
+
+    def test_plain_marshmallow_schemas(self):
+        """Test nested schemas outside of CompiledSchema are dumped."""
+        class PlainSchema(Schema):
+            area = fields.Str()
+
+        class OuterSchema(CompiledSchema):
+            inner = fields.Nested(PlainSchema, many=True)
+
+        self.assert_parity(
+            OuterSchema(), Event(inner=[Event(area="a"), Event(area="b")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+import tempfile
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sql_timing import observe_statements
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class SqlTimingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.directory.name, 'test.db')}")
+        self.observed = {"first": [], "second": []}
+        for name, observed in self.observed.items():
+            observe_statements(
+                self.engine,
+                lambda statement, parameters, seconds, observed=observed:
+                observed.append((statement, seconds)))
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_observers_share_the_timing(self):
+        """Test every observer gets the same duration of a statement."""
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        self.assertEqual(len(self.observed["first"]), 1)
+        self.assertEqual(self.observed["first"], self.observed["second"])
+        statement, seconds = self.observed["first"][0]
+        self.assertEqual(statement, "SELECT 1")
+        self.assertGreaterEqual(seconds, 0)
+
+    def test_failed_statement(self):
+        """Test a failed statement is not observed and leaves nothing on
+        its pooled connection."""
+        for _ in range(3):
+            with self.engine.connect() as connection:
+                with self.assertRaises(OperationalError):
+                    connection.execute(text("SELECT * FROM missing"))
+        with self.engine.connect() as connection:
+            self.assertEqual(dict(connection.info), {})
+            connection.execute(text("SELECT 2"))
+        self.assertEqual(
+            [statement for statement, _ in self.observed["first"]],
+            ["SELECT 2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+from app import create_app
+from db import db
+from models import HouseholdModel
+from sqlite_mode import write_lock
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class SQLiteModeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "ecotrack.db")
+        self.app = create_app(f"sqlite:///{self.path}", config={
+            "SQLITE_BUSY_TIMEOUT": 10,
+            "SQLITE_RETRY_DELAY": 0.02,
+            "SQLITE_WRITE_RETRIES": 8,
+        })
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        self.directory.cleanup()
+
+    def pragma(self, name):
+        with db.engine.connect() as connection:
+            return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+    def test_pragmas(self):
+        """Test connections use WAL and the configured pragmas."""
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("busy_timeout"), 10)
+        self.assertEqual(self.pragma("cache_size"), -65536)
+
+    def test_in_memory_database_untouched(self):
+        """Test in-memory databases keep their default journal."""
+        app = create_app("sqlite:///:memory:")
+        with app.app_context():
+            with db.engine.connect() as connection:
+                mode = connection.exec_driver_sql(
+                    "PRAGMA journal_mode").scalar()
+        self.assertEqual(mode, "memory")
+
+    def test_write_lock_held_until_commit(self):
+        """Test a session holds the write lock from flush to commit."""
+        db.session.add(HouseholdModel(
+            house_number="1", area="Area", user_id=1))
+        db.session.flush()
+        self.assertTrue(db.session.info["sqlite_write_lock"])
+
+        acquired = []
+        thread = threading.Thread(
+            target=lambda: acquired.append(write_lock.acquire(timeout=0)))
+        thread.start()
+        thread.join()
+        self.assertEqual(acquired, [False])
+
+        db.session.commit()
+        self.assertNotIn("sqlite_write_lock", db.session.info)
+        self.assertTrue(write_lock.acquire(timeout=0))
+        write_lock.release()
+
+    def test_locked_statement_is_retried(self):
+        """Test a write waits for another process holding the lock."""
+        other = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False)
+        other.execute("BEGIN IMMEDIATE")
+        timer = threading.Timer(0.1, other.execute, args=("COMMIT",))
+        timer.start()
+        try:
+            db.session.add(HouseholdModel(
+                house_number="1", area="Area", user_id=1))
+            db.session.commit()
+        finally:
+            timer.join()
+            other.close()
+        self.assertEqual(HouseholdModel.query.count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
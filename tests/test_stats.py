@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+from datetime import date
+from flask_jwt_extended import create_access_token
+from app import create_app
+from db import db
+from models import (
+    CollectorModel, CollectionDateModel, CollectionRequestModel,
+    HouseholdModel)
+from query_count import QueryCountMixin
+# Add the project directory to the sys.path to locate the app module
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+
+class StatsTestCase(QueryCountMixin, unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize the app."""
+        self.app = create_app("sqlite:///:memory:")
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                CollectorModel(user_id=1, allocated_area="North"),
+                CollectorModel(user_id=2, allocated_area="South"),
+                HouseholdModel(user_id=3, house_number="1", area="North"),
+                HouseholdModel(user_id=4, house_number="2", area="South"),
+                # Wednesday and Thursday of one week, then next month
+                CollectionDateModel(
+                    collector_id=1, collection_date=date(2024, 6, 5)),
+                CollectionDateModel(
+                    collector_id=2, collection_date=date(2024, 6, 6)),
+                CollectionDateModel(
+                    collector_id=1, collection_date=date(2024, 7, 3)),
+            ])
+            for household_id, date_id, status in [
+                    (1, 1, "collected"), (2, 2, "pending"),
+                    (1, 3, "pending"), (2, 3, "missed")]:
+                db.session.add(CollectionRequestModel(
+                    status=status, household_id=household_id,
+                    collection_date_id=date_id))
+            db.session.commit()
+            self.admin_token = create_access_token(
+                identity=1, additional_claims={"role": "admin"})
+
+    def tearDown(self):
+        """Clean up resources after each test."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def get(self, query=""):
+        return self.client.get(
+            f"/stats/collections{query}",
+            headers={"Authorization": f"Bearer {self.admin_token}"})
+
+    def test_counts(self):
+        """Test the counts by status, area and day."""
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["by_status"], {
+            "collected": 1, "missed": 1, "pending": 2})
+        self.assertEqual(response.json["by_area"], {"North": 2, "South": 2})
+        self.assertEqual(
+            response.json["by_allocated_area"], {"North": 3, "South": 1})
+        self.assertEqual(response.json["by_date"], {
+            "2024-06-05": 1, "2024-06-06": 1, "2024-07-03": 2})
+
+    def test_week_and_month_buckets(self):
+        """Test dates are grouped by Monday of the week and month."""
+        self.assertEqual(self.get("?bucket=week").json["by_date"], {
+            "2024-06-03": 2, "2024-07-01": 2})
+        self.assertEqual(self.get("?bucket=month").json["by_date"], {
+            "2024-06-01": 2, "2024-07-01": 2})
+
+    def test_date_range(self):
+        """Test the date range applies to every grouping."""
+        response = self.get("?from=2024-07-01")
+        self.assertEqual(response.json["by_status"], {
+            "missed": 1, "pending": 1})
+        self.assertEqual(response.json["by_allocated_area"], {"North": 2})
+
+    def test_result_is_cached(self):
+        """Test a second request runs no query."""
+        self.get()
+        with self.assertNumQueries(0):
+            self.get()
+
+    def test_requires_admin(self):
+        """Test non admins cannot read the statistics."""
+        with self.app.app_context():
+            token = create_access_token(
+                identity=3, additional_claims={"role": "household"})
+        response = self.client.get(
+            "/stats/collections",
+            headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()